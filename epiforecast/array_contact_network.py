@@ -0,0 +1,468 @@
+import copy
+import numpy as np
+import networkx as nx
+
+from .contact_network import (ContactNetwork,
+                              check_network_format,
+                              compute_edge_keys,
+                              csr_matrix_from_edge_keys,
+                              edge_keys_of,
+                              edge_weights_from_graph,
+                              set_edge_weights_of,
+                              insert_edge_keys,
+                              delete_edge_keys)
+
+class ArrayContactNetwork(ContactNetwork):
+    """
+    Store and mutate a contact network in arrays
+
+    This has the interface of ContactNetwork, but the topology and the edge
+    weights are stored as a CSR matrix (see ContactNetwork.get_edge_weights),
+    and node attributes as (n_nodes,) arrays, one per attribute; getters and
+    setters work on arrays, and a networkx graph is only materialized on demand
+    (see get_graph). Nodes are fixed at construction.
+
+    Arrays are never modified in place, but replaced; hence forks share them
+    until they are replaced.
+    """
+
+    NODE_ATTRIBUTES = (
+            ContactNetwork.AGE_GROUP,
+            ContactNetwork.LAMBDA_MIN,
+            ContactNetwork.LAMBDA_MAX,
+            ContactNetwork.LAMBDA_INTEGRATED,
+            ContactNetwork.E_TO_I,
+            ContactNetwork.I_TO_H,
+            ContactNetwork.I_TO_R,
+            ContactNetwork.I_TO_D,
+            ContactNetwork.H_TO_R,
+            ContactNetwork.H_TO_D)
+
+    def __init__(
+            self,
+            graph,
+            node_groups,
+            check_labels_are_0N):
+        """
+        Constructor
+
+        Input:
+            graph (nx.Graph): graph object with node and edge attributes; it is
+                              converted to arrays, and not kept
+            node_groups (dict): a mapping group_id -> arrays_of_nodes
+            check_labels_are_0N (boolean): check that node labels are 0..N-1
+        """
+        self.node_groups = node_groups
+        self.__import_graph(graph)
+
+        check_network_format(self, check_labels_are_0N)
+
+    @classmethod
+    def from_edges(
+            cls,
+            nodes,
+            edges,
+            node_groups,
+            check_labels_are_0N=True):
+        """
+        Create an object from arrays of nodes and edges, without networkx
+
+        Input:
+            nodes (np.array): (n_nodes,) array of node labels
+            edges (np.array): (n_edges,2) array of pairs of node labels
+            node_groups (dict): a mapping group_id -> arrays_of_nodes
+            check_labels_are_0N (boolean): check that node labels are 0..N-1
+
+        Output:
+            contact_network (ArrayContactNetwork): initialized object
+        """
+        contact_network = cls.__new__(cls)
+        contact_network.node_groups = node_groups
+        contact_network.__import_edges(nodes, edges)
+
+        check_network_format(contact_network, check_labels_are_0N)
+
+        return contact_network
+
+    def __import_edges(
+            self,
+            nodes,
+            edges):
+        """
+        Convert nodes and edges to arrays; edges get networkx's default weight
+
+        Input:
+            nodes (np.array): (n_nodes,) array of node labels
+            edges (np.array): (n_edges,2) array of pairs of node labels
+
+        Output:
+            None
+        """
+        self.nodes = np.unique(nodes)
+        self.node_attributes = {}
+
+        keys, _ = compute_edge_keys(self.nodes, np.asarray(edges).reshape(-1, 2))
+        self.edge_keys = keys
+        self.edge_weights = csr_matrix_from_edge_keys(keys,
+                                                      np.ones(keys.size),
+                                                      self.nodes.size)
+        self.graph_cache = None
+
+    def __import_graph(
+            self,
+            graph):
+        """
+        Convert nodes, node attributes and edge weights of a graph to arrays
+
+        Input:
+            graph (nx.Graph): graph object with node and edge attributes
+
+        Output:
+            None
+        """
+        self.nodes = np.array(graph.nodes)
+
+        # (n_nodes,) arrays of node attributes, NaN where missing
+        self.node_attributes = {}
+        node_data = graph.nodes(data=True)
+        for name in self.NODE_ATTRIBUTES:
+            column = np.fromiter(
+                    (attributes.get(name, np.nan) for _, attributes in node_data),
+                    dtype=float,
+                    count=self.nodes.size)
+
+            if not np.isnan(column).all():
+                self.node_attributes[name] = column
+
+        self.edge_keys, self.edge_weights = edge_weights_from_graph(graph)
+        self.graph_cache = None
+
+    def __locate_nodes(
+            self,
+            nodes):
+        """
+        Locate nodes by their labels
+
+        Input:
+            nodes (np.array): (K,) array of node labels
+
+        Output:
+            positions (np.array): (K,) positions of the nodes in self.nodes
+        """
+        positions = np.searchsorted(self.nodes, nodes)
+        positions = np.minimum(positions, self.nodes.size - 1)
+
+        if not np.array_equal(self.nodes[positions], nodes):
+            raise ValueError(
+                    self.__class__.__name__
+                    + ": nodes are not in the network; "
+                    + "nodes cannot be added to an array-backed network")
+
+        return positions
+
+    def fork(self):
+        """
+        Create a copy of the object that shares its arrays
+
+        Output:
+            contact_network (ArrayContactNetwork): the copy
+        """
+        contact_network = copy.copy(self)
+        contact_network.node_attributes = self.node_attributes.copy()
+
+        return contact_network
+
+    def get_node_count(self):
+        """
+        Get the total number of nodes
+
+        Output:
+            n_nodes (int): total number of nodes
+        """
+        return self.nodes.size
+
+    def get_edge_count(self):
+        """
+        Get the total number of edges
+
+        Output:
+            n_edges (int): total number of edges
+        """
+        n_nodes = self.get_node_count()
+        n_self_loops = np.count_nonzero(
+                self.edge_keys // n_nodes == self.edge_keys % n_nodes)
+
+        return (self.edge_keys.size + n_self_loops) // 2
+
+    @property
+    def graph(self):
+        """
+        Graph materialized from the arrays; see get_graph
+        """
+        return self.get_graph()
+
+    def get_graph(self):
+        """
+        Get the graph, materialized from the arrays
+
+        The graph is cached until the object is mutated; changes to the graph
+        are not reflected in the object, so treat it as read-only.
+
+        Output:
+            graph (nx.Graph): graph object with node and edge attributes
+        """
+        if self.graph_cache is None:
+            graph = nx.Graph()
+
+            names = list(self.node_attributes)
+            columns = [self.node_attributes[name].tolist() for name in names]
+            if ContactNetwork.AGE_GROUP in self.node_attributes:
+                columns[names.index(ContactNetwork.AGE_GROUP)] = (
+                        self.get_age_groups().tolist())
+
+            graph.add_nodes_from(
+                    zip(self.nodes.tolist(),
+                        (dict(zip(names, values)) for values in zip(*columns)))
+                    if names else self.nodes.tolist())
+
+            edges = self.get_edges()
+            weights = self.edge_weights.data[self.__upper_triangle()]
+            graph.add_edges_from(
+                    (i, j, {ContactNetwork.WJI: weight})
+                    for (i, j), weight in zip(edges.tolist(), weights.tolist()))
+
+            self.graph_cache = graph
+
+        return self.graph_cache
+
+    def get_nodes(self):
+        """
+        Get all nodes of the graph
+
+        Output:
+            nodes (np.array): (n_nodes,) array of node indices
+        """
+        return self.nodes.copy()
+
+    def __upper_triangle(self):
+        """
+        Get the mask of the CSR entries (i,j) with i <= j, one per edge
+
+        Output:
+            mask (np.array): (nonzeros,) boolean mask
+        """
+        n_nodes = self.get_node_count()
+        return self.edge_keys // n_nodes <= self.edge_keys % n_nodes
+
+    def get_edges(self):
+        """
+        Get all edges of the graph
+
+        Output:
+            edges (np.array): (n_edges,2) array of pairs of node indices
+        """
+        n_nodes = self.get_node_count()
+        keys = self.edge_keys[self.__upper_triangle()]
+
+        return np.column_stack( (self.nodes[keys // n_nodes],
+                                 self.nodes[keys %  n_nodes]) )
+
+    def get_incident_edges(
+            self,
+            node):
+        """
+        Get incident edges of a node
+
+        Input:
+            node (int): node whose incident edges to retrieve
+
+        Output:
+            edges (list): list of tuples, each of which is an incident edge
+        """
+        i = self.__locate_nodes(np.array([node]))[0]
+        indptr = self.edge_weights.indptr
+        neighbors = self.nodes[self.edge_weights.indices[indptr[i]:indptr[i+1]]]
+
+        return [(node, neighbor) for neighbor in neighbors.tolist()]
+
+    def get_node_attributes(
+            self,
+            name):
+        """
+        Get node attributes by name (for example, transition rates)
+
+        Input:
+            name (str): name of the attributes
+
+        Output:
+            values (np.array): (n_nodes,) array of values, or an empty array if
+                               the attributes are not set
+        """
+        if name not in self.node_attributes:
+            return np.array([])
+
+        return self.node_attributes[name].copy()
+
+    def set_node_attributes(
+            self,
+            values,
+            name):
+        """
+        Set node attributes by name
+
+        Input:
+            values (int),
+                   (float): constant value to be assigned to all nodes
+                   (dict): a mapping node -> value
+                   (np.array): (n_nodes,) array of values
+            name (str): name of the attributes
+
+        Output:
+            None
+        """
+        if isinstance(values, (int, float)):
+            column = np.full(self.get_node_count(), float(values))
+        elif isinstance(values, dict):
+            column = self.node_attributes.get(
+                    name, np.full(self.get_node_count(), np.nan)).copy()
+            if len(values) > 0:
+                nodes = np.array(list(values.keys()))
+                column[self.__locate_nodes(nodes)] = np.fromiter(
+                        values.values(), dtype=float, count=len(values))
+        elif isinstance(values, np.ndarray):
+            column = np.array(values, dtype=float)
+        else:
+            raise ValueError(
+                    self.__class__.__name__
+                    + ": this type of argument is not supported: "
+                    + values.__class__.__name__)
+
+        self.node_attributes[name] = column
+        self.graph_cache = None
+
+    def __set_edge_keys(
+            self,
+            keys,
+            data):
+        """
+        Reset the CSR matrix of edge weights from sorted keys and weights
+
+        Input:
+            keys (np.array): (nonzeros,) sorted array of keys of matrix entries
+            data (np.array): (nonzeros,) array of weights
+
+        Output:
+            None
+        """
+        self.edge_keys = keys
+        self.edge_weights = csr_matrix_from_edge_keys(keys,
+                                                      data,
+                                                      self.get_node_count())
+        self.graph_cache = None
+
+    def set_edge_weights(
+            self,
+            edge_weights):
+        """
+        Set edge weights of the graph
+
+        Input:
+            edge_weights (int),
+                         (float): constant value to be assigned to all edges
+                         (dict): a mapping edge -> weight
+        Output:
+            None
+        """
+        self.edge_weights = set_edge_weights_of(self.edge_keys,
+                                                self.edge_weights,
+                                                self.nodes,
+                                                edge_weights)
+        self.graph_cache = None
+
+    def add_edges(
+            self,
+            edges):
+        """
+        Add edges to the graph
+
+        Input:
+            edges (list): list of tuples, each of which is an edge
+        Output:
+            None
+        """
+        if len(edges) == 0:
+            return
+
+        edges = np.array(list(edges)).reshape(-1, 2)
+        self.__locate_nodes(edges.ravel()) # check that nodes exist
+
+        keys, _ = compute_edge_keys(self.nodes, edges)
+        self.__set_edge_keys(
+                *insert_edge_keys(self.edge_keys, self.edge_weights.data, keys))
+
+    def remove_edges(
+            self,
+            edges):
+        """
+        Remove edges from the graph
+
+        Input:
+            edges (list): list of tuples, each of which is an edge
+        Output:
+            None
+        """
+        if len(edges) == 0:
+            return
+
+        keys, _ = compute_edge_keys(self.nodes, np.array(list(edges)).reshape(-1, 2))
+        self.__set_edge_keys(
+                *delete_edge_keys(self.edge_keys, self.edge_weights.data, keys))
+
+    def build_user_network_using(
+            self,
+            user_graph_builder):
+        """
+        Build user network using provided builder
+
+        Input:
+            user_graph_builder (callable): an object to build user_graph
+
+        Output:
+            user_network (ArrayContactNetwork): built user network
+        """
+        user_graph = user_graph_builder(self.get_graph())
+        return self.__class__.from_networkx_graph(user_graph, False)
+
+    def update_from(
+            self,
+            contact_network):
+        """
+        Update the graph from another object whose graph is a supergraph
+
+        The contact_network should have at least the same nodes as self, plus
+        maybe additional ones.
+
+        Input:
+            contact_network (ContactNetwork),
+                            (ArrayContactNetwork): object to update from
+
+        Output:
+            None
+        """
+        if not isinstance(contact_network, ArrayContactNetwork):
+            contact_graph = contact_network.graph # read only
+            self.__import_graph(contact_graph.subgraph(self.nodes))
+            return
+
+        positions = contact_network.__locate_nodes(self.nodes)
+
+        self.node_attributes = {
+                name: column[positions]
+                for name, column in contact_network.node_attributes.items() }
+
+        edge_weights = contact_network.edge_weights[positions][:, positions]
+        edge_weights.sort_indices()
+        self.edge_keys = edge_keys_of(edge_weights)
+        self.edge_weights = edge_weights
+
+        self.graph_cache = None
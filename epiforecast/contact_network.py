@@ -1,3 +1,10 @@
+import copy
+import hashlib
+import os
+import re
+import tempfile
+import warnings
+import zipfile
 import numpy as np
 import json
 import scipy.sparse as scspa
@@ -6,6 +13,255 @@ import networkx as nx
 from epiforecast.utilities import complement_mask
 from .contact_simulator import diurnal_inception_rate
 
+def compute_edge_keys(
+        nodes,
+        edges):
+    """
+    Compute sorted unique keys of both (i,j) and (j,i) entries of edges
+
+    Entry (i,j) of an (n_nodes,n_nodes) matrix has the key i*n_nodes + j, where
+    i and j are the positions of the nodes (not their labels).
+
+    Input:
+        nodes (np.array): (n_nodes,) sorted array of node labels
+        edges (np.array): (n_edges,2) array of pairs of node labels
+
+    Output:
+        keys (np.array): (K,) sorted array of keys of matrix entries
+        order (np.array): (K,) indices of the edges the keys belong to
+    """
+    n_nodes = nodes.size
+
+    # labels are not 0..N-1 in general; edges with labels that are not in nodes
+    # are skipped
+    i = np.minimum(np.searchsorted(nodes, edges[:,0]), n_nodes - 1)
+    j = np.minimum(np.searchsorted(nodes, edges[:,1]), n_nodes - 1)
+    valid = (nodes[i] == edges[:,0]) & (nodes[j] == edges[:,1])
+    i = i.astype(np.int64)
+    j = j.astype(np.int64)
+
+    keys = np.concatenate( (i * n_nodes + j, j * n_nodes + i) )
+    keys, first = np.unique(keys[np.tile(valid, 2)], return_index=True)
+    order = np.tile(np.arange(edges.shape[0]), 2)[np.tile(valid, 2)]
+
+    return keys, order[first]
+
+def locate_edge_keys(
+        edge_keys,
+        keys):
+    """
+    Locate entries of a CSR matrix by their keys
+
+    Input:
+        edge_keys (np.array): (nonzeros,) sorted array of keys of the matrix
+        keys (np.array): (K,) array of keys of matrix entries
+
+    Output:
+        positions (np.array): (K,) positions of the entries in CSR data
+        found (np.array): (K,) boolean mask of the entries that exist
+    """
+    positions = np.searchsorted(edge_keys, keys)
+    found = np.zeros(keys.size, dtype=bool)
+    in_range = positions < edge_keys.size
+    found[in_range] = edge_keys[positions[in_range]] == keys[in_range]
+
+    return positions, found
+
+def csr_matrix_from_edge_keys(
+        keys,
+        data,
+        n_nodes):
+    """
+    Build an (n_nodes,n_nodes) CSR matrix from sorted keys of its entries
+
+    Input:
+        keys (np.array): (nonzeros,) sorted array of keys of matrix entries
+        data (np.array): (nonzeros,) array of values
+        n_nodes (int): number of rows (and columns)
+
+    Output:
+        matrix (scipy.sparse.csr.csr_matrix): the matrix
+    """
+    row_starts = np.arange(n_nodes + 1, dtype=np.int64) * n_nodes
+
+    indptr  = np.searchsorted(keys, row_starts)
+    indices = keys % n_nodes
+
+    return scspa.csr_matrix((data, indices, indptr), shape=(n_nodes, n_nodes))
+
+def edge_keys_of(edge_weights):
+    """
+    Compute keys of the entries of a CSR matrix whose indices are sorted
+
+    Entry (i,j) of the matrix has the key i*n_nodes + j; hence the keys are
+    sorted, too.
+
+    Input:
+        edge_weights (scipy.sparse.csr.csr_matrix): (n_nodes,n_nodes) matrix
+
+    Output:
+        keys (np.array): (nonzeros,) sorted array of keys of matrix entries
+    """
+    n_nodes = edge_weights.shape[0]
+    rows = np.repeat(np.arange(n_nodes, dtype=np.int64),
+                     np.diff(edge_weights.indptr))
+
+    return rows * n_nodes + edge_weights.indices
+
+def edge_weights_from_graph(graph):
+    """
+    Build the CSR matrix of edge weights of a graph, and its keys
+
+    Columns are sorted within rows, so that entries are located by a binary
+    search of their keys; weights are float, also for graphs without weights
+    (networkx's default weight is then 1).
+
+    Input:
+        graph (nx.Graph): graph object with edge attributes
+
+    Output:
+        keys (np.array): (nonzeros,) sorted array of keys of matrix entries
+        edge_weights (scipy.sparse.csr.csr_matrix): adjacency matrix
+    """
+    edge_weights = nx.to_scipy_sparse_matrix(graph,
+                                             weight=ContactNetwork.WJI,
+                                             dtype=float,
+                                             format='csr')
+    edge_weights.sort_indices()
+
+    return edge_keys_of(edge_weights), edge_weights
+
+def set_edge_weights_of(
+        edge_keys,
+        edge_weights,
+        nodes,
+        weights):
+    """
+    Set weights of entries of a CSR matrix of edge weights
+
+    The matrix is not modified (forks may share it); the new one shares its
+    sparsity structure.
+
+    Input:
+        edge_keys (np.array): (nonzeros,) sorted array of keys of the matrix
+        edge_weights (scipy.sparse.csr.csr_matrix): matrix of edge weights
+        nodes (np.array): (n_nodes,) sorted array of node labels
+        weights (int),
+                (float): constant value to be assigned to all edges
+                (dict): a mapping edge -> weight; other edges keep theirs
+
+    Output:
+        edge_weights (scipy.sparse.csr.csr_matrix): new matrix of edge weights
+    """
+    if isinstance(weights, dict):
+        data = edge_weights.data.astype(float) # a copy
+
+        if len(weights) > 0:
+            edges = np.array(list(weights.keys()))
+            values = np.fromiter(weights.values(),
+                                 dtype=float,
+                                 count=len(weights))
+
+            keys, order = compute_edge_keys(nodes, edges)
+            positions, found = locate_edge_keys(edge_keys, keys)
+            data[positions[found]] = values[order[found]]
+    else:
+        data = np.full(edge_keys.size, float(weights))
+
+    return scspa.csr_matrix((data, edge_weights.indices, edge_weights.indptr),
+                            shape=edge_weights.shape)
+
+def insert_edge_keys(
+        edge_keys,
+        data,
+        keys):
+    """
+    Insert entries into sorted keys of a CSR matrix, unless they exist
+
+    New entries get networkx's default weight of edges without the attribute.
+
+    Input:
+        edge_keys (np.array): (nonzeros,) sorted array of keys of the matrix
+        data (np.array): (nonzeros,) array of weights
+        keys (np.array): (K,) sorted unique array of keys of entries to insert
+
+    Output:
+        edge_keys (np.array): new sorted array of keys
+        data (np.array): new array of weights
+    """
+    positions, found = locate_edge_keys(edge_keys, keys)
+
+    return (np.insert(edge_keys, positions[~found], keys[~found]),
+            np.insert(data, positions[~found], 1.0))
+
+def delete_edge_keys(
+        edge_keys,
+        data,
+        keys):
+    """
+    Delete entries from sorted keys of a CSR matrix, if they exist
+
+    Input:
+        edge_keys (np.array): (nonzeros,) sorted array of keys of the matrix
+        data (np.array): (nonzeros,) array of weights
+        keys (np.array): (K,) array of keys of entries to delete
+
+    Output:
+        edge_keys (np.array): new sorted array of keys
+        data (np.array): new array of weights
+    """
+    positions, found = locate_edge_keys(edge_keys, keys)
+
+    return (np.delete(edge_keys, positions[found]),
+            np.delete(data, positions[found]))
+
+def check_network_format(
+        contact_network,
+        check_labels_are_0N):
+    """
+    Check whether a contact network is in the correct format
+
+    The following is checked:
+        1. nodes are sorted in ascending order
+        2. total number of nodes is equal to "community + health workers"
+    If `check_labels_are_0N` is true then also check
+        3. all nodes are integers in the range 0..N-1
+
+    Input:
+        contact_network (ContactNetwork): network to check (only its getters
+                                          are used)
+        check_labels_are_0N (boolean): check that node labels are 0..N-1
+
+    Output:
+        None
+    """
+    n_checks = 3
+    correct_format = np.ones(n_checks, dtype=bool)
+    nodes = contact_network.get_nodes()
+    n_nodes = contact_network.get_node_count()
+
+    # 1. check
+    if not np.all(nodes[:-1] <= nodes[1:]): # if not "ascending order"
+        correct_format[0] = False
+
+    # 2. check
+    n_health_workers = contact_network.get_health_workers().size
+    n_community = contact_network.get_community().size
+    if n_health_workers + n_community != n_nodes:
+        correct_format[1] = False
+
+    # 3. check
+    if check_labels_are_0N:
+        if not np.array_equal(nodes, np.arange(n_nodes)):
+            correct_format[2] = False
+
+    if not correct_format.all():
+        raise ValueError(
+                contact_network.__class__.__name__
+                + ": graph format is incorrect; "
+                + "checks are: "
+                + str(correct_format))
+
 class ContactNetwork:
     """
     Store and mutate a contact network
@@ -22,6 +278,10 @@ class ContactNetwork:
     LAMBDA_INTEGRATED = 'integrated_contact_rate'
     WJI = 'edge_weights'
 
+    # node attributes stored as (n_nodes,) arrays outside of the graph, since
+    # they are set every step of a simulation; see fork
+    COLUMN_ATTRIBUTES = (LAMBDA_MIN, LAMBDA_MAX, LAMBDA_INTEGRATED)
+
     E_TO_I = 'exposed_to_infected'
     I_TO_H = 'infected_to_hospitalized'
     I_TO_R = 'infected_to_resistant'
@@ -29,6 +289,9 @@ class ContactNetwork:
     H_TO_R = 'hospitalized_to_resistant'
     H_TO_D = 'hospitalized_to_deceased'
 
+    # version of the format of edges caches; see from_files
+    EDGES_CACHE_VERSION = 1
+
     @classmethod
     def from_networkx_graph(
             cls,
@@ -60,39 +323,67 @@ class ContactNetwork:
             cls,
             edges_filename,
             groups_filename,
-            convert_labels_to_0N=True):
+            convert_labels_to_0N=True,
+            use_cache=True):
         """
         Create an object from files that contain edges and groups
 
+        The nodes and edges are cached in binary form in edges_filename + '.npz'
+        on first load; the cache is reused for as long as the hash of the
+        txt-file (and convert_labels_to_0N) is unchanged.
+
         Input:
             edges_filename (str): path to a txt-file with edges
             groups_filename (str): path to a json-file with node groups
             convert_labels_to_0N (boolean): convert node labels to 0..N-1
+            use_cache (boolean): load edges from (and save them to) the cache
 
         Output:
             contact_network (ContactNetwork): initialized object
         """
-        edges       = cls.__load_edges_from(edges_filename)
+        if use_cache:
+            nodes, edges = cls.__load_cached_edges_from(edges_filename,
+                                                        convert_labels_to_0N)
+        else:
+            nodes, edges = cls.__prepare_edges(
+                    cls.__load_edges_from(edges_filename),
+                    convert_labels_to_0N)
+
         node_groups = cls.__load_node_groups_from(groups_filename)
 
-        # in the following, (1) enforce the ascending order of the nodes,
-        # (2) add edges, and (3) (possibly) weed out missing labels (for
-        # example, there might be no node '0', so every node 'j' gets mapped to
-        # 'j-1', and the edges are remapped accordingly)
-        #
-        # this whole workaround is needed so that we can then simply say that
-        # nodes 0..44, for instance, are health workers (instead of dealing with
-        # permutations and such)
-        graph = cls.__create_sorted_networkx_graph_from(edges) # (1)
-        graph.add_edges_from(edges)                            # (2)
-        if convert_labels_to_0N:                               # (3)
-            graph = nx.convert_node_labels_to_integers(graph, ordering='sorted')
-
-        contact_network = cls(graph, node_groups, convert_labels_to_0N)
+        contact_network = cls.from_edges(nodes,
+                                         edges,
+                                         node_groups,
+                                         convert_labels_to_0N)
         contact_network.set_edge_weights(1.0) # this is done by networkx anyway
 
         return contact_network
 
+    @classmethod
+    def from_edges(
+            cls,
+            nodes,
+            edges,
+            node_groups,
+            check_labels_are_0N=True):
+        """
+        Create an object from arrays of nodes and edges
+
+        Input:
+            nodes (np.array): (n_nodes,) array of node labels
+            edges (np.array): (n_edges,2) array of pairs of node labels
+            node_groups (dict): a mapping group_id -> arrays_of_nodes
+            check_labels_are_0N (boolean): check that node labels are 0..N-1
+
+        Output:
+            contact_network (ContactNetwork): initialized object
+        """
+        graph = nx.Graph()
+        graph.add_nodes_from(np.unique(nodes).tolist())
+        graph.add_edges_from(edges.tolist())
+
+        return cls(graph, node_groups, check_labels_are_0N)
+
     def __init__(
             self,
             graph,
@@ -106,10 +397,113 @@ class ContactNetwork:
             node_groups (dict): a mapping group_id -> arrays_of_nodes
             check_labels_are_0N (boolean): check that node labels are 0..N-1
         """
-        self.graph = graph
+        self.__graph = graph
         self.node_groups = node_groups
 
-        self.__check_correct_format(check_labels_are_0N)
+        # (n_nodes,) arrays of COLUMN_ATTRIBUTES, and the names of attributes
+        # (including edge weights, WJI) not yet written to the graph
+        self.__node_columns = {}
+        self.__stale_attributes = set()
+
+        check_network_format(self, check_labels_are_0N)
+
+        # persistent CSR matrix of edge weights; see get_edge_weights
+        self.__invalidate_edge_weights()
+
+        # whether the graph may be shared; see fork
+        self.__shared = False
+
+    def fork(self):
+        """
+        Create a copy-on-write copy of the object
+
+        Both objects share the graph until either of them changes its topology
+        (or hands out its graph through get_graph), which copies it first.
+        Edge weights (the CSR matrix) and COLUMN_ATTRIBUTES are arrays that are
+        replaced rather than modified, and are written to the graph only when
+        it is handed out; hence forking is cheap, and a fork whose weights and
+        λ's are updated every step never copies the graph for that.
+
+        Output:
+            contact_network (ContactNetwork): the copy
+        """
+        contact_network = copy.copy(self)
+        contact_network.__node_columns = self.__node_columns.copy()
+        contact_network.__stale_attributes = self.__stale_attributes.copy()
+
+        self.__shared = True
+        contact_network.__shared = True
+
+        return contact_network
+
+    def __detach(self):
+        """
+        Copy the graph if it may be shared
+
+        Output:
+            None
+        """
+        if not self.__shared:
+            return
+
+        self.__graph = self.__graph.copy()
+        self.__shared = False
+
+    def __locate_nodes(
+            self,
+            nodes):
+        """
+        Locate nodes by their labels
+
+        Input:
+            nodes (np.array): (K,) array of node labels
+
+        Output:
+            positions (np.array): (K,) positions of the nodes in get_nodes()
+        """
+        all_nodes = self.get_nodes()
+        order = np.argsort(all_nodes, kind='stable')
+        positions = np.searchsorted(all_nodes[order], nodes)
+        positions = order[np.minimum(positions, all_nodes.size - 1)]
+
+        if not np.array_equal(all_nodes[positions], nodes):
+            raise ValueError(
+                    self.__class__.__name__
+                    + ": nodes are not in the network")
+
+        return positions
+
+    def __sync_graph(self):
+        """
+        Write edge weights and node columns that the graph lacks to the graph
+
+        Output:
+            None
+        """
+        if not self.__stale_attributes:
+            return
+
+        self.__detach()
+        nodes = self.get_nodes()
+
+        for name in self.__stale_attributes:
+            if name == ContactNetwork.WJI:
+                n_nodes = self.edge_weights.shape[0]
+                upper = self.edge_keys // n_nodes <= self.edge_keys % n_nodes
+                keys = self.edge_keys[upper]
+                edges = zip(nodes[keys // n_nodes].tolist(),
+                            nodes[keys %  n_nodes].tolist())
+                nx.set_edge_attributes(
+                        self.__graph,
+                        values=dict(zip(edges, self.edge_weights.data[upper].tolist())),
+                        name=name)
+            else:
+                nx.set_node_attributes(
+                        self.__graph,
+                        values=dict(zip(nodes.tolist(), self.__node_columns[name].tolist())),
+                        name=name)
+
+        self.__stale_attributes = set()
 
     @staticmethod
     def __create_sorted_networkx_graph_from(nodes_or_edges):
@@ -140,8 +534,131 @@ class ContactNetwork:
         Output:
             edges (np.array): (n_edges,2) array of edges
         """
-        edges = np.loadtxt(filename, dtype=int, comments='#')
-        return edges
+        with open(filename) as f:
+            return ContactNetwork.__parse_edges(f.read())
+
+    @staticmethod
+    def __parse_edges(text):
+        """
+        Parse edges from the contents of a txt-file (pairs of integers, one per
+        line, with '#' comments)
+
+        This is equivalent to np.loadtxt(filename, dtype=int, comments='#'),
+        but faster.
+
+        Input:
+            text (str): contents of a txt-file with edges
+
+        Output:
+            edges (np.array): (n_edges,2) array of edges
+        """
+        if '#' in text:
+            text = re.sub('#[^\n]*', '', text)
+
+        # older numpy stops at the first malformed label, with a warning
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', DeprecationWarning)
+            try:
+                labels = np.fromstring(text, dtype=np.int64, sep=' ')
+            except (DeprecationWarning, ValueError):
+                labels = None
+
+        if labels is None or labels.size % 2 != 0:
+            raise ValueError(
+                    ContactNetwork.__name__
+                    + ": edges are not pairs of integers")
+
+        return labels.reshape(-1, 2)
+
+    @staticmethod
+    def __prepare_edges(
+            edges,
+            convert_labels_to_0N):
+        """
+        Compute the nodes, and the edges in the order in which from_files adds
+        them to the graph
+
+        Labels are converted to 0..N-1 in sorted order, as would
+        nx.convert_node_labels_to_integers(graph, ordering='sorted'); this adds
+        edges in the order of graph.edges, i.e. by smaller endpoint and then by
+        first appearance of the edge, which is reproduced here (so that the
+        graphs, including the order of their edges, are the same).
+
+        Input:
+            edges (np.array): (n_edges,2) array of edges, as loaded
+            convert_labels_to_0N (boolean): convert node labels to 0..N-1
+
+        Output:
+            nodes (np.array): (n_nodes,) sorted array of node labels
+            edges (np.array): (n_edges,2) array of edges
+        """
+        nodes = np.unique(edges)
+        if not convert_labels_to_0N:
+            return nodes, edges
+
+        edges = np.sort(np.searchsorted(nodes, edges), axis=1)
+        _, first = np.unique(edges, axis=0, return_index=True)
+        first = first[np.lexsort( (first, edges[first,0]) )]
+
+        return np.arange(nodes.size), edges[first]
+
+    @classmethod
+    def __load_cached_edges_from(
+            cls,
+            filename,
+            convert_labels_to_0N):
+        """
+        Load nodes and edges from the cache of a txt-file, or from the txt-file
+        itself (and then save them to the cache)
+
+        Input:
+            filename (str): path to a txt-file with edges
+            convert_labels_to_0N (boolean): convert node labels to 0..N-1
+
+        Output:
+            nodes (np.array): (n_nodes,) sorted array of node labels
+            edges (np.array): (n_edges,2) array of edges
+        """
+        with open(filename, 'rb') as f:
+            contents = f.read()
+        source_hash = hashlib.sha256(contents).hexdigest()
+        cache_filename = filename + '.npz'
+
+        try:
+            with np.load(cache_filename) as cache:
+                if (cache['version'] == cls.EDGES_CACHE_VERSION
+                        and cache['source_hash'] == source_hash
+                        and cache['convert_labels_to_0N'] == convert_labels_to_0N):
+                    return cache['nodes'], cache['edges']
+        except (OSError, KeyError, ValueError, EOFError, zipfile.BadZipFile):
+            pass # missing or corrupt (e.g. truncated) cache
+
+        nodes, edges = cls.__prepare_edges(
+                cls.__parse_edges(contents.decode()),
+                convert_labels_to_0N)
+
+        # written to a temporary file that replaces the cache at once, so that
+        # other processes loading the same network never read a partial cache
+        temporary_filename = None
+        try:
+            with tempfile.NamedTemporaryFile(
+                    dir=os.path.dirname(os.path.abspath(cache_filename)),
+                    prefix=os.path.basename(cache_filename) + '.',
+                    suffix='.tmp',
+                    delete=False) as cache_file:
+                temporary_filename = cache_file.name
+                np.savez(cache_file,
+                         version=cls.EDGES_CACHE_VERSION,
+                         source_hash=source_hash,
+                         convert_labels_to_0N=convert_labels_to_0N,
+                         nodes=nodes,
+                         edges=edges)
+            os.replace(temporary_filename, cache_filename)
+        except OSError: # e.g. a read-only directory; the cache is optional
+            if temporary_filename is not None and os.path.exists(temporary_filename):
+                os.remove(temporary_filename)
+
+        return nodes, edges
 
     @staticmethod
     def __load_node_groups_from(filename):
@@ -169,51 +686,6 @@ class ContactNetwork:
 
         return node_groups
 
-    def __check_correct_format(
-            self,
-            check_labels_are_0N):
-        """
-        Check whether the graph is in the correct format
-
-        The following is checked:
-            1. nodes are sorted in ascending order
-            2. total number of nodes is equal to "community + health workers"
-        If `check_labels_are_0N` is true then also check
-            3. all nodes are integers in the range 0..N-1
-
-        Input:
-            check_labels_are_0N (boolean): check that node labels are 0..N-1
-
-        Output:
-            None
-        """
-        n_checks = 3
-        correct_format = np.ones(n_checks, dtype=bool)
-        nodes = self.get_nodes()
-        n_nodes = self.get_node_count()
-
-        # 1. check
-        if not np.all(nodes[:-1] <= nodes[1:]): # if not "ascending order"
-            correct_format[0] = False
-
-        # 2. check
-        n_health_workers = self.get_health_workers().size
-        n_community = self.get_community().size
-        if n_health_workers + n_community != n_nodes:
-            correct_format[1] = False
-
-        # 3. check
-        if check_labels_are_0N:
-            if not np.array_equal(nodes, np.arange(n_nodes)):
-                correct_format[2] = False
-
-        if not correct_format.all():
-            raise ValueError(
-                    self.__class__.__name__
-                    + ": graph format is incorrect; "
-                    + "checks are: "
-                    + str(correct_format))
-
     def __convert_array_to_dict(
             self,
             array):
@@ -253,7 +725,7 @@ class ContactNetwork:
         Output:
             n_nodes (int): total number of nodes
         """
-        return self.graph.number_of_nodes()
+        return self.__graph.number_of_nodes()
 
     def get_edge_count(self):
         """
@@ -262,17 +734,36 @@ class ContactNetwork:
         Output:
             n_edges (int): total number of edges
         """
-        return self.graph.number_of_edges()
+        return self.__graph.number_of_edges()
 
     # TODO hide implementation, expose interfaces (i.e. delete get_graph)
+    @property
+    def graph(self):
+        """
+        Graph with all node and edge attributes written to it; read only, see
+        get_graph
+        """
+        self.__sync_graph()
+        return self.__graph
+
     def get_graph(self):
         """
         Get the graph
 
+        The graph can be mutated by the caller; hence it becomes the only copy
+        of the data, and the CSR matrix of edge weights and node columns are
+        rebuilt from it when needed. For read-only access, use the `graph`
+        property, which keeps them.
+
         Output:
             graph (nx.Graph): graph object with node and edge attributes
         """
-        return self.graph
+        self.__detach()
+        self.__sync_graph()
+        self.__node_columns = {}
+        self.__invalidate_edge_weights()
+
+        return self.__graph
 
     def get_neighbors(
             self,
@@ -299,7 +790,7 @@ class ContactNetwork:
         Output:
             nodes (np.array): (n_nodes,) array of node indices
         """
-        return np.array(self.graph.nodes)
+        return np.array(self.__graph.nodes)
 
     def get_edges(self):
         """
@@ -308,7 +799,7 @@ class ContactNetwork:
         Output:
             edges (np.array): (n_edges,2) array of pairs of node indices
         """
-        return np.array(self.graph.edges)
+        return np.array(self.__graph.edges)
 
     def get_incident_edges(
             self,
@@ -322,16 +813,62 @@ class ContactNetwork:
         Output:
             edges (list): list of tuples, each of which is an incident edge
         """
-        return list(self.graph.edges(node))
+        return list(self.__graph.edges(node))
 
     def get_edge_weights(self):
         """
         Get edge weights of the graph as a scipy.sparse matrix
 
+        The matrix is built from the graph once, and then kept in sync with it
+        by set_edge_weights, add_edges and remove_edges, so that it does not
+        need to be re-converted from networkx every time.
+
         Output:
             edge_weights (scipy.sparse.csr.csr_matrix): adjacency matrix
         """
-        return nx.to_scipy_sparse_matrix(self.graph, weight=ContactNetwork.WJI)
+        if self.edge_weights is None:
+            self.__build_edge_weights()
+
+        return self.edge_weights.copy()
+
+    def __invalidate_edge_weights(self):
+        """
+        Drop the CSR matrix of edge weights; it is rebuilt when needed
+
+        Output:
+            None
+        """
+        self.edge_weights = None
+        self.edge_keys = None
+
+    def __build_edge_weights(self):
+        """
+        Build the CSR matrix of edge weights (and its keys) from the graph; see
+        edge_weights_from_graph
+
+        Output:
+            None
+        """
+        self.edge_keys, self.edge_weights = edge_weights_from_graph(self.__graph)
+
+    def __set_edge_keys(
+            self,
+            keys,
+            data):
+        """
+        Reset the CSR matrix of edge weights from sorted keys and weights
+
+        Input:
+            keys (np.array): (nonzeros,) sorted array of keys of matrix entries
+            data (np.array): (nonzeros,) array of weights
+
+        Output:
+            None
+        """
+        self.edge_keys = keys
+        self.edge_weights = csr_matrix_from_edge_keys(keys,
+                                                      data,
+                                                      self.edge_weights.shape[0])
 
     def get_age_groups(self):
         """
@@ -340,9 +877,24 @@ class ContactNetwork:
         Output:
             age_groups (np.array): (n_nodes,) array of age groups
         """
-        age_groups_dict = nx.get_node_attributes(
-            self.graph, name=ContactNetwork.AGE_GROUP)
-        return np.fromiter(age_groups_dict.values(), dtype=int)
+        return self.get_node_attributes(ContactNetwork.AGE_GROUP).astype(int)
+
+    def set_age_groups(
+            self,
+            age_groups):
+        """
+        Set age_group attribute to the nodes
+
+        Input:
+            age_groups (int),
+                       (float): constant value to be assigned to all nodes
+                       (dict): a mapping node -> value
+                       (np.array): (n_nodes,) array of values
+
+        Output:
+            None
+        """
+        self.set_node_attributes(age_groups, ContactNetwork.AGE_GROUP)
 
     def get_lambdas(self):
         """
@@ -352,12 +904,8 @@ class ContactNetwork:
             λ_min (np.array): (n_nodes,) array of values
             λ_max (np.array): (n_nodes,) array of values
         """
-        λ_min_dict = nx.get_node_attributes(
-            self.graph, name=ContactNetwork.LAMBDA_MIN)
-        λ_max_dict = nx.get_node_attributes(
-            self.graph, name=ContactNetwork.LAMBDA_MAX)
-        return (np.fromiter(λ_min_dict.values(), dtype=float),
-                np.fromiter(λ_max_dict.values(), dtype=float))
+        return (self.get_node_attributes(ContactNetwork.LAMBDA_MIN),
+                self.get_node_attributes(ContactNetwork.LAMBDA_MAX))
 
     def get_lambda_integrated(self):
         """
@@ -366,9 +914,25 @@ class ContactNetwork:
         Output:
             λ_integrated (np.array): (n_nodes,) array of values
         """
-        λ_integrated_dict = nx.get_node_attributes(
-            self.graph, name=ContactNetwork.LAMBDA_INTEGRATED)
-        return np.fromiter(λ_integrated_dict.values(), dtype=float)    
+        return self.get_node_attributes(ContactNetwork.LAMBDA_INTEGRATED)
+
+    def get_node_attributes(
+            self,
+            name):
+        """
+        Get node attributes by name (for example, transition rates)
+
+        Input:
+            name (str): name of the attributes
+
+        Output:
+            values (np.array): (n_nodes,) array of values
+        """
+        if name in self.__node_columns:
+            return self.__node_columns[name].copy()
+
+        values_dict = nx.get_node_attributes(self.__graph, name=name)
+        return np.fromiter(values_dict.values(), dtype=float)
 
     def set_lambdas(
             self,
@@ -408,7 +972,7 @@ class ContactNetwork:
         Output:
             None
         """
-        self.__set_node_attributes(λ_min, ContactNetwork.LAMBDA_MIN)
+        self.set_node_attributes(λ_min, ContactNetwork.LAMBDA_MIN)
 
     def set_lambda_max(
             self,
@@ -425,7 +989,7 @@ class ContactNetwork:
         Output:
             None
         """
-        self.__set_node_attributes(λ_max, ContactNetwork.LAMBDA_MAX)
+        self.set_node_attributes(λ_max, ContactNetwork.LAMBDA_MAX)
 
     def set_lambda_integrated(
             self,
@@ -439,10 +1003,10 @@ class ContactNetwork:
         Output:
             None
         """
-        self.__set_node_attributes(λ_integrated, ContactNetwork.LAMBDA_INTEGRATED)
+        self.set_node_attributes(λ_integrated, ContactNetwork.LAMBDA_INTEGRATED)
 
 
-    def __set_node_attributes(
+    def set_node_attributes(
             self,
             values,
             name):
@@ -459,7 +1023,9 @@ class ContactNetwork:
         Output:
             None
         """
-        if isinstance(values, (int, float, dict)):
+        if name in ContactNetwork.COLUMN_ATTRIBUTES:
+            self.__set_node_column(values, name)
+        elif isinstance(values, (int, float, dict)):
             self.__set_node_attributes_const_dict(values, name)
         elif isinstance(values, np.ndarray):
             self.__set_node_attributes_array(values, name)
@@ -469,6 +1035,45 @@ class ContactNetwork:
                     + ": this type of argument is not supported: "
                     + values.__class__.__name__)
 
+    def __set_node_column(
+            self,
+            values,
+            name):
+        """
+        Set node attributes stored as a column (see COLUMN_ATTRIBUTES) by name
+
+        Input:
+            values (int),
+                   (float): constant value to be assigned to all nodes
+                   (dict): a mapping node -> value
+                   (np.array): (n_nodes,) array of values
+            name (str): name of the attributes
+
+        Output:
+            None
+        """
+        if isinstance(values, (int, float)):
+            column = np.full(self.get_node_count(), float(values))
+        elif isinstance(values, np.ndarray):
+            column = np.array(values, dtype=float)
+        elif isinstance(values, dict) and name in self.__node_columns:
+            column = self.__node_columns[name].copy()
+            if len(values) > 0:
+                positions = self.__locate_nodes(np.array(list(values.keys())))
+                column[positions] = np.fromiter(
+                        values.values(), dtype=float, count=len(values))
+        elif isinstance(values, dict): # nodes may be missing; kept in the graph
+            self.__set_node_attributes_const_dict(values, name)
+            return
+        else:
+            raise ValueError(
+                    self.__class__.__name__
+                    + ": this type of argument is not supported: "
+                    + values.__class__.__name__)
+
+        self.__node_columns[name] = column
+        self.__stale_attributes.add(name)
+
     def __set_node_attributes_const_dict(
             self,
             values,
@@ -485,7 +1090,8 @@ class ContactNetwork:
         Output:
             None
         """
-        nx.set_node_attributes(self.graph, values=values, name=name)
+        self.__detach()
+        nx.set_node_attributes(self.__graph, values=values, name=name)
 
     def __set_node_attributes_array(
             self,
@@ -525,22 +1131,22 @@ class ContactNetwork:
         Output:
             None
         """
-        self.__set_node_attributes(
+        self.set_node_attributes(
                 transition_rates.exposed_to_infected,
                 ContactNetwork.E_TO_I)
-        self.__set_node_attributes(
+        self.set_node_attributes(
                 transition_rates.infected_to_hospitalized,
                 ContactNetwork.I_TO_H)
-        self.__set_node_attributes(
+        self.set_node_attributes(
                 transition_rates.infected_to_resistant,
                 ContactNetwork.I_TO_R)
-        self.__set_node_attributes(
+        self.set_node_attributes(
                 transition_rates.infected_to_deceased,
                 ContactNetwork.I_TO_D)
-        self.__set_node_attributes(
+        self.set_node_attributes(
                 transition_rates.hospitalized_to_resistant,
                 ContactNetwork.H_TO_R)
-        self.__set_node_attributes(
+        self.set_node_attributes(
                 transition_rates.hospitalized_to_deceased,
                 ContactNetwork.H_TO_D)
 
@@ -557,8 +1163,14 @@ class ContactNetwork:
         Output:
             None
         """
-        nx.set_edge_attributes(
-                self.graph, values=edge_weights, name=ContactNetwork.WJI)
+        if self.edge_weights is None:
+            self.__build_edge_weights()
+
+        self.edge_weights = set_edge_weights_of(self.edge_keys,
+                                                self.edge_weights,
+                                                self.get_nodes(),
+                                                edge_weights)
+        self.__stale_attributes.add(ContactNetwork.WJI)
 
     def add_edges(
             self,
@@ -571,7 +1183,23 @@ class ContactNetwork:
         Output:
             None
         """
-        self.graph.add_edges_from(edges)
+        self.__detach()
+        self.__graph.add_edges_from(edges)
+
+        if self.edge_weights is None or len(edges) == 0:
+            return
+
+        # new nodes change the shape; rebuild the matrix from the graph then,
+        # and keep node attributes in the graph (new nodes have none)
+        if self.get_node_count() != self.edge_weights.shape[0]:
+            self.__sync_graph()
+            self.__node_columns = {}
+            self.__invalidate_edge_weights()
+            return
+
+        keys, _ = compute_edge_keys(self.get_nodes(), np.array(list(edges)))
+        self.__set_edge_keys(
+                *insert_edge_keys(self.edge_keys, self.edge_weights.data, keys))
 
     def remove_edges(
             self,
@@ -584,7 +1212,15 @@ class ContactNetwork:
         Output:
             None
         """
-        self.graph.remove_edges_from(edges)
+        self.__detach()
+        self.__graph.remove_edges_from(edges)
+
+        if self.edge_weights is None or len(edges) == 0:
+            return
+
+        keys, _ = compute_edge_keys(self.get_nodes(), np.array(list(edges)))
+        self.__set_edge_keys(
+                *delete_edge_keys(self.edge_keys, self.edge_weights.data, keys))
 
     @staticmethod
     def __draw_from(
@@ -680,7 +1316,7 @@ class ContactNetwork:
         age_groups[health_workers] = age_groups_health_workers
         age_groups[community]      = age_groups_community
 
-        self.__set_node_attributes(age_groups, ContactNetwork.AGE_GROUP)
+        self.set_age_groups(age_groups)
 
     def isolate(
             self,
@@ -727,18 +1363,46 @@ class ContactNetwork:
         self.graph, plus maybe additional ones.
 
         Input:
-            contact_network (ContactNetwork): object to update from
+            contact_network (ContactNetwork),
+                            (ArrayContactNetwork): object to update from
 
         Output:
             None
         """
+        from .array_contact_network import ArrayContactNetwork
+
         nodes = self.get_nodes()
-        contact_graph = contact_network.get_graph()
-        contact_subgraph = contact_graph.subgraph(nodes)
+        if isinstance(contact_network, ArrayContactNetwork):
+            contact_graph = contact_network.graph # read only; see get_graph
+        else:
+            # edge weights and columns missing from the graph are sliced below,
+            # so that a shared graph need not be copied to write them
+            contact_graph = contact_network.__graph
 
         # nx.Graph.update does not delete edges; hence this workaround
-        self.graph = self.__create_sorted_networkx_graph_from(nodes)
-        self.graph.update(contact_subgraph)
+        self.__graph = self.__create_sorted_networkx_graph_from(nodes)
+        self.__graph.update(contact_graph.subgraph(nodes))
+        self.__shared = False
+
+        self.__node_columns = {}
+        self.__stale_attributes = set()
+        self.__invalidate_edge_weights()
+
+        if isinstance(contact_network, ArrayContactNetwork):
+            return
+
+        positions = contact_network.__locate_nodes(self.get_nodes())
+        self.__node_columns = {
+                name: column[positions]
+                for name, column in contact_network.__node_columns.items() }
+        self.__stale_attributes = set(self.__node_columns)
+
+        if ContactNetwork.WJI in contact_network.__stale_attributes:
+            edge_weights = contact_network.edge_weights[positions][:, positions]
+            edge_weights.sort_indices()
+            self.edge_keys = edge_keys_of(edge_weights)
+            self.edge_weights = edge_weights
+            self.__stale_attributes.add(ContactNetwork.WJI)
 
     # TODO extract into a separate class
     @staticmethod
@@ -1,49 +1,87 @@
 import copy
+from math import comb
 import numpy as np
 from numba.core import types
 from numba.typed import Dict
-from numba import njit
+from numba import njit, prange
 import networkx as nx
 
-from .utilities import normalize
+# methods of computing contact inception times (see ContactSimulator.METHODS)
+INCEPTION_TRAPEZOIDAL = 0
+INCEPTION_LOOKUP      = 1
+INCEPTION_THINNING    = 2
 
 @njit
-def initialize_state(active_contacts, event_time, overshoot_duration, edge_state):
+def edge_key(edge):
     """
-    Initialize active_contacts, event_time, overshoot_duration to the state in edge_state.
+    Compute the key of a normalized edge (n, m), n >= m, for the edge index
     """
-    for i, state in enumerate(edge_state.values()):
-        active_contacts[i] = state[0]
-        event_time[i] = state[1]
-        overshoot_duration[i] = state[2]
+    return (np.int64(edge[0]) << 32) | np.int64(edge[1])
+
+def normalize_edges(edges):
+    """
+    Normalize an (n_edges,2) array of edges by placing largest node id first;
+    see utilities.normalize.
+    """
+    edges = np.array(edges, dtype=np.int64).reshape(-1, 2)
+    return np.sort(edges, axis=1)[:, ::-1]
 
 @njit
-def synchronize_state(edge_state, active_contacts, event_time, overshoot_duration):
+def build_edge_index(edges, edge_alive, n_slots):
     """
-    Synchronize the edge_state with active_contacts, event_time, and the overshoot_duration.
+    Build the hash index edge key -> slot of the live edges among n_slots slots.
     """
-    for i, edge in enumerate(edge_state):
-        edge_state[edge] = (active_contacts[i], event_time[i], overshoot_duration[i])
+    edge_index = Dict.empty(key_type=types.int64, value_type=types.int64)
+    for i in range(n_slots):
+        if edge_alive[i]:
+            edge_index[edge_key(edges[i])] = i
 
-def remove_edges(edge_state, edge_list):
+    return edge_index
+
+@njit
+def remove_edges(edge_index, edge_alive, edges):
     """
-    Delete edges in edge_list from edge_state.
+    Tombstone (normalized) edges, and delete them from the edge index.
+
+    Returns a mask of the edges that were not found.
     """
-    if len(edge_list) > 0:
-        for edge in edge_list:
-            try:
-                del edge_state[edge]
-            except:
-                print(edge, "not found in edge_state, perhaps because",
-                      edge[0], "and", edge[1], "are both hospitalized.")
-                pass
+    not_found = np.zeros(edges.shape[0], dtype=np.bool_)
+    for k in range(edges.shape[0]):
+        key = edge_key(edges[k])
+        if key in edge_index:
+            edge_alive[edge_index[key]] = False
+            del edge_index[key]
+        else:
+            not_found[k] = True
 
-def add_edges(edge_state, edge_list):
+    return not_found
+
+@njit
+def add_edges(edge_index, edge_nodes, edge_alive, active_contacts, event_time,
+              overshoot_duration, n_slots, edges, time):
     """
-    Add edges from edge_list to edge_state with default initial values.
+    Add (normalized) edges with default initial state, appending them at slot
+    n_slots onward; edges that are present already have their state reset.
+
+    Returns the new number of used slots.
     """
-    if len(edge_list) > 0:
-        edge_state.update({ edge: (False, 0.0, 0.0) for edge in map(normalize, edge_list) })
+    for k in range(edges.shape[0]):
+        key = edge_key(edges[k])
+        if key in edge_index:
+            i = edge_index[key]
+        else:
+            i = n_slots
+            n_slots += 1
+            edge_index[key] = i
+            edge_alive[i] = True
+            edge_nodes[i, 0] = edges[k, 0]
+            edge_nodes[i, 1] = edges[k, 1]
+
+        active_contacts[i] = False
+        event_time[i] = time
+        overshoot_duration[i] = 0.0
+
+    return n_slots
 
 @njit
 def calculate_inception_rates(
@@ -51,37 +89,104 @@ def calculate_inception_rates(
         night_inception_rate,
         nodal_day_inception_rate,
         nodal_night_inception_rate,
-        edge_state):
+        edges,
+        n_slots):
     """
     Calculate inception rates for each contact given the settings for each node
     """
 
-    for i, edge in enumerate(edge_state):
+    for i in range(n_slots):
+
+        day_inception_rate[i] = np.minimum(nodal_day_inception_rate[edges[i, 0]],
+                                           nodal_day_inception_rate[edges[i, 1]])
+
+        night_inception_rate[i] = np.minimum(nodal_night_inception_rate[edges[i, 0]],
+                                             nodal_night_inception_rate[edges[i, 1]])
 
-        day_inception_rate[i] = np.minimum(nodal_day_inception_rate[edge[0]],
-                                           nodal_day_inception_rate[edge[1]])
+@njit
+def build_node_incidence(edges, n_slots, n_nodes):
+    """
+    Build the incidence node -> slots of the first n_slots slots, in CSR form:
+    the slots of node n are slots[offsets[n]:offsets[n+1]].
+    """
+    offsets = np.zeros(n_nodes + 1, dtype=np.int64)
+    for i in range(n_slots):
+        offsets[edges[i, 0] + 1] += 1
+        offsets[edges[i, 1] + 1] += 1
+    offsets = np.cumsum(offsets)
 
-        night_inception_rate[i] = np.minimum(nodal_night_inception_rate[edge[0]],
-                                             nodal_night_inception_rate[edge[1]])
+    slots = np.empty(offsets[-1], dtype=np.int64)
+    fill = offsets[:-1].copy()
+    for i in range(n_slots):
+        for node in (edges[i, 0], edges[i, 1]):
+            slots[fill[node]] = i
+            fill[node] += 1
 
-def generate_edge_state(edges):
+    return offsets, slots
+
+@njit
+def update_inception_rates(
+        day_inception_rate,
+        night_inception_rate,
+        nodal_day_inception_rate,
+        nodal_night_inception_rate,
+        edges,
+        changed_nodes,
+        incidence_offsets,
+        incidence_slots,
+        n_indexed_slots,
+        n_slots):
     """
-    Generate an empty edge state (ordered) numba dictionary corresponding to the current
-    contact network.
+    Recalculate inception rates of the contacts incident to changed_nodes, and
+    of the slots from n_indexed_slots on (not covered by the incidence)
     """
-    edge_state = Dict.empty(key_type = types.Tuple((types.int64, types.int64)),
-                            value_type = types.Tuple((types.boolean, types.float64, types.float64)))
+    for node in changed_nodes:
+        for j in range(incidence_offsets[node], incidence_offsets[node+1]):
+            i = incidence_slots[j]
+
+            day_inception_rate[i] = np.minimum(nodal_day_inception_rate[edges[i, 0]],
+                                               nodal_day_inception_rate[edges[i, 1]])
+
+            night_inception_rate[i] = np.minimum(nodal_night_inception_rate[edges[i, 0]],
+                                                 nodal_night_inception_rate[edges[i, 1]])
 
-    edge_state.update({ edge: (False, 0.0, 0.0) for edge in map(normalize, edges) })
+    for i in range(n_indexed_slots, n_slots):
 
-    return edge_state
+        day_inception_rate[i] = np.minimum(nodal_day_inception_rate[edges[i, 0]],
+                                           nodal_day_inception_rate[edges[i, 1]])
+
+        night_inception_rate[i] = np.minimum(nodal_night_inception_rate[edges[i, 0]],
+                                             nodal_night_inception_rate[edges[i, 1]])
 
 class ContactSimulator:
     """
     Simulates the total contact time between people within a time interval
     using a birth/death process given a mean contact rate, and a mean contact duration.
+
+    Edges are stored as a table of arrays (struct of arrays): the i-th slot of
+    self.edges, self.active_contacts, self.event_time etc. holds the i-th
+    edge. Removed edges are tombstoned (self.edge_alive[i] = False), and added
+    edges are appended; slots are compacted when tombstones pile up, or when
+    the buffer runs out. self.edge_index maps edges to their slots.
+
+    Inception rates of contacts are only recalculated for the contacts of the
+    nodes whose rates changed since the previous run (through the incidence
+    node -> slots, self.node_incidence), and for the slots appended since the
+    incidence was built.
     """
 
+    # fraction of tombstoned slots that triggers compaction
+    TOMBSTONES_COMPACTION_FRACTION = 0.25
+
+    # fraction of slots not covered by the node incidence (appended since it
+    # was built), relative to the covered ones, that triggers its rebuild
+    INCIDENCE_REBUILD_FRACTION = 0.25
+
+    METHODS = {
+            'trapezoidal' : INCEPTION_TRAPEZOIDAL,
+            'lookup'      : INCEPTION_LOOKUP,
+            'thinning'    : INCEPTION_THINNING }
+
     def __init__(
             self,
             original_edges,
@@ -93,7 +198,10 @@ class ContactSimulator:
             start_time = 0.0,
             buffer_margin = 1,
             rate_integral_increment = 0.05,
-            seed = None):
+            seed = None,
+            counter_based_rng = False,
+            method = 'trapezoidal',
+            mean_field = False):
         """
         Args
         ----
@@ -118,23 +226,70 @@ class ContactSimulator:
                                          Must be much shorter than one day when the inception rate varies
                                          diurnally. The default 0.05 is barely large enough to resolve
                                          diurnal variation.
+
+        seed (int): Seed of the generator of initial contact activity and, with counter_based_rng,
+                    of the contact simulation.
+
+        counter_based_rng (bool): Whether to simulate contacts in parallel with counter-based random
+                                  streams (Philox keyed on seed, edge and interval), which makes
+                                  results independent of the number of threads and of numba's
+                                  global random state; otherwise, contacts are simulated serially
+                                  with numba's global random state (see seed_numba_random_state).
+
+        method (str): How contact inception times are computed from the diurnal inception rate:
+                      'trapezoidal' integrates the rate with rate_integral_increment steps;
+                      'lookup' inverts its integral exactly, by a table lookup within a day and
+                      analytically over whole days; 'thinning' samples candidate inceptions at the
+                      peak rate and accepts them with probability λ(t) / λmax (Lewis-Shedler).
+
+        mean_field (bool): Whether to compute the expected contact duration of each edge instead of
+                           simulating contacts; the probability that each edge is active is then
+                           propagated between intervals, and method, seed and counter_based_rng
+                           do not affect the edge weights.
         """
-        # TODO implement Edges and use original_edges.get_count()
-        n_contacts = len(original_edges)
+        if method not in self.METHODS:
+            raise ValueError(
+                    self.__class__.__name__
+                    + ": this value of 'method' is not supported: "
+                    + method)
+        self.method = method
+        self.mean_field = mean_field
+
+        # normalized edges without duplicates, in their original order
+        edges = normalize_edges(original_edges)
+        _, first = np.unique(edges, axis=0, return_index=True)
+        edges = edges[np.sort(first)]
+
+        n_contacts = edges.shape[0]
         self.mean_degree = mean_degree
 
         self.buffer_margin = buffer_margin
-        self.buffer = int(np.round(n_contacts * self.buffer_margin))
+        self.buffer = max(int(np.round(n_contacts * self.buffer_margin)),
+                          n_contacts)
+
+        self.edges = np.zeros( (self.buffer, 2), dtype=np.int64)
+        self.edges[:n_contacts] = edges
+        self.edge_alive = np.zeros(self.buffer, dtype=bool)
+        self.edge_alive[:n_contacts] = True
+        self.n_slots = n_contacts
+        self.edge_index = build_edge_index(self.edges,
+                                           self.edge_alive,
+                                           self.n_slots)
 
-        self.edge_state = generate_edge_state(original_edges)
         self.time = start_time
         self.mean_event_lifetime = mean_event_lifetime
         self.rate_integral_increment = rate_integral_increment
 
         self.rng = np.random.default_rng(seed)
 
-        # Initialize the active contacts
+        self.counter_based_rng = counter_based_rng
+        self.rng_key = np.uint64(seed if seed is not None
+                                 else self.rng.integers(2**63))
+        self.n_intervals = 0
+
+        # Initialize the active contacts, and the probability of activity (mean_field)
         self.active_contacts = np.zeros(self.buffer, dtype=bool)
+        self.activation_probability = np.zeros(self.buffer)
 
         if initialize_contacts:
             λ = night_inception_rate / mean_degree
@@ -150,6 +305,7 @@ class ContactSimulator:
                                               p=[inactive_probability, active_probability])
 
             self.active_contacts[:n_contacts] = active_contacts
+            self.activation_probability[:n_contacts] = active_probability
 
         self.contact_duration = np.zeros(self.buffer)
         self.overshoot_duration = np.zeros(self.buffer)
@@ -161,6 +317,15 @@ class ContactSimulator:
 
         self.interval_stop_time = start_time
         self.interval_start_time = 0.0
+
+        # nodal rates of the previous run, and incidence node -> slots of the first n_indexed_slots
+        self.nodal_day_inception_rate = None
+        self.nodal_night_inception_rate = None
+        self.node_incidence = None
+        self.n_indexed_slots = 0
+
+        # (integration_steps, λnight, λday, rate) of the last diurnally averaged activation rate
+        self.activation_rate_cache = None
         
 
     # TODO implement conversion from int/float to array for nodal rates
@@ -174,67 +339,194 @@ class ContactSimulator:
             edges_to_add=set()):
         """
         Simulate time-dependent contacts with a birth/death process.
+
+        current_edges is not used (the edges are tracked by the edge table
+        through edges_to_remove and edges_to_add), and is kept for backward
+        compatibility.
         """
 
         if stop_time <= self.interval_stop_time:
             raise ValueError("Stop time is not greater than previous interval stop time!")
 
-        # TODO implement Edges
-        n_contacts = len(current_edges)
-
         # Fiddle with the contact state if edges have been added or deleted
         if len(edges_to_add) > 0 or len(edges_to_remove) > 0:
+            self.__remove_edges(edges_to_remove)
+            self.__add_edges(edges_to_add)
 
-            if n_contacts > self.buffer: # resize the buffer
-
-                self.buffer = int(np.round(n_contacts * self.buffer_margin))
-
-                self.contact_duration = np.zeros(self.buffer)
-                self.active_contacts = np.zeros(self.buffer)
-                self.overshoot_duration = np.zeros(self.buffer)
-                self.event_time = np.zeros(self.buffer)
-                self.day_inception_rate = np.zeros(self.buffer)
-                self.night_inception_rate = np.zeros(self.buffer)
-
-            # First, synchronize current edge state prior to hospitalization
-            synchronize_state(self.edge_state, self.active_contacts, self.event_time, self.overshoot_duration)
-
-            # Find edges to add and remove
-            normalized_removals = set()
-            normalized_removals.update(map(normalize, edges_to_remove))
-
-            normalized_additions = set()
-            normalized_additions.update(map(normalize, edges_to_add))
-
-            remove_edges(self.edge_state, normalized_removals)
-            add_edges(self.edge_state, normalized_additions)
-
-            # Reinitialize the state with the new edge list
-            initialize_state(self.active_contacts, self.event_time, self.overshoot_duration, self.edge_state)
-
-        # Re-estimate day_inception_rate and night_inception_rate. This is relatively expensive.
-        calculate_inception_rates(self.day_inception_rate, self.night_inception_rate,
-                                  nodal_day_inception_rate, nodal_night_inception_rate,
-                                  self.edge_state)
+        # Re-estimate day_inception_rate and night_inception_rate.
+        self.__update_inception_rates(nodal_day_inception_rate, nodal_night_inception_rate)
 
         # Simulate contacts using a time-dependent Gillespie algorithm for a birth death process
-        # with varying birth rate.
-        simulate_contacts(n_contacts,
-                          stop_time,
-                          self.event_time,
-                          self.contact_duration,
-                          self.overshoot_duration,
-                          self.active_contacts,
-                          self.night_inception_rate,
-                          self.day_inception_rate,
-                          self.mean_event_lifetime,
-                          self.rate_integral_increment,
-                          self.mean_degree)
+        # with varying birth rate, or compute their expected duration.
+        if self.mean_field:
+            simulate_mean_field_contacts(self.n_slots,
+                                         self.edge_alive,
+                                         self.interval_stop_time,
+                                         stop_time,
+                                         self.activation_probability,
+                                         self.contact_duration,
+                                         self.night_inception_rate,
+                                         self.day_inception_rate,
+                                         self.mean_event_lifetime,
+                                         self.rate_integral_increment,
+                                         self.mean_degree)
+        elif self.counter_based_rng:
+            simulate_contacts_counter_based(self.n_slots,
+                                            self.edge_alive,
+                                            self.edges,
+                                            self.rng_key,
+                                            self.n_intervals,
+                                            stop_time,
+                                            self.event_time,
+                                            self.contact_duration,
+                                            self.overshoot_duration,
+                                            self.active_contacts,
+                                            self.night_inception_rate,
+                                            self.day_inception_rate,
+                                            self.mean_event_lifetime,
+                                            self.rate_integral_increment,
+                                            self.METHODS[self.method],
+                                            self.mean_degree)
+        else:
+            simulate_contacts(self.n_slots,
+                              self.edge_alive,
+                              stop_time,
+                              self.event_time,
+                              self.contact_duration,
+                              self.overshoot_duration,
+                              self.active_contacts,
+                              self.night_inception_rate,
+                              self.day_inception_rate,
+                              self.mean_event_lifetime,
+                              self.rate_integral_increment,
+                              self.METHODS[self.method],
+                              self.mean_degree)
+
+        self.n_intervals += 1
 
         # Record the start and stop times of the current simulation interval
         self.interval_start_time = self.interval_stop_time
         self.interval_stop_time = stop_time
 
+    def __update_inception_rates(self, nodal_day_inception_rate, nodal_night_inception_rate):
+        """
+        Recalculate inception rates of the contacts whose nodal rates changed
+        since the previous run, or of all contacts when too many slots are not
+        covered by the incidence (which is then rebuilt).
+        """
+        nodal_day_inception_rate = np.array(nodal_day_inception_rate, dtype=float)
+        nodal_night_inception_rate = np.array(nodal_night_inception_rate, dtype=float)
+
+        if (self.node_incidence is None
+                or self.nodal_day_inception_rate.shape != nodal_day_inception_rate.shape
+                or self.nodal_night_inception_rate.shape != nodal_night_inception_rate.shape
+                or (self.n_slots - self.n_indexed_slots
+                    > self.INCIDENCE_REBUILD_FRACTION * self.n_indexed_slots)):
+            calculate_inception_rates(self.day_inception_rate, self.night_inception_rate,
+                                      nodal_day_inception_rate, nodal_night_inception_rate,
+                                      self.edges, self.n_slots)
+
+            self.node_incidence = build_node_incidence(self.edges,
+                                                       self.n_slots,
+                                                       nodal_day_inception_rate.size)
+            self.n_indexed_slots = self.n_slots
+        else:
+            changed_nodes = np.flatnonzero(
+                    (nodal_day_inception_rate != self.nodal_day_inception_rate)
+                    | (nodal_night_inception_rate != self.nodal_night_inception_rate))
+
+            update_inception_rates(self.day_inception_rate, self.night_inception_rate,
+                                   nodal_day_inception_rate, nodal_night_inception_rate,
+                                   self.edges,
+                                   changed_nodes,
+                                   *self.node_incidence,
+                                   self.n_indexed_slots,
+                                   self.n_slots)
+
+        self.nodal_day_inception_rate = nodal_day_inception_rate
+        self.nodal_night_inception_rate = nodal_night_inception_rate
+
+    def __remove_edges(self, edges_to_remove):
+        """
+        Tombstone edges of the edge table.
+        """
+        if len(edges_to_remove) == 0:
+            return
+
+        removals = np.unique(normalize_edges(list(edges_to_remove)), axis=0)
+        not_found = remove_edges(self.edge_index, self.edge_alive, removals)
+
+        for edge in removals[not_found]:
+            print(tuple(edge.tolist()), "not found in the edge table, perhaps because",
+                  edge[0], "and", edge[1], "are both hospitalized.")
+
+    def __add_edges(self, edges_to_add):
+        """
+        Append edges to the edge table, compacting it first if needed.
+        """
+        n_tombstones = self.n_slots - np.count_nonzero(self.edge_alive[:self.n_slots])
+
+        if len(edges_to_add) == 0:
+            additions = np.empty( (0, 2), dtype=np.int64)
+        else:
+            additions = np.unique(normalize_edges(list(edges_to_add)), axis=0)
+
+        if (self.n_slots + additions.shape[0] > self.buffer
+                or n_tombstones > self.TOMBSTONES_COMPACTION_FRACTION * self.n_slots):
+            self.__compact_edge_table(additions.shape[0])
+
+        # new edges start at the end of the last simulated interval, inactive
+        n_slots = self.n_slots
+        self.n_slots = add_edges(self.edge_index,
+                                 self.edges,
+                                 self.edge_alive,
+                                 self.active_contacts,
+                                 self.event_time,
+                                 self.overshoot_duration,
+                                 self.n_slots,
+                                 additions,
+                                 self.interval_stop_time)
+        self.activation_probability[n_slots:self.n_slots] = 0.0
+
+    def __compact_edge_table(self, n_additional):
+        """
+        Move live edges to the first slots (in order), dropping tombstones, and
+        resize the buffer if n_additional edges would not fit otherwise.
+        """
+        live = np.flatnonzero(self.edge_alive[:self.n_slots])
+        n_live = live.size
+
+        if n_live + n_additional > self.buffer:
+            self.buffer = max(int(np.round((n_live + n_additional) * self.buffer_margin)),
+                              n_live + n_additional)
+
+        def compact(array):
+            compacted = np.zeros( (self.buffer,) + array.shape[1:], dtype=array.dtype)
+            compacted[:n_live] = array[live]
+            return compacted
+
+        self.edges                = compact(self.edges)
+        self.edge_alive           = compact(self.edge_alive)
+        self.active_contacts      = compact(self.active_contacts)
+        self.activation_probability = compact(self.activation_probability)
+        self.event_time           = compact(self.event_time)
+        self.overshoot_duration   = compact(self.overshoot_duration)
+        self.contact_duration     = compact(self.contact_duration)
+        self.day_inception_rate   = compact(self.day_inception_rate)
+        self.night_inception_rate = compact(self.night_inception_rate)
+
+        self.n_slots = n_live
+        self.node_incidence = None
+        self.edge_index = build_edge_index(self.edges,
+                                           self.edge_alive,
+                                           self.n_slots)
+
+    def get_active_contacts(self):
+        """
+        Get the contact activity of the edges, in the order of the edge table.
+        """
+        return self.active_contacts[:self.n_slots][self.edge_alive[:self.n_slots]]
+
     def compute_edge_weights(self):
         """
         Compute and return edge weights using simulation results
@@ -243,8 +535,12 @@ class ContactSimulator:
             edge_weights (dict): mapping edge -> weight
         """
         time_interval = self.interval_stop_time - self.interval_start_time
-        edge_weights = { edge: self.contact_duration[i] / time_interval
-                         for i, edge in enumerate(self.edge_state) }
+
+        live = self.edge_alive[:self.n_slots]
+        edges = self.edges[:self.n_slots][live]
+        weights = self.contact_duration[:self.n_slots][live] / time_interval
+
+        edge_weights = dict(zip(map(tuple, edges.tolist()), weights))
 
         return edge_weights
 
@@ -277,25 +573,36 @@ class ContactSimulator:
         """
         #NB 1 day = 1
         
-        λnight = nodal_night_inception_rate
-        λday = nodal_day_inception_rate
+        λnight = np.asarray(nodal_night_inception_rate, dtype=float)
+        λday = np.asarray(nodal_day_inception_rate, dtype=float)
+
+        # nodal rates usually change only when an intervention runs
+        if (self.activation_rate_cache is not None
+                and self.activation_rate_cache[0] == integration_steps
+                and np.array_equal(self.activation_rate_cache[1], λnight)
+                and np.array_equal(self.activation_rate_cache[2], λday)):
+            return self.activation_rate_cache[3].copy()
 
+        #evaluate diurnally varying contact rate on mesh, shape (λday.size, integration_steps+1)
         integration_mesh = np.linspace(0,1,integration_steps+1)
-        #evaluate diurnally varying contact rate on mesh
-        diurnal_on_mesh = np.zeros((λday.size,integration_steps+1))
-        for idx,t in enumerate(integration_mesh):
-            diurnal_on_mesh[:,idx] = diurnal_inception_rate(λnight, λday, self.mean_degree,t) 
-        
+        diurnal_profile_on_mesh = (1 - np.cos(np.pi * integration_mesh)**4)**4
+        diurnal_on_mesh = 1. / self.mean_degree * np.maximum(
+                λnight[:,np.newaxis], λday[:,np.newaxis] * diurnal_profile_on_mesh)
+
         #trapezoid integration over mesh
-        λi = 0.5*(diurnal_on_mesh[:,0] + diurnal_on_mesh[:,-1])
-        λi += np.sum(diurnal_on_mesh[:,1:-1],axis=1) 
-        λi *= 1 / integration_steps
+        trapezoid_weights = np.full(integration_steps+1, 1 / integration_steps)
+        trapezoid_weights[[0,-1]] *= 0.5
+        λi = diurnal_on_mesh @ trapezoid_weights
 
         # calculate the nodal activation from this 
         μ = 1/self.mean_event_lifetime
         diurnally_averaged_nodal_activation_rate = λi / (μ + λi)
 
-        
+        self.activation_rate_cache = (integration_steps,
+                                      λnight.copy(),
+                                      λday.copy(),
+                                      diurnally_averaged_nodal_activation_rate.copy())
+
         return diurnally_averaged_nodal_activation_rate
 
 # For implementation of Gillespie simulation with time-dependent rates, see discussion in
@@ -309,9 +616,178 @@ class ContactSimulator:
 def diurnal_inception_rate(λnight, λday, mean_degree, t):
     return 1. / mean_degree * np.maximum(λnight, λday * (1 - np.cos(np.pi * t)**4)**4)
 
+# The diurnal profile f(t) = (1 - cos(πt)⁴)⁴ of the inception rate
+#
+#       λ(t) = 1 / mean_degree * max(λnight, λday * f(t))
+#
+# is a trigonometric polynomial, f(t) = Σ a_k cos(2πkt), k = 0..8 (expand the
+# binomial, and use the power-reduction formula for cos²ⁿ). Hence its integral
+# F(t) = ∫₀ᵗ f(s) ds is known exactly; F is tabulated over one day to locate
+# the solution of F(t) = value by binary search, which is then polished by a
+# Newton step.
+#
+# f increases on [0, 1/2] and decreases on [1/2, 1]; hence λ(t) is constant
+# (the night rate) outside of [a, 1 - a], where a solves λday * f(a) = λnight.
+
+def compute_diurnal_profile_coefficients():
+    """
+    Compute coefficients a_k of f(t) = (1 - cos(πt)⁴)⁴ = Σ a_k cos(2πkt)
+    """
+    coefficients = np.zeros(9)
+    for j in range(5):
+        n = 2 * j # cos⁴ʲ = cos²ⁿ
+        weight = comb(4, j) * (-1)**j / 4**n
+        coefficients[0] += weight * comb(2*n, n)
+        for k in range(1, n + 1):
+            coefficients[k] += weight * 2 * comb(2*n, n - k)
+
+    return coefficients
+
+DIURNAL_PROFILE_COEFFICIENTS = compute_diurnal_profile_coefficients()
+DIURNAL_TABLE_SIZE = 1024
+
+@njit
+def diurnal_profile(t):
+    return (1 - np.cos(np.pi * t)**4)**4
+
+@njit
+def diurnal_profile_integral(t):
+    """
+    Compute F(t) = ∫₀ᵗ f(s) ds exactly
+    """
+    integral = DIURNAL_PROFILE_COEFFICIENTS[0] * t
+    for k in range(1, DIURNAL_PROFILE_COEFFICIENTS.size):
+        integral += (DIURNAL_PROFILE_COEFFICIENTS[k]
+                     * np.sin(2 * np.pi * k * t) / (2 * np.pi * k))
+
+    return integral
+
+DIURNAL_TABLE = np.array([diurnal_profile_integral(t)
+                          for t in np.linspace(0, 1, DIURNAL_TABLE_SIZE + 1)])
+
+@njit
+def invert_diurnal_profile_integral(value):
+    """
+    Solve F(t) = value for t in [0, 1], where 0 <= value <= F(1)
+    """
+    k = np.searchsorted(DIURNAL_TABLE, value) - 1
+    k = min(max(k, 0), DIURNAL_TABLE_SIZE - 1)
+
+    # linear interpolation within the table cell...
+    h = 1.0 / DIURNAL_TABLE_SIZE
+    t = (k + (value - DIURNAL_TABLE[k])
+            / (DIURNAL_TABLE[k+1] - DIURNAL_TABLE[k])) * h
+
+    # ...and a Newton step (f vanishes only at t = 0, 1)
+    f = diurnal_profile(t)
+    if f > 0:
+        t -= (diurnal_profile_integral(t) - value) / f
+
+    return min(max(t, k * h), (k + 1) * h)
+
+@njit
+def normalized_diurnal_rate_integral(r, a, t):
+    """
+    Compute G(t) = ∫₀ᵗ max(r, f(s)) ds for t in [0, 1], where r = λnight / λday
+    and f(a) = r
+    """
+    if t <= a:
+        return r * t
+    elif t <= 1 - a:
+        return r * a + diurnal_profile_integral(t) - diurnal_profile_integral(a)
+    else:
+        return (r * a + diurnal_profile_integral(1 - a)
+                - diurnal_profile_integral(a) + r * (t - 1 + a))
+
+@njit
+def invert_normalized_diurnal_rate_integral(r, a, value):
+    """
+    Solve G(t) = value for t in [0, 1]; see normalized_diurnal_rate_integral
+    """
+    G_a = r * a
+    G_1a = normalized_diurnal_rate_integral(r, a, 1 - a)
+
+    if value <= G_a:
+        return value / r
+    elif value <= G_1a:
+        return invert_diurnal_profile_integral(
+                value - G_a + diurnal_profile_integral(a))
+    else:
+        return 1 - a + (value - G_1a) / r
+
+@njit
+def diurnal_inception_time_step(λnight, λday, mean_degree, t, τ):
+    """
+    Solve τ = ∫ λ(s) ds from t to t + time_step for time_step, where λ is the
+    diurnal_inception_rate; returns np.inf if λ vanishes.
+    """
+    if λday <= λnight: # the rate is constant
+        if λnight <= 0:
+            return np.inf
+        return τ * mean_degree / λnight
+
+    r = λnight / λday
+    a = np.arccos((1 - r**0.25)**0.25) / np.pi
+
+    # in units of G, and from the start of the day of t
+    day = np.floor(t)
+    value = τ * mean_degree / λday + normalized_diurnal_rate_integral(r, a, t - day)
+
+    # full days are integrated analytically
+    G_day = normalized_diurnal_rate_integral(r, a, 1.0)
+    n_days = np.floor(value / G_day)
+    value -= n_days * G_day
+
+    return day + n_days + invert_normalized_diurnal_rate_integral(r, a, value) - t
+
 @njit
 def simulate_contacts(
-        n_contacts,
+        n_slots,
+        edge_alive,
+        stop_time,
+        event_time,
+        contact_duration,
+        overshoot_duration,
+        active_contacts,
+        night_inception_rate,
+        day_inception_rate,
+        mean_event_lifetime,
+        rate_integral_increment,
+        method,
+        mean_degree):
+    """
+    """
+    for i in range(n_slots):
+        if not edge_alive[i]:
+            continue
+
+        (event_time[i],
+         active_contacts[i],
+         contact_duration[i],
+         overshoot_duration[i]
+        ) = simulate_contact(stop_time,
+                             event_time[i],
+                             contact_duration[i],
+                             overshoot_duration[i],
+                             active_contacts[i],
+                             night_inception_rate[i],
+                             day_inception_rate[i],
+                             mean_event_lifetime,
+                             rate_integral_increment,
+                             method,
+                             mean_degree,
+                             False,
+                             np.uint64(0),
+                             0,
+                             0)
+
+@njit(parallel=True)
+def simulate_contacts_counter_based(
+        n_slots,
+        edge_alive,
+        edges,
+        rng_key,
+        interval,
         stop_time,
         event_time,
         contact_duration,
@@ -321,10 +797,17 @@ def simulate_contacts(
         day_inception_rate,
         mean_event_lifetime,
         rate_integral_increment,
+        method,
         mean_degree):
     """
+    Same as simulate_contacts, in parallel; every edge draws from its own
+    counter-based stream keyed on (rng_key, edge, interval), so the results do
+    not depend on the number of threads (nor on the order of edges).
     """
-    for i in range(n_contacts):
+    for i in prange(n_slots):
+        if not edge_alive[i]:
+            continue
+
         (event_time[i],
          active_contacts[i],
          contact_duration[i],
@@ -338,7 +821,118 @@ def simulate_contacts(
                              day_inception_rate[i],
                              mean_event_lifetime,
                              rate_integral_increment,
-                             mean_degree)
+                             method,
+                             mean_degree,
+                             True,
+                             rng_key,
+                             edge_key(edges[i]),
+                             interval)
+
+@njit(parallel=True)
+def simulate_mean_field_contacts(
+        n_slots,
+        edge_alive,
+        start_time,
+        stop_time,
+        activation_probability,
+        contact_duration,
+        night_inception_rate,
+        day_inception_rate,
+        mean_event_lifetime,
+        rate_integral_increment,
+        mean_degree):
+    """
+    Propagate the probability p that each edge is active,
+
+        dp/dt = λ(t) (1 - p) - μ p,
+
+    from start_time to stop_time, and record its integral (the expected contact
+    duration). λ is held at its midpoint value over increments no longer than
+    rate_integral_increment, within which p is integrated exactly.
+    """
+    n_steps = max(int(np.ceil((stop_time - start_time) / rate_integral_increment)), 1)
+    δ = (stop_time - start_time) / n_steps
+    μ = 1 / mean_event_lifetime
+
+    for i in prange(n_slots):
+        if not edge_alive[i]:
+            continue
+
+        p = activation_probability[i]
+        duration = 0.0
+        for n in range(n_steps):
+            λ = diurnal_inception_rate(night_inception_rate[i],
+                                       day_inception_rate[i],
+                                       mean_degree,
+                                       start_time + (n + 0.5) * δ)
+
+            # relaxation towards the equilibrium p_eq at the rate k
+            k = λ + μ
+            p_eq = λ / k
+            decay = np.exp(-k * δ)
+
+            duration += p_eq * δ + (p - p_eq) * (1 - decay) / k
+            p = p_eq + (p - p_eq) * decay
+
+        activation_probability[i] = p
+        contact_duration[i] = duration
+
+# Philox4x32-10 constants; see
+#
+# J. K. Salmon, M. A. Moraes, R. O. Dror, D. E. Shaw, "Parallel Random Numbers: As Easy as
+# 1, 2, 3", SC '11 (2011)
+PHILOX_M0 = np.uint64(0xD2511F53)
+PHILOX_M1 = np.uint64(0xCD9E8D57)
+PHILOX_W0 = np.uint64(0x9E3779B9)
+PHILOX_W1 = np.uint64(0xBB67AE85)
+MASK32 = np.uint64(0xFFFFFFFF)
+SHIFT32 = np.uint64(32)
+
+@njit
+def philox4x32(c0, c1, c2, c3, k0, k1):
+    """
+    Philox4x32-10 bijection of a 4x32-bit counter under a 2x32-bit key; all
+    words are held in uint64.
+    """
+    for r in range(10):
+        if r > 0:
+            k0 = (k0 + PHILOX_W0) & MASK32
+            k1 = (k1 + PHILOX_W1) & MASK32
+        p0 = PHILOX_M0 * c0
+        p1 = PHILOX_M1 * c2
+        c0, c1, c2, c3 = ((p1 >> SHIFT32) ^ c1 ^ k0, p1 & MASK32,
+                          (p0 >> SHIFT32) ^ c3 ^ k1, p0 & MASK32)
+
+    return c0, c1, c2, c3
+
+@njit
+def counter_based_random(rng_key, edge_id, interval, draw):
+    """
+    Draw a uniform number on (0, 1) from the stream of (rng_key, edge_id,
+    interval); `draw` is the index of the number within the stream.
+    """
+    edge_id = np.uint64(edge_id)
+    r0, r1, _, _ = philox4x32(np.uint64(draw) & MASK32,
+                              np.uint64(interval) & MASK32,
+                              edge_id & MASK32,
+                              edge_id >> SHIFT32,
+                              rng_key & MASK32,
+                              rng_key >> SHIFT32)
+
+    # 53 random bits
+    bits = (r0 << np.uint64(21)) ^ (r1 >> np.uint64(11))
+    return (bits + 0.5) / 2.0**53
+
+@njit
+def uniform_random(counter_based, rng_key, edge_id, interval, draw):
+    """
+    Draw a uniform number on (0, 1), from the counter-based stream of (rng_key,
+    edge_id, interval) if counter_based, and from numba's global state otherwise
+    """
+    if counter_based:
+        return counter_based_random(rng_key, edge_id, interval, draw)
+    else:
+        return np.random.random()
 
 @njit
 def simulate_contact(
@@ -351,14 +945,21 @@ def simulate_contact(
         day_inception_rate,
         mean_event_lifetime,
         rate_integral_increment,
-        mean_degree):
+        method,
+        mean_degree,
+        counter_based,
+        rng_key,
+        edge_id,
+        interval):
     """
     """
     contact_duration = overshoot_duration
+    draw = 0
 
     while event_time < stop_time:
         # Compute "normalized" random step τ, with τ ~ Exp(1)
-        τ = - np.log(np.random.random())
+        τ = - np.log(uniform_random(counter_based, rng_key, edge_id, interval, draw))
+        draw += 1
 
         if active_contact: # compute contact deactivation time.
 
@@ -372,6 +973,50 @@ def simulate_contact(
             event_time += time_step
             active_contact = False
 
+        elif method == INCEPTION_LOOKUP: # compute next contact inception.
+
+            # Solve τ = ∫ λ(t) dt exactly; see diurnal_inception_time_step
+            time_step = diurnal_inception_time_step(night_inception_rate,
+                                                    day_inception_rate,
+                                                    mean_degree,
+                                                    event_time,
+                                                    τ)
+
+            if time_step == np.inf: # no contact is ever incepted
+                event_time = stop_time
+                break
+
+            # Contact inception
+            event_time += time_step
+            active_contact = True
+
+        elif method == INCEPTION_THINNING: # compute next contact inception.
+
+            # Sample candidate inceptions from a Poisson process with the peak
+            # rate λmax ≥ λ(t), and accept each with probability λ(t) / λmax;
+            # see P. A. W. Lewis, G. S. Shedler, "Simulation of nonhomogeneous
+            # Poisson processes by thinning", Naval Res. Logist. Q. (1979)
+            λmax = max(night_inception_rate, day_inception_rate) / mean_degree
+
+            if λmax <= 0: # no contact is ever incepted
+                event_time = stop_time
+                break
+
+            time_step = τ / λmax
+            while (uniform_random(counter_based, rng_key, edge_id, interval, draw) * λmax
+                   > diurnal_inception_rate(night_inception_rate,
+                                            day_inception_rate,
+                                            mean_degree,
+                                            event_time + time_step)):
+                τ = - np.log(uniform_random(counter_based, rng_key, edge_id, interval, draw + 1))
+                draw += 2
+                time_step += τ / λmax
+            draw += 1
+
+            # Contact inception
+            event_time += time_step
+            active_contact = True
+
         else: # compute next contact inception.
 
             # Solve
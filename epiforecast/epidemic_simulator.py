@@ -1,4 +1,3 @@
-import copy
 import numpy as np
 import networkx as nx
 
@@ -6,7 +5,6 @@ from timeit import default_timer as timer
 
 from .contact_simulator import ContactSimulator
 from .kinetic_model_simulator import KineticModel
-from .utilities import not_involving
 
 day = 1
 hour = day / 24
@@ -28,7 +26,9 @@ class EpidemicSimulator:
             night_inception_rate = None,
             health_service = None,
             start_time = 0.0,
-            seed = None):
+            seed = None,
+            kinetic_engine = 'networkx',
+            kinetic_event_log_file = None):
         """
         Build a tool that simulates epidemics.
 
@@ -60,6 +60,12 @@ class EpidemicSimulator:
 
         start_time (float): The initial time of the simulation.
 
+        kinetic_engine (str): Engine of the kinetic model, 'networkx', 'numba' or 'tau_leaping';
+                              see KineticModel.
+
+        kinetic_event_log_file (str): If given, the kinetic model streams its transitions to this
+                                      file instead of keeping full histories; see KineticModel.
+
         """
 
         self.health_service = health_service
@@ -70,7 +76,7 @@ class EpidemicSimulator:
             buffer_margin = 1.2 # 20% margin seems conservative
             
         #calculate mean_degree for the edges
-        mean_degree = np.mean([d for n, d in contact_network.get_graph().degree()])
+        mean_degree = 2 * contact_network.get_edge_count() / contact_network.get_node_count()
 
         self.contact_simulator = ContactSimulator(contact_network.get_edges(),
                                                   mean_degree,
@@ -88,7 +94,10 @@ class EpidemicSimulator:
 
         self.kinetic_model = KineticModel(diagram_indep = diagram_indep,
                                           diagram_neigh = diagram_neigh,
-                                          start_time = start_time)
+                                          start_time = start_time,
+                                          engine = kinetic_engine,
+                                          streaming = kinetic_event_log_file is not None,
+                                          event_log_file = kinetic_event_log_file)
 
         self.static_contact_interval = static_contact_interval
         self.time = start_time
@@ -116,7 +125,7 @@ class EpidemicSimulator:
         """
 
         run_time = stop_time - self.time
-        next_network = copy.deepcopy(current_network)
+        next_network = current_network.fork() # copy-on-write
 
         # Number of constant steps, which are followed by a single ragged step to update to specified stop_time.
         constant_steps = int(np.floor(run_time / self.static_contact_interval))
@@ -149,31 +158,13 @@ class EpidemicSimulator:
                             self.kinetic_model.current_statuses,
                             verbose))
 
-                # TODO why are we filtering edges in what follows but not here?
                 next_network.add_edges(contacts_to_add)
                 next_network.remove_edges(contacts_to_remove)
 
-                # Compile edges to add and remove from contact simulation...
-                edges_to_remove = set()
-                edges_to_add = set()
-
-                current_patients = self.health_service.current_patient_addresses()
-
-                previous_patients = (current_patients
-                                     - {p.address for p in admitted_patients})
-                previous_patients.update(p.address for p in discharged_patients)
-
-                # ... ensuring that edges are not removed from previous patients (whose edges were *already* removed),
-                # and ensuring that edges are not added to existing patients:
-                if len(admitted_patients) > 0:
-                    for patient in admitted_patients:
-                        edges_to_remove.update(filter(not_involving(previous_patients), patient.community_contacts))
-                        edges_to_add.update(patient.health_worker_contacts)
-
-                if len(discharged_patients) > 0:
-                    for patient in discharged_patients:
-                        edges_to_remove.update(patient.health_worker_contacts)
-                        edges_to_add.update(filter(not_involving(current_patients), patient.community_contacts))
+                # contacts are already filtered so that edges are not removed
+                # from previous patients (whose edges were *already* removed),
+                # and edges are not added to existing patients
+                edges_to_add, edges_to_remove = contacts_to_add, contacts_to_remove
 
             else:
                 edges_to_add, edges_to_remove = set(), set()
@@ -211,7 +202,7 @@ class EpidemicSimulator:
 
             start_kinetic_simulation = timer()
 
-            self.kinetic_model.simulate(next_network.get_graph(),
+            self.kinetic_model.simulate(next_network,
                                         self.static_contact_interval)
             self.time += self.static_contact_interval
 
@@ -261,7 +252,7 @@ class EpidemicSimulator:
         print("                             Resistant: {:d}".format(self.kinetic_model.statuses['R'][-1]))
         print("                              Deceased: {:d}".format(self.kinetic_model.statuses['D'][-1]))
         print("             Current possible contacts: {:d}".format(n_contacts))
-        print("               Current active contacts: {:d}".format(np.count_nonzero(~self.contact_simulator.active_contacts[:n_contacts])))
+        print("               Current active contacts: {:d}".format(np.count_nonzero(~self.contact_simulator.get_active_contacts())))
 
     def print_walltimes(
             self,
@@ -0,0 +1,166 @@
+import tempfile
+
+import numpy as np
+
+class EventLog:
+    """
+    A log of the transitions of a kinetic model, stored as compact records
+    (time, node, from, to), where 'from' and 'to' are integer codes of statuses
+    (indices into status_names).
+
+    Records are written into a preallocated structured array (a chunk). When a
+    chunk is full, or when the log is flushed, it is appended to a file if a
+    filename is given (as raw records of dtype EventLog.DTYPE, which
+    np.fromfile reads back). Otherwise full chunks are kept in memory, up to
+    max_chunks_in_memory of them, and then spilled to a temporary file, so
+    that memory stays bounded.
+    """
+
+    DTYPE = np.dtype([('time', np.float64),
+                      ('node', np.int64),
+                      ('from', np.int8),
+                      ('to', np.int8)])
+
+    def __init__(
+            self,
+            status_names,
+            chunk_size = 2**16,
+            filename = None,
+            max_chunks_in_memory = 16):
+        """
+        Constructor
+
+        Input:
+            status_names (list): names of statuses, indexed by their codes
+            chunk_size (int): number of records of a chunk
+            filename (str): file that full chunks are appended to; it is
+                            truncated here
+            max_chunks_in_memory (int): number of full chunks kept in memory,
+                                        if filename is None, before they are
+                                        spilled to a temporary file
+        """
+        if len(status_names) > np.iinfo(self.DTYPE['from']).max + 1:
+            raise ValueError(
+                    self.__class__.__name__
+                    + ": too many statuses for the codes of records: "
+                    + str(len(status_names)))
+
+        self.status_names = list(status_names)
+        self.status_codes = {name: code for code, name in enumerate(self.status_names)}
+
+        self.filename = filename
+        if filename is not None:
+            open(filename, 'wb').close()
+
+        self.chunk = np.empty(chunk_size, dtype=self.DTYPE)
+        self.chunk_length = 0
+        self.chunks = [] # full chunks, if filename is None
+        self.max_chunks_in_memory = max_chunks_in_memory
+        self.spill_file = None # temporary file of spilled chunks
+        self.n_events = 0
+
+    def __len__(self):
+        return self.n_events
+
+    def record(
+            self,
+            time,
+            node,
+            from_status,
+            to_status):
+        """
+        Record a single transition
+
+        Input:
+            time (float): time of the transition
+            node (int): node that transitioned
+            from_status (str): status before the transition
+            to_status (str): status after the transition
+        """
+        self.chunk[self.chunk_length] = (time,
+                                         node,
+                                         self.status_codes[from_status],
+                                         self.status_codes[to_status])
+        self.chunk_length += 1
+        self.n_events += 1
+
+        if self.chunk_length == self.chunk.size:
+            self.__store_chunk()
+
+    def record_events(
+            self,
+            times,
+            nodes,
+            from_codes,
+            to_codes):
+        """
+        Record transitions given as arrays
+
+        Input:
+            times (np.array): (n_events,) times of the transitions
+            nodes (np.array): (n_events,) nodes that transitioned
+            from_codes (np.array): (n_events,) codes of statuses before
+            to_codes (np.array): (n_events,) codes of statuses after
+        """
+        start = 0
+        while start < times.size:
+            stop = min(times.size, start + self.chunk.size - self.chunk_length)
+            records = self.chunk[self.chunk_length : self.chunk_length + stop - start]
+            records['time'] = times[start:stop]
+            records['node'] = nodes[start:stop]
+            records['from'] = from_codes[start:stop]
+            records['to'] = to_codes[start:stop]
+
+            self.chunk_length += stop - start
+            self.n_events += stop - start
+            start = stop
+
+            if self.chunk_length == self.chunk.size:
+                self.__store_chunk()
+
+    def flush(self):
+        """
+        Append the records of the current chunk to the file, if any, so that
+        all the records recorded so far can be read from it
+        """
+        if self.filename is not None and self.chunk_length > 0:
+            self.__store_chunk()
+
+    def get_events(self):
+        """
+        Get all the records
+
+        Output:
+            events (np.array): (n_events,) structured array of dtype EventLog.DTYPE
+        """
+        if self.filename is not None:
+            stored = [np.fromfile(self.filename, dtype=self.DTYPE)]
+        elif self.spill_file is not None:
+            self.spill_file.seek(0)
+            stored = [np.fromfile(self.spill_file, dtype=self.DTYPE)] + self.chunks
+        else:
+            stored = self.chunks
+
+        return np.concatenate(stored + [self.chunk[:self.chunk_length]])
+
+    def __store_chunk(self):
+        """
+        Append the current chunk to the file, or keep it in memory (spilling
+        the chunks in memory to a temporary file when there are too many), and
+        start a new one
+        """
+        if self.filename is not None:
+            with open(self.filename, 'ab') as log_file:
+                self.chunk[:self.chunk_length].tofile(log_file)
+        else:
+            self.chunks.append(self.chunk[:self.chunk_length].copy())
+
+            if len(self.chunks) > self.max_chunks_in_memory:
+                if self.spill_file is None:
+                    self.spill_file = tempfile.TemporaryFile()
+                self.spill_file.seek(0, 2) # get_events moves to the start
+                for chunk in self.chunks:
+                    chunk.tofile(self.spill_file)
+                self.chunks = []
+
+        self.chunk_length = 0
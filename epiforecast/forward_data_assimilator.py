@@ -515,7 +515,7 @@ class DataAssimilator:
             current_nodelist = copy.deepcopy(new_nodelist)
             new_nodelist = []
             for node in current_nodelist:
-                neighbors = [i for i in  user_network.get_graph().neighbors(node)]
+                neighbors = [i for i in  user_network.graph.neighbors(node)]
                 new_nodelist.extend(neighbors)
                 nearby_obs.extend(neighbors)
                 #new_dist = [1 for i in range(len(neighbors))] # all neighbours weight 1
@@ -1,8 +1,6 @@
-import copy
 import numpy as np
-import networkx as nx
 
-from .utilities import normalize, not_involving
+from .statuses import Statuses
 
 class HealthService:
     """
@@ -53,6 +51,10 @@ class HealthService:
 
     |------------------------------------------------------------|
 
+    Patients are kept in arrays, indexed by the positions of nodes in
+    `all_people`, and the hospitalized nodes are found from the codes of
+    statuses that changed since the previous call; hence the bookkeeping of a
+    call costs O(changes) on top of a vectorized comparison of statuses.
     """
 
     def __init__(
@@ -74,14 +76,27 @@ class HealthService:
         """
         self.rng = np.random.default_rng(seed)
 
-        self.original_contact_network = copy.deepcopy(original_contact_network)
         self.all_people = original_contact_network.get_nodes()
+        self.__order = np.argsort(self.all_people, kind='stable')
+        self.__sorted_people = self.all_people[self.__order]
 
-        self.health_workers = set(
+        self.__build_community_contacts(original_contact_network.get_edges())
+
+        self.health_workers = np.unique(
                 self.__recruit_health_workers(health_workers, self.all_people))
+        self.__health_worker_positions = self.__locate(self.health_workers)
 
         self.health_workers_per_patient = health_workers_per_patient
-        self.patients = set()
+
+        # patients and their (patient, health worker) contacts
+        self.patients = np.empty(0, dtype=np.int64)
+        self.is_patient = np.zeros(self.all_people.size, dtype=bool)
+        self.health_worker_contacts = np.empty((0, 2), dtype=np.int64)
+
+        # codes of statuses at the previous call, aligned with all_people
+        self.codes = np.full(self.all_people.size,
+                             Statuses.CODES['S'],
+                             dtype=Statuses.DTYPE)
 
     def __recruit_health_workers(
             self,
@@ -109,12 +124,84 @@ class HealthService:
                     + ": this type of argument is not supported: "
                     + workers.__class__.__name__)
 
+    def __locate(
+            self,
+            nodes):
+        """
+        Get positions of nodes in self.all_people
+
+        Input:
+            nodes (np.array): (n,) array of node indices
+        Output:
+            positions (np.array): (n,) array of positions
+        """
+        nodes = np.asarray(nodes, dtype=np.int64)
+        positions = np.searchsorted(self.__sorted_people, nodes)
+        positions[positions == self.all_people.size] = 0
+        found = (self.__sorted_people[positions] == nodes)
+        if not found.all():
+            raise ValueError(
+                    self.__class__.__name__
+                    + ": nodes not found in the original network: "
+                    + str(nodes[~found]))
+
+        return self.__order[positions]
+
+    def __build_community_contacts(
+            self,
+            edges):
+        """
+        Build the adjacency of the original network in CSR form (indptr and
+        neighbors, by positions in self.all_people)
+
+        Input:
+            edges (np.array): (n_edges,2) array of edges of the original network
+        """
+        edges = self.__locate(edges.ravel()).reshape(-1, 2)
+        rows = np.concatenate( (edges[:,0], edges[:,1]) )
+        cols = np.concatenate( (edges[:,1], edges[:,0]) )
+        order = np.argsort(rows, kind='stable')
+
+        self.__indptr = np.zeros(self.all_people.size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=self.all_people.size),
+                  out=self.__indptr[1:])
+        self.__neighbors = cols[order]
+
+    def __get_community_contacts(
+            self,
+            positions):
+        """
+        Get edges of the original network incident to nodes
+
+        Input:
+            positions (np.array): (n,) array of positions of nodes
+        Output:
+            edges (np.array): (n_edges,2) array of positions (node, neighbor)
+        """
+        starts = self.__indptr[positions]
+        lengths = self.__indptr[positions + 1] - starts
+        offsets = np.cumsum(lengths) - lengths
+
+        entries = (np.arange(lengths.sum())
+                   + np.repeat(starts - offsets, lengths))
+
+        return np.column_stack( (np.repeat(positions, lengths),
+                                 self.__neighbors[entries]) )
+
     def current_patient_addresses(self):
-        return set(p.address for p in self.patients)
+        return self.patients.copy()
 
     def assign_health_workers(self, patient_address, viable_health_workers):
         """
         Assign health workers to a patient.
+
+        Input:
+            patient_address (int): patient node
+            viable_health_workers (np.array): array of health workers to
+                                              choose from
+        Output:
+            health_worker_contacts (np.array): (n_assigned,2) array of edges
+                                               (patient, health worker)
         """
         if self.health_workers_per_patient < len(viable_health_workers):
             # binomial degree distribution
@@ -122,15 +209,14 @@ class HealthService:
                     len(viable_health_workers),
                     self.health_workers_per_patient / len(viable_health_workers))
 
-            assigned = self.rng.choice(list(viable_health_workers),
+            assigned = self.rng.choice(viable_health_workers,
                                        size=size,
                                        replace=False)
         else:
             assigned = viable_health_workers
 
-        health_worker_contacts = [ (patient_address, i) for i in assigned ]
-
-        return health_worker_contacts
+        return np.column_stack( (np.full(len(assigned), patient_address, dtype=np.int64),
+                                 assigned) )
 
     def discharge_and_admit_patients(
             self,
@@ -140,27 +226,49 @@ class HealthService:
         Discharge and admit patients according to statuses
 
         Input:
-            statuses (dict): mapping node -> status
+            statuses (dict),
+                     (Statuses): mapping node -> status
             verbose (bool): whether to print info
 
         Output:
-            discharged_patients (list): list of Patients
-            admitted_patients (list): list of Patients
-            contacts_to_add (list): list of tuples, each of which is an edge
-            contacts_to_remove (list): list of tuples, each of which is an edge
+            discharged_patients (np.array): array of discharged patients
+            admitted_patients (np.array): array of admitted patients
+            contacts_to_add (np.array): (n_edges,2) array of edges
+            contacts_to_remove (np.array): (n_edges,2) array of edges
         """
+        codes = Statuses.from_dict(statuses).get_codes(self.all_people)
+        changed = np.flatnonzero(codes != self.codes)
+        self.codes = codes.copy()
+
+        hospitalized = (codes[changed] == Statuses.CODES['H'])
+        discharged = changed[~hospitalized &  self.is_patient[changed]]
+        admitted   = changed[ hospitalized & ~self.is_patient[changed]]
+
         (discharged_patients,
          discharged_hospital_contacts,
-         discharged_community_contacts) = self.discharge_patients(statuses)
+         discharged_community_contacts) = self.discharge_patients(discharged)
 
         (admitted_patients,
          admitted_hospital_contacts,
-         admitted_community_contacts) = self.admit_patients(statuses)
-
-        contacts_to_add    = (discharged_community_contacts
-                              + admitted_hospital_contacts)
-        contacts_to_remove = (admitted_community_contacts
-                              + discharged_hospital_contacts)
+         admitted_community_contacts) = self.admit_patients(admitted,
+                                                            discharged)
+
+        # Filter contacts with current patients from the contacts to add
+        neighbors = self.__locate(discharged_community_contacts[:,1])
+        discharged_community_contacts = discharged_community_contacts[
+                ~self.is_patient[neighbors]]
+
+        contacts_to_add    = self.__normalize_edges(
+                np.concatenate( (discharged_community_contacts,
+                                 admitted_hospital_contacts) ))
+        contacts_to_remove = self.__normalize_edges(
+                np.concatenate( (admitted_community_contacts,
+                                 discharged_hospital_contacts) ))
+
+        # edges that are both removed and added (e.g. a health worker who is
+        # also a community contact) stay in the network
+        contacts_to_remove = contacts_to_remove[
+                ~self.__edges_isin(contacts_to_remove, contacts_to_add)]
 
         if verbose:
             self.print_manifest(statuses, discharged_patients, admitted_patients)
@@ -172,81 +280,114 @@ class HealthService:
 
     def discharge_patients(
             self,
-            statuses):
+            discharged):
         """
-        Removes a patient from self.patients and reconnect the patient with their neighbours
-        if their status is no longer H.
+        Removes patients from self.patients and get the contacts to reconnect
+        them with their neighbours.
 
         Input:
-            statuses (dict): mapping node -> status
+            discharged (np.array): positions of patients whose status is no
+                                   longer H
+        Output:
+            discharged_patients (np.array): array of discharged patients
+            discharged_hospital_contacts (np.array): (n_edges,2) array of edges
+            discharged_community_contacts (np.array): (n_edges,2) array of edges
         """
+        discharged_patients = self.all_people[discharged]
+        self.is_patient[discharged] = False
 
-        discharged_patients = set()
-        discharged_hospital_contacts  = []
-        discharged_community_contacts = []
-
-        for i, patient in enumerate(self.patients):
-            if statuses[patient.address] != 'H': # patient is no longer hospitalized
-                discharged_hospital_contacts  += patient.health_worker_contacts
-                discharged_community_contacts += patient.community_contacts
-                discharged_patients.add(patient)
+        is_discharged = np.isin(self.health_worker_contacts[:,0],
+                                discharged_patients)
+        discharged_hospital_contacts = self.health_worker_contacts[is_discharged]
+        self.health_worker_contacts = self.health_worker_contacts[~is_discharged]
+        self.patients = self.patients[~np.isin(self.patients, discharged_patients)]
 
-        # Remove discharged from patient set
-        self.patients = self.patients - discharged_patients
-
-        # Filter contacts with current patients from the list of contacts to add to network
-        discharged_community_contacts = [
-                edge for edge in filter(not_involving(self.current_patient_addresses()),
-                                        discharged_community_contacts)]
+        # Contacts with patients are filtered in discharge_and_admit_patients,
+        # once patients of the same call are admitted
+        community_contacts = self.__get_community_contacts(discharged)
 
         return (discharged_patients,
                 discharged_hospital_contacts,
-                discharged_community_contacts)
+                self.all_people[community_contacts])
 
     def admit_patients(
             self,
-            statuses):
+            admitted,
+            discharged):
         """
         Admit patients from the community (storing their details).
 
         Input:
-            statuses (dict): mapping node -> status
+            admitted (np.array): positions of hospitalized nodes that are not
+                                 patients
+            discharged (np.array): positions of patients discharged in the
+                                   same call
+        Output:
+            admitted_patients (np.array): array of admitted patients
+            admitted_hospital_contacts (np.array): (n_edges,2) array of edges
+            admitted_community_contacts (np.array): (n_edges,2) array of edges
         """
-        # Set of all hospitalized people
-        hospitalized_people = set(
-                human for human in self.all_people if statuses[human] == 'H')
+        admitted_patients = self.all_people[admitted]
+
+        # Edges of previous patients (including those discharged now) were
+        # already removed
+        was_patient = self.is_patient.copy()
+        was_patient[discharged] = True
+
+        community_contacts = self.__get_community_contacts(admitted)
+        community_contacts = community_contacts[
+                ~was_patient[community_contacts[:,1]]]
+
+        self.is_patient[admitted] = True
 
         # Hospitalized health workers do not care for patients
-        viable_health_workers = self.health_workers - hospitalized_people
+        viable_health_workers = self.health_workers[
+                self.codes[self.__health_worker_positions] != Statuses.CODES['H']]
 
-        # Patients waiting to be admitted
-        waiting_room = hospitalized_people - self.current_patient_addresses()
+        admitted_hospital_contacts = [np.empty((0, 2), dtype=np.int64)]
+        for person in admitted_patients.tolist():
+            admitted_hospital_contacts.append(
+                    self.assign_health_workers(person, viable_health_workers))
+        admitted_hospital_contacts = np.concatenate(admitted_hospital_contacts)
 
-        admitted_patients = set()
-        admitted_hospital_contacts  = []
-        admitted_community_contacts = []
+        self.patients = np.concatenate( (self.patients, admitted_patients) )
+        self.health_worker_contacts = np.concatenate(
+                (self.health_worker_contacts, admitted_hospital_contacts) )
 
-        # Admit patients
-        for person in waiting_room:
+        return (admitted_patients,
+                admitted_hospital_contacts,
+                self.all_people[community_contacts])
 
-            health_worker_contacts = self.assign_health_workers(person, viable_health_workers)
+    @staticmethod
+    def __normalize_edges(edges):
+        """
+        Normalize edges by placing largest node id first, and remove duplicates
 
-            community_contacts = self.original_contact_network.get_incident_edges(person)
+        Input:
+            edges (np.array): (n_edges,2) array of edges
+        Output:
+            edges (np.array): (n_unique,2) array of sorted unique edges
+        """
+        edges = np.sort(edges.astype(np.int64, copy=False), axis=1)[:, ::-1]
+        return np.unique(edges, axis=0)
 
-            # Record patient information
-            new_patient = Patient(person,
-                                  community_contacts,
-                                  health_worker_contacts)
+    @staticmethod
+    def __edges_isin(edges, other_edges):
+        """
+        Mask of normalized edges that are also in other_edges
 
-            # Admit the patient
-            self.patients.add(new_patient)
-            admitted_patients.add(new_patient)
-            admitted_hospital_contacts  += new_patient.health_worker_contacts
-            admitted_community_contacts += new_patient.community_contacts
+        Input:
+            edges (np.array): (n_edges,2) array of normalized edges
+            other_edges (np.array): (n_other,2) array of normalized edges
+        Output:
+            mask (np.array): (n_edges,) boolean array
+        """
+        if other_edges.size == 0:
+            return np.zeros(edges.shape[0], dtype=bool)
 
-        return (admitted_patients,
-                admitted_hospital_contacts,
-                admitted_community_contacts)
+        n_keys = max(edges.max(initial=0), other_edges.max()) + 1
+        return np.isin(edges[:,0] * n_keys + edges[:,1],
+                       other_edges[:,0] * n_keys + other_edges[:,1])
 
     def print_manifest(
             self,
@@ -258,15 +399,15 @@ class HealthService:
 
         Input:
             statuses (dict): mapping node -> status
-            discharged_patients (list): list of Patients
-            admitted_patients (list): list of Patients
+            discharged_patients (np.array): array of discharged patients
+            admitted_patients (np.array): array of admitted patients
 
         Output:
             None
         """
-        admitted_people = [p.address for p in admitted_patients]
-        discharged_people_and_statuses = [(p.address, statuses[p.address]) for p in discharged_patients]
-        current_patient_addresses = self.current_patient_addresses()
+        admitted_people = admitted_patients.tolist()
+        discharged_people_and_statuses = [(p, statuses[p]) for p in discharged_patients.tolist()]
+        current_patient_addresses = self.patients.tolist()
 
         print("[ Patient manifest ]          Admitted: ", end='')
         print(*admitted_people, sep=', ')
@@ -274,23 +415,3 @@ class HealthService:
         print(*discharged_people_and_statuses, sep=', ')
         print("                               Current: ", end='')
         print(*current_patient_addresses, sep=', ')
-
-
-class Patient:
-    """
-    Patient in hospital and their information.
-    """
-    def __init__(self, address, community_contacts, health_worker_contacts):
-        """
-        Args
-        ----
-        address (int): Location of the patient in the `original_contact_network`.
-
-        community_contacts (list of tuples): List of edges in the `original_contact_network`.
-                                             These are stored here while the patient is in hospital
-
-        health_worker_contacts (list of tuples): a list of edges connecting patient to assigned health workers
-        """
-        self.address = address
-        self.community_contacts = community_contacts
-        self.health_worker_contacts = health_worker_contacts
@@ -1,6 +1,10 @@
 import numpy as np
 import networkx as nx
+from numba import njit
 from .simulation import Gillespie_simple_contagion
+from .contact_network import ContactNetwork
+from .event_log import EventLog
+from .statuses import Statuses
 
 def print_initial_statuses(statuses,population):
     #use default dict here
@@ -16,36 +20,536 @@ def print_statuses(statuses):
 
     print("")
 
+# Gillespie simulation of simple contagions on arrays (see 'numba' engine of
+# KineticModel), equivalent to simulation.Gillespie_simple_contagion.
+#
+# Statuses are integer codes. The total rate of each node (of its spontaneous
+# transitions, and of the transitions induced by its neighbors) is stored in the
+# leaves of a sum tree, which samples the next node to transition and is
+# updated in O(log N); when a node transitions, the rates of the node and of its
+# neighbors are recomputed.
+
+@njit
+def update_sum_tree(tree, leaf, value):
+    """
+    Set leaf of the sum tree to value, and update the partial sums
+    """
+    i = leaf + tree.size // 2
+    tree[i] = value
+    i //= 2
+    while i >= 1:
+        tree[i] = tree[2*i] + tree[2*i+1]
+        i //= 2
+
+@njit
+def sample_sum_tree(tree, r):
+    """
+    Find the leaf of the sum tree where the cumulative sum exceeds r
+    """
+    n_leaves = tree.size // 2
+    i = 1
+    while i < n_leaves:
+        left = tree[2*i]
+        if r < left or tree[2*i+1] <= 0:
+            i = 2*i
+        else:
+            r -= left
+            i = 2*i + 1
+
+    return i - n_leaves
+
+@njit
+def compute_transition_rates(
+        node,
+        status,
+        spontaneous_from,
+        spontaneous_rates,
+        induced_source,
+        induced_from,
+        induced_rates,
+        indptr,
+        indices,
+        weights):
+    """
+    Compute the rates of the spontaneous and induced transitions of node
+    """
+    rates = np.zeros(spontaneous_from.size + induced_from.size)
+
+    for k in range(spontaneous_from.size):
+        if spontaneous_from[k] == status[node]:
+            rates[k] = spontaneous_rates[k, node]
+
+    for m in range(induced_from.size):
+        if induced_from[m] == status[node]:
+            for j in range(indptr[node], indptr[node+1]):
+                if status[indices[j]] == induced_source[m]:
+                    rates[spontaneous_from.size + m] += induced_rates[m] * weights[j]
+
+    return rates
+
+@njit
+def choose_transition(rates):
+    """
+    Choose a transition with probability proportional to its rate
+    """
+    r = np.random.random() * rates.sum()
+    transition = rates.size - 1
+    for k in range(rates.size):
+        r -= rates[k]
+        if r < 0:
+            transition = k
+            break
+    while rates[transition] <= 0: # round-off
+        transition -= 1
+
+    return transition
+
+@njit
+def record_event(times, events, n_events, t, node, from_status, to_status):
+    """
+    Record that node transitioned from from_status to to_status at time t,
+    growing the output arrays if needed
+    """
+    if n_events == times.size:
+        times = np.concatenate( (times, np.empty(times.size)) )
+        events = np.concatenate( (events, np.empty_like(events)) )
+    times[n_events] = t
+    events[n_events, 0] = node
+    events[n_events, 1] = from_status
+    events[n_events, 2] = to_status
+
+    return times, events
+
+@njit
+def simulate_simple_contagion(
+        status,
+        tmin,
+        tmax,
+        spontaneous_from,
+        spontaneous_to,
+        spontaneous_rates,
+        induced_source,
+        induced_from,
+        induced_to,
+        induced_rates,
+        indptr,
+        indices,
+        weights):
+    """
+    Simulate from tmin to tmax; status is updated in place.
+
+    Spontaneous transition k takes nodes from spontaneous_from[k] to
+    spontaneous_to[k] at rate spontaneous_rates[k, node]; induced transition m
+    takes nodes from induced_from[m] to induced_to[m] at rate induced_rates[m]
+    times the weight of the edge to each neighbor in induced_source[m].
+
+    Output:
+        times (np.array): (n_events,) times of events
+        events (np.array): (n_events, 3) node, and codes of the statuses before
+                           and after, of each event
+    """
+    n_nodes = status.size
+    to = np.concatenate( (spontaneous_to, induced_to) )
+
+    n_leaves = 1
+    while n_leaves < n_nodes:
+        n_leaves *= 2
+
+    tree = np.zeros(2 * n_leaves)
+    for node in range(n_nodes):
+        tree[n_leaves + node] = compute_transition_rates(
+                node, status, spontaneous_from, spontaneous_rates,
+                induced_source, induced_from, induced_rates,
+                indptr, indices, weights).sum()
+    for i in range(n_leaves - 1, 0, -1):
+        tree[i] = tree[2*i] + tree[2*i+1]
+
+    times = np.empty(1024)
+    events = np.empty( (1024, 3), dtype=np.int64)
+    n_events = 0
+
+    t = tmin
+    while tree[1] > 0:
+        t += -np.log(1.0 - np.random.random()) / tree[1]
+        if t >= tmax:
+            break
+
+        node = sample_sum_tree(tree, np.random.random() * tree[1])
+
+        # choose the transition of node
+        rates = compute_transition_rates(
+                node, status, spontaneous_from, spontaneous_rates,
+                induced_source, induced_from, induced_rates,
+                indptr, indices, weights)
+        transition = choose_transition(rates)
+
+        times, events = record_event(
+                times, events, n_events, t, node, status[node], to[transition])
+        n_events += 1
+        status[node] = to[transition]
+
+        # update rates of the node and of its neighbors
+        update_sum_tree(tree, node, compute_transition_rates(
+                node, status, spontaneous_from, spontaneous_rates,
+                induced_source, induced_from, induced_rates,
+                indptr, indices, weights).sum())
+
+        for j in range(indptr[node], indptr[node+1]):
+            update_sum_tree(tree, indices[j], compute_transition_rates(
+                    indices[j], status, spontaneous_from, spontaneous_rates,
+                    induced_source, induced_from, induced_rates,
+                    indptr, indices, weights).sum())
+
+    return times[:n_events], events[:n_events]
+
+# Approximate simulation of simple contagions by tau-leaping (see 'tau_leaping'
+# engine of KineticModel).
+#
+# Over a leap of length tau, the rates are frozen at their values at the
+# beginning of the leap: each node transitions with probability
+# 1 - exp(-a_i tau), where a_i is its total rate, and the transition is chosen
+# in proportion to the rates (a binomial leap, in which no node transitions
+# twice). The nodes that transition are sampled as the distinct nodes among a
+# Poisson number (of mean a_0 tau) of draws from the sum tree, so that a leap
+# costs in proportion to its number of events rather than to the number of
+# nodes.
+#
+# tau is selected as in Cao, Gillespie & Petzold (2006), so that the expected
+# change of the number of nodes in each status, and its standard deviation, are
+# at most tolerance times that number (and at least one node). When a leap would
+# contain fewer than n_critical events, exact Gillespie steps are taken instead.
+#
+# The rates of the transitions of each node are kept in node_rates, and their
+# totals over nodes in total_rates; after transitions, the rates of the nodes
+# that transitioned are recomputed, and the contributions of these nodes to the
+# induced rates of their neighbors are updated.
+
+@njit
+def select_leap(
+        count,
+        total_rates,
+        transition_from,
+        to,
+        tolerance):
+    """
+    Select the length of the next leap
+
+    Input:
+        total_rates (np.array): (n_transitions,) rates of the transitions,
+                                summed over nodes
+        transition_from (np.array): (n_transitions,) status that each transition
+                                    takes nodes from
+
+    Output:
+        tau (float): length of the leap (np.inf if all the rates are zero)
+    """
+    drift = np.zeros(count.size)
+    variance = np.zeros(count.size)
+    for k in range(to.size):
+        drift[transition_from[k]] -= total_rates[k]
+        drift[to[k]] += total_rates[k]
+        variance[transition_from[k]] += total_rates[k]
+        variance[to[k]] += total_rates[k]
+
+    tau = np.inf
+    for s in range(count.size):
+        bound = max(tolerance * count[s], 1.0)
+        if abs(drift[s]) > 0:
+            tau = min(tau, bound / abs(drift[s]))
+        if variance[s] > 0:
+            tau = min(tau, bound**2 / variance[s])
+
+    return tau
+
+@njit
+def update_node_rates(
+        changed,
+        n_changed,
+        previous_status,
+        is_changed,
+        touched,
+        touched_nodes,
+        status,
+        node_rates,
+        total_rates,
+        tree,
+        spontaneous_from,
+        spontaneous_rates,
+        induced_source,
+        induced_from,
+        induced_rates,
+        indptr,
+        indices,
+        weights):
+    """
+    Update node_rates, total_rates and the sum tree after the nodes
+    changed[:n_changed] have transitioned from previous_status[:n_changed].
+
+    is_changed must be True exactly for the changed nodes; is_changed, touched
+    (all False) and touched_nodes are work arrays, and is_changed and touched
+    are reset to False.
+    """
+    n_spontaneous = spontaneous_from.size
+    n_touched = 0
+
+    for i in range(n_changed):
+        node = changed[i]
+        total_rates -= node_rates[node]
+        node_rates[node] = compute_transition_rates(
+                node, status, spontaneous_from, spontaneous_rates,
+                induced_source, induced_from, induced_rates,
+                indptr, indices, weights)
+        total_rates += node_rates[node]
+        update_sum_tree(tree, node, node_rates[node].sum())
+
+    for i in range(n_changed):
+        node = changed[i]
+        for j in range(indptr[node], indptr[node+1]):
+            neighbor = indices[j]
+            if is_changed[neighbor]:
+                continue
+
+            for m in range(induced_from.size):
+                if induced_from[m] != status[neighbor]:
+                    continue
+                delta = ( (status[node] == induced_source[m])
+                          - (previous_status[i] == induced_source[m]) )
+                if delta == 0:
+                    continue
+
+                k = n_spontaneous + m
+                rate = node_rates[neighbor, k] + delta * induced_rates[m] * weights[j]
+                # remove the round-off left when the last source neighbor leaves
+                if rate <= 1e-9 * node_rates[neighbor, k]:
+                    rate = 0.0
+                total_rates[k] += rate - node_rates[neighbor, k]
+                node_rates[neighbor, k] = rate
+
+                if not touched[neighbor]:
+                    touched[neighbor] = True
+                    touched_nodes[n_touched] = neighbor
+                    n_touched += 1
+
+    for i in range(n_touched):
+        neighbor = touched_nodes[i]
+        touched[neighbor] = False
+        update_sum_tree(tree, neighbor, node_rates[neighbor].sum())
+
+    for i in range(n_changed):
+        is_changed[changed[i]] = False
+
+@njit
+def simulate_simple_contagion_tau_leaping(
+        status,
+        n_statuses,
+        tmin,
+        tmax,
+        tolerance,
+        n_critical,
+        n_exact_steps,
+        spontaneous_from,
+        spontaneous_to,
+        spontaneous_rates,
+        induced_source,
+        induced_from,
+        induced_to,
+        induced_rates,
+        indptr,
+        indices,
+        weights):
+    """
+    Simulate from tmin to tmax by tau-leaping; status is updated in place.
+
+    The transitions are described as in simulate_simple_contagion; tolerance
+    bounds the relative change of the number of nodes per status in a leap,
+    and n_exact_steps Gillespie steps are taken when fewer than n_critical
+    events are expected in a leap.
+
+    Output:
+        times (np.array): (n_events,) times of events; the events of a leap
+                          are given the time at the end of the leap
+        events (np.array): (n_events, 3) node, and codes of the statuses before
+                           and after, of each event
+    """
+    n_nodes = status.size
+    transition_from = np.concatenate( (spontaneous_from, induced_from) )
+    to = np.concatenate( (spontaneous_to, induced_to) )
+
+    node_rates = np.empty( (n_nodes, to.size) )
+    for node in range(n_nodes):
+        node_rates[node] = compute_transition_rates(
+                node, status, spontaneous_from, spontaneous_rates,
+                induced_source, induced_from, induced_rates,
+                indptr, indices, weights)
+    total_rates = node_rates.sum(axis=0)
+
+    n_leaves = 1
+    while n_leaves < n_nodes:
+        n_leaves *= 2
+    tree = np.zeros(2 * n_leaves)
+    tree[n_leaves:n_leaves + n_nodes] = node_rates.sum(axis=1)
+    for i in range(n_leaves - 1, 0, -1):
+        tree[i] = tree[2*i] + tree[2*i+1]
+
+    count = np.zeros(n_statuses, dtype=np.int64)
+    for node in range(n_nodes):
+        count[status[node]] += 1
+
+    times = np.empty(1024)
+    events = np.empty( (1024, 3), dtype=np.int64)
+    n_events = 0
+
+    # work arrays of update_node_rates
+    changed = np.empty(n_nodes, dtype=np.int64)
+    previous_status = np.empty(n_nodes, dtype=np.int64)
+    is_changed = np.zeros(n_nodes, dtype=np.bool_)
+    touched = np.zeros(n_nodes, dtype=np.bool_)
+    touched_nodes = np.empty(n_nodes, dtype=np.int64)
+
+    t = tmin
+    while t < tmax and tree[1] > 0:
+        tau = select_leap(count, total_rates, transition_from, to, tolerance)
+
+        if tree[1] * tau < n_critical:
+            for _ in range(n_exact_steps):
+                if tree[1] <= 0:
+                    break
+                t += -np.log(1.0 - np.random.random()) / tree[1]
+                if t >= tmax:
+                    break
+
+                node = sample_sum_tree(tree, np.random.random() * tree[1])
+                changed[0] = node
+                previous_status[0] = status[node]
+                is_changed[node] = True
+
+                count[status[node]] -= 1
+                status[node] = to[choose_transition(node_rates[node])]
+                count[status[node]] += 1
+
+                times, events = record_event(
+                        times, events, n_events, t, node, previous_status[0], status[node])
+                n_events += 1
+
+                update_node_rates(
+                        changed, 1, previous_status, is_changed, touched, touched_nodes,
+                        status, node_rates, total_rates, tree,
+                        spontaneous_from, spontaneous_rates,
+                        induced_source, induced_from, induced_rates,
+                        indptr, indices, weights)
+            continue
+
+        tau = min(tau, tmax - t)
+
+        # leap with the rates frozen at time t
+        n_changed = 0
+        for _ in range(np.random.poisson(tree[1] * tau)):
+            node = sample_sum_tree(tree, np.random.random() * tree[1])
+            if is_changed[node]:
+                continue
+
+            changed[n_changed] = node
+            previous_status[n_changed] = status[node]
+            is_changed[node] = True
+            n_changed += 1
+
+            count[status[node]] -= 1
+            status[node] = to[choose_transition(node_rates[node])]
+            count[status[node]] += 1
+        t += tau
+
+        for i in range(n_changed):
+            times, events = record_event(
+                    times, events, n_events, t, changed[i], previous_status[i],
+                    status[changed[i]])
+            n_events += 1
+
+        update_node_rates(
+                changed, n_changed, previous_status, is_changed, touched, touched_nodes,
+                status, node_rates, total_rates, tree,
+                spontaneous_from, spontaneous_rates,
+                induced_source, induced_from, induced_rates,
+                indptr, indices, weights)
+
+    return times[:n_events], events[:n_events]
 
 class KineticModel:
     """
     A class to implement a Kinetic Monte-Carlo solver on a provided network.
     """
+
+    ENGINES = ('networkx', 'numba', 'tau_leaping')
+
+    # the 'tau_leaping' engine takes exact Gillespie steps, TAU_LEAPING_EXACT_STEPS
+    # at a time, when fewer than TAU_LEAPING_CRITICAL_EVENTS are expected in a leap
+    TAU_LEAPING_CRITICAL_EVENTS = 10.0
+    TAU_LEAPING_EXACT_STEPS = 100
+
     def __init__(
             self,
             diagram_indep,
             diagram_neigh,
-            start_time = 0.0):
+            start_time = 0.0,
+            engine = 'networkx',
+            tau_leaping_tolerance = 0.01,
+            streaming = False,
+            event_log_file = None):
         """
         Constructor
 
         Input:
             diagram_indep (nx.DiGraph): diagram with independent rates
             diagram_neigh (nx.DiGraph): diagram with neighbor-dependent rates
+            engine (str): 'networkx' (simulation.Gillespie_simple_contagion),
+                          'numba' (simulate_simple_contagion, on arrays)
+                          or 'tau_leaping' (approximate,
+                          simulate_simple_contagion_tau_leaping, on arrays)
+            tau_leaping_tolerance (float): bound on the relative change of the
+                                           number of nodes per status in a leap
+                                           of the 'tau_leaping' engine
+            streaming (bool): whether to record the transitions in an EventLog
+                              (self.event_log) instead of the full histories
+                              of self.times and self.statuses; these then get
+                              one entry, the counts at the end, per simulate
+            event_log_file (str): file that the event log is written to, if
+                                  streaming (if None, it is kept in memory)
         """
-        # TODO read the following from a Glossary class
+        if engine not in self.ENGINES:
+            raise ValueError(
+                    self.__class__.__name__
+                    + ": this value of 'engine' is not supported: "
+                    + engine)
+        self.engine = engine
+        self.tau_leaping_tolerance = tau_leaping_tolerance
+
         # What statuses to return from Gillespie simulation
-        self.return_statuses = ('S', 'E', 'I', 'H', 'R', 'D')
+        self.return_statuses = Statuses.NAMES
 
         self.diagram_indep = diagram_indep
         self.diagram_neigh = diagram_neigh
 
+        # integer codes of statuses, used by the array engines and the event log
+        self.status_names = list(self.return_statuses)
+        for status_name in (list(self.diagram_indep.nodes)
+                            + [name for pair in self.diagram_neigh.nodes for name in pair]):
+            if status_name not in self.status_names:
+                self.status_names.append(status_name)
+        self.status_codes = {status_name: code
+                             for code, status_name in enumerate(self.status_names)}
+
         self.current_time = start_time
         self.current_statuses = None # must be set by set_statuses
 
         self.times = []
         self.statuses = {s: [] for s in self.return_statuses}
 
+        if streaming:
+            self.event_log = EventLog(self.status_names, filename=event_log_file)
+        else:
+            self.event_log = None
+        # number of nodes per status code, maintained from the events if streaming
+        self.current_counts = None
+
     def set_mean_contact_duration(self, mean_contact_duration):
         """
         Set the weights of self.contact_network, which correspond to the mean contact
@@ -70,7 +574,8 @@ class KineticModel:
         nx.set_edge_attributes(self.contact_network, values=weights, name='exposed_by_hospitalized')
 
     def set_statuses(self, statuses):
-        self.current_statuses = statuses
+        self.current_statuses = self.__to_statuses(statuses)
+        self.current_counts = None
 
     def simulate(
             self,
@@ -81,13 +586,41 @@ class KineticModel:
         Run the Gillespie solver on a given graph
 
         Input:
-            graph (nx.Graph): graph object with node and edge attributes
+            graph (nx.Graph),
+                  (ContactNetwork): graph object with node and edge attributes
             time_interval (float): integration time
-            initial_statuses (dict): initial conditions of the form:
+            initial_statuses (dict),
+                             (Statuses): initial conditions of the form:
                 {node_number : node_status}
+
+        Output:
+            current_statuses (Statuses): statuses at the end (a dict if the
+                                         diagrams have statuses other than
+                                         Statuses.NAMES)
         """
         if initial_statuses is None:
             initial_statuses = self.current_statuses
+        else:
+            initial_statuses = self.__to_statuses(initial_statuses)
+            self.current_counts = None
+
+        if self.event_log is not None and self.current_counts is None:
+            if isinstance(initial_statuses, Statuses):
+                self.current_counts = np.bincount(initial_statuses.codes,
+                                                  minlength=len(self.status_names))
+            else:
+                self.current_counts = np.zeros(len(self.status_names), dtype=np.int64)
+                for status_name in initial_statuses.values():
+                    self.current_counts[self.status_codes[status_name]] += 1
+
+        if self.engine in ('numba', 'tau_leaping'):
+            return self.__simulate_on_arrays(graph, time_interval, initial_statuses)
+
+        if isinstance(graph, ContactNetwork):
+            graph = graph.graph # read only
+
+        if self.event_log is not None:
+            return self.__simulate_streaming(graph, time_interval, initial_statuses)
 
         res = Gillespie_simple_contagion(graph,
                                          self.diagram_indep,
@@ -107,8 +640,220 @@ class KineticModel:
         for s in self.return_statuses:
             self.statuses[s].extend(new_statuses[s])
 
-        self.current_statuses = res.get_statuses(time=self.current_time)
+        self.current_statuses = self.__to_statuses(
+                res.get_statuses(time=self.current_time))
 
         return self.current_statuses
 
+    def __to_statuses(
+            self,
+            statuses):
+        """
+        Convert a mapping node -> status name to Statuses, unless the diagrams
+        have statuses other than Statuses.NAMES
+
+        Input:
+            statuses (dict),
+                     (Statuses): a mapping node -> status name
+        Output:
+            statuses (Statuses),
+                     (dict): the same statuses
+        """
+        if statuses is None or len(self.status_names) > len(Statuses.NAMES):
+            return statuses
+
+        return Statuses.from_dict(statuses)
+
+    def __simulate_streaming(
+            self,
+            graph,
+            time_interval,
+            initial_statuses):
+        """
+        Run simulation.Gillespie_simple_contagion on a given graph, recording
+        the transitions in self.event_log; see simulate
+        """
+        if isinstance(initial_statuses, Statuses):
+            statuses = initial_statuses.to_dict()
+        else:
+            statuses = dict(initial_statuses)
+
+        def record_event(time, node, from_status, to_status):
+            statuses[node] = to_status
+            self.event_log.record(time, node, from_status, to_status)
+            self.current_counts[self.status_codes[from_status]] -= 1
+            self.current_counts[self.status_codes[to_status]] += 1
+
+        Gillespie_simple_contagion(graph,
+                                   self.diagram_indep,
+                                   self.diagram_neigh,
+                                   initial_statuses,
+                                   self.return_statuses,
+                                   tmin=self.current_time,
+                                   tmax=self.current_time + time_interval,
+                                   event_callback=record_event)
+        self.event_log.flush()
+
+        self.current_time += time_interval
+
+        self.__append_current_counts()
+
+        self.current_statuses = self.__to_statuses(statuses)
 
+        return self.current_statuses
+
+    def __append_current_counts(self):
+        """
+        Append the current time and number of nodes per status to self.times
+        and self.statuses
+        """
+        self.times.append(self.current_time)
+
+        for s in self.return_statuses:
+            self.statuses[s].append(self.current_counts[self.status_codes[s]])
+
+    def __simulate_on_arrays(
+            self,
+            graph,
+            time_interval,
+            initial_statuses):
+        """
+        Run simulate_simple_contagion, or its tau-leaping approximation, on a
+        given graph; see simulate
+        """
+        if isinstance(graph, ContactNetwork):
+            nodes = graph.get_nodes()
+            get_node_weights = graph.get_node_attributes
+            get_edge_weights = lambda weight_label: (
+                    graph.get_edge_weights()
+                    if weight_label == ContactNetwork.WJI else None)
+        else:
+            nodes = np.array(graph.nodes)
+            get_node_weights = lambda weight_label: np.fromiter(
+                    nx.get_node_attributes(graph, weight_label).values(),
+                    dtype=float)
+            get_edge_weights = lambda weight_label: nx.to_scipy_sparse_matrix(
+                    graph, weight=weight_label, format='csr')
+
+        codes = self.status_codes
+
+        spontaneous = sorted(self.diagram_indep.edges(data=True))
+        spontaneous_rates = np.empty( (len(spontaneous), nodes.size) )
+        for k, (_, _, data) in enumerate(spontaneous):
+            self.__check_arrays_supported(data)
+            spontaneous_rates[k] = data['rate'] * (
+                    get_node_weights(data['weight_label'])
+                    if 'weight_label' in data else 1.0)
+
+        induced = sorted(self.diagram_neigh.edges(data=True))
+        weight_labels = {data.get('weight_label') for _, _, data in induced}
+        if len(weight_labels) > 1:
+            raise ValueError(
+                    self.__class__.__name__
+                    + ": the array engines need the same weight_label for all "
+                    + "neighbor-dependent transitions")
+        for _, _, data in induced:
+            self.__check_arrays_supported(data)
+
+        weight_label = weight_labels.pop() if weight_labels else None
+        if weight_label is None:
+            edge_weights = get_edge_weights(ContactNetwork.WJI)
+            edge_weights.data[:] = 1.0
+        else:
+            edge_weights = get_edge_weights(weight_label)
+        if edge_weights is None:
+            raise ValueError(
+                    self.__class__.__name__
+                    + ": the array engines only support the edge weights of "
+                    + "a ContactNetwork: "
+                    + weight_label)
+
+        if isinstance(initial_statuses, Statuses):
+            status = initial_statuses.get_codes(nodes).astype(np.int64)
+        else:
+            status = np.fromiter( (codes[initial_statuses[node]] for node in nodes.tolist()),
+                                  dtype=np.int64,
+                                  count=nodes.size)
+        initial_count = np.bincount(status, minlength=len(self.status_names))
+
+        transitions = (
+                np.array([codes[source] for source, _, _ in spontaneous], dtype=np.int64),
+                np.array([codes[target] for _, target, _ in spontaneous], dtype=np.int64),
+                spontaneous_rates,
+                np.array([codes[source[0]] for source, _, _ in induced], dtype=np.int64),
+                np.array([codes[source[1]] for source, _, _ in induced], dtype=np.int64),
+                np.array([codes[target[1]] for _, target, _ in induced], dtype=np.int64),
+                np.array([data['rate'] for _, _, data in induced], dtype=float),
+                edge_weights.indptr.astype(np.int64),
+                edge_weights.indices.astype(np.int64),
+                edge_weights.data.astype(float))
+
+        if self.engine == 'tau_leaping':
+            new_times, events = simulate_simple_contagion_tau_leaping(
+                    status,
+                    len(self.status_names),
+                    self.current_time,
+                    self.current_time + time_interval,
+                    self.tau_leaping_tolerance,
+                    self.TAU_LEAPING_CRITICAL_EVENTS,
+                    self.TAU_LEAPING_EXACT_STEPS,
+                    *transitions)
+        else:
+            new_times, events = simulate_simple_contagion(
+                    status,
+                    self.current_time,
+                    self.current_time + time_interval,
+                    *transitions)
+
+        from_codes, to_codes = events[:, 1], events[:, 2]
+
+        if self.event_log is not None:
+            self.event_log.record_events(new_times, nodes[events[:, 0]], from_codes, to_codes)
+            self.event_log.flush()
+            self.current_counts += (np.bincount(to_codes, minlength=len(self.status_names))
+                                    - np.bincount(from_codes, minlength=len(self.status_names)))
+
+            self.current_time += time_interval
+
+            self.__append_current_counts()
+        else:
+            # counts after each event (at tmin, before any event), and only the
+            # last at each time (events of a leap share a time)
+            changes = np.zeros( (new_times.size, len(self.status_names)), dtype=np.int64)
+            changes[np.arange(new_times.size), from_codes] -= 1
+            changes[np.arange(new_times.size), to_codes] += 1
+            new_times = np.concatenate( ([self.current_time], new_times) )
+            new_counts = initial_count + np.concatenate(
+                    (np.zeros( (1, len(self.status_names)), dtype=np.int64),
+                     np.cumsum(changes, axis=0)) )
+            is_last = np.append(new_times[1:] != new_times[:-1], True)
+
+            self.current_time += time_interval
+
+            self.times.extend(new_times[is_last])
+
+            for s in self.return_statuses:
+                self.statuses[s].extend(new_counts[is_last, codes[s]])
+
+        if len(self.status_names) > len(Statuses.NAMES):
+            self.current_statuses = {node: self.status_names[code]
+                                     for node, code in zip(nodes.tolist(), status.tolist())}
+        else:
+            self.current_statuses = Statuses(nodes, status)
+
+        return self.current_statuses
+
+    def __check_arrays_supported(
+            self,
+            data):
+        """
+        Check that a transition of a diagram is supported by the array engines
+        ('numba' and 'tau_leaping')
+
+        Input:
+            data (dict): attributes of the edge of the diagram
+        """
+        if 'rate_function' in data:
+            raise ValueError(
+                    self.__class__.__name__
+                    + ": the array engines do not support 'rate_function'")
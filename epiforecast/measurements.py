@@ -47,8 +47,11 @@
 import numpy as np
 import copy
 
+from .statuses import Statuses
+from .utilities import dict_slice, mask_by_compartment
 
-STATUS_CATALOG = dict(zip(['S','E','I', 'H', 'R', 'D'], np.arange(6)))
+
+STATUS_CATALOG = Statuses.CODES
 
 
 class TestMeasurement:
@@ -133,19 +136,23 @@ class TestMeasurement:
         -------
 
         """
-        measurements = {}
-        positive_nodes = []
-        
-        for node in nodes_state_dict.keys():
-            if nodes_state_dict[node] == self.status:
-                positive_test = not (self.noisy_measurement and (np.random.random() > self.sensitivity))
-                measurements[node] = self.get_mean(positive_test = positive_test)
-            else:
-                positive_test = (self.noisy_measurement and (np.random.random() < 1 - self.specificity))
-                measurements[node] = self.get_mean(positive_test = positive_test)
-              
-            if positive_test:
-                positive_nodes.append(node)
+        statuses = Statuses.from_dict(nodes_state_dict)
+        in_status = statuses.mask(self.status)
+
+        if self.noisy_measurement:
+            # one draw per node, as a true positive or a false positive
+            random = np.random.random(len(statuses))
+            positive_test = np.where(in_status,
+                                     random <= self.sensitivity,
+                                     random < 1 - self.specificity)
+        else:
+            positive_test = in_status
+
+        means = np.where(positive_test,
+                         self.get_mean(positive_test = True),
+                         self.get_mean(positive_test = False))
+        measurements = dict(zip(statuses.keys(), means.tolist()))
+        positive_nodes = statuses.nodes[positive_test].tolist()
 
         return measurements, positive_nodes
 
@@ -633,7 +640,7 @@ class Observation(StateInformedObservation, TestMeasurement):
         observed_states = np.remainder(self.obs_states,self.N)
         #convert from np.array indexing to the node id in the (sub)graph
         observed_nodes = nodes[observed_states]
-        observed_data = {node : data[node] for node in observed_nodes}
+        observed_data = dict_slice(data, observed_nodes)
         
         mean, positive_nodes = TestMeasurement.take_measurements(self,
                                                       observed_data)
@@ -716,7 +723,7 @@ class BudgetedObservation(BudgetedInformedObservation, TestMeasurement):
             TestMeasurement.update_prevalence(self,
                                               state)
         else:
-            data_prevalence = np.sum([v=='I' for v in data.values()])/len(data) * \
+            data_prevalence = np.count_nonzero(mask_by_compartment(data, 'I'))/len(data) * \
                               np.ones(state.shape[0])
             TestMeasurement.update_prevalence(self,
                                               state,
@@ -726,7 +733,7 @@ class BudgetedObservation(BudgetedInformedObservation, TestMeasurement):
         observed_states = np.remainder(self.obs_states,self.N)
         #convert from np.array indexing to the node id in the (sub)graph
         observed_nodes = nodes[observed_states]
-        observed_data = {node : data[node] for node in observed_nodes}
+        observed_data = dict_slice(data, observed_nodes)
 
         mean, positive_nodes = TestMeasurement.take_measurements(self,
                                                                  observed_data)
@@ -800,7 +807,7 @@ class FixedObservation(FixedNodeObservation, TestMeasurement):
         observed_states = np.remainder(self.obs_states,self.N)
         #convert from np.array indexing to the node id in the (sub)graph
         observed_nodes = nodes[observed_states]
-        observed_data = {node : data[node] for node in observed_nodes}
+        observed_data = dict_slice(data, observed_nodes)
 
         mean, positive_nodes = TestMeasurement.take_measurements(self,
                                                  observed_data)
@@ -881,15 +888,15 @@ class StaticNeighborObservation( StaticNeighborTransferObservation, TestMeasurem
                                           state)
 
         nodes=network.get_nodes()
-        user_graph = network.get_graph()
+        user_graph = network.graph # read only
        
         #mean, var np.arrays of size state
         observed_states = np.remainder(self.obs_states,self.N)
         #convert from np.array indexing to the node id in the (sub)graph
         observed_nodes = nodes[observed_states]
-        observed_data = {node : data[node] for node in observed_nodes}
+        observed_data = dict_slice(data, observed_nodes)
 
-        true_infected = [node for node in nodes if data[node] == 'I']
+        true_infected = nodes[mask_by_compartment(dict_slice(data, nodes), 'I')]
         print("actually infected nodes", true_infected)
         #for ti in true_infected:
         #    print("neighborhood of ", ti, ": ", list(user_graph.neighbors(ti)))
@@ -980,7 +987,7 @@ class HighVarianceObservation(HighVarianceStateInformedObservation, TestMeasurem
         observed_states = np.remainder(self.obs_states,self.N)
         #convert from np.array indexing to the node id in the (sub)graph
         observed_nodes = nodes[observed_states]
-        observed_data = {node : data[node] for node in observed_nodes}
+        observed_data = dict_slice(data, observed_nodes)
 
         mean, positive_nodes = TestMeasurement.take_measurements(self,
                                                       observed_data)
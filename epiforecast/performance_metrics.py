@@ -1,8 +1,10 @@
 import numpy as np
 import sklearn.metrics as skm
-from collections import defaultdict
 import warnings
 
+from .statuses import Statuses
+from .utilities import dict_slice
+
 def confusion_matrix(data,
                      ensemble_states,
                      user_nodes,
@@ -21,9 +23,10 @@ def confusion_matrix(data,
                         'or' : means you assign true if either exceeds the threshold
     """
     if user_nodes is not None:
-        data = {node: data[node] for node in user_nodes}
+        data = dict_slice(data, user_nodes)
+    data = Statuses.from_dict(data)
 
-    status_catalog = dict(zip(['S', 'E', 'I', 'H', 'R', 'D'], np.arange(6)))
+    status_catalog = Statuses.CODES
     status_of_interest = np.array([status_catalog[status] for status in statuses])
     if ensemble_states.ndim == 1:
         #in the case of "1" ensemble member - ensure array is 2 dimensional
@@ -51,8 +54,8 @@ def confusion_matrix(data,
         raise ValueError("please choose methods from 'sum' (default) or 'or' ")
 
     #interface for sklearn
-    data_statuses      = [8 if status_catalog[status] in status_of_interest else 7 for status in list(data.values())]
-    ensemble_statuses  = [8 if positive else 7 for positive in classification]
+    data_statuses      = np.where(np.isin(data.codes, status_of_interest), 8, 7)
+    ensemble_statuses  = np.where(classification, 8, 7)
     labels = [7,8]
 
     return skm.confusion_matrix(data_statuses, ensemble_statuses, labels = labels)
@@ -309,13 +312,11 @@ class PerformanceTracker:
         """
         
         
-        status_catalog = dict(zip(['S','E', 'I', 'H', 'R', 'D'], np.arange(6)))
         population = len(data)
-     
-        a, b = np.unique([v for v in data.values()], return_counts=True)
-        status_counts = defaultdict(int, zip(a, b))
 
-        prevalence = np.array([status_counts[status] for status in self.statuses]).sum()/population
+        status_counts = Statuses.from_dict(data).count()
+
+        prevalence = np.array([status_counts[Statuses.CODES[status]] for status in self.statuses]).sum()/population
 
         if self.prevalence_track is None:
             self.prevalence_track = np.array(prevalence)
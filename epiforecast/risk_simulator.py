@@ -44,71 +44,626 @@
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.          #
 #################################################################################
 
+import os
 import sys
+import warnings
 import numpy as np
-from scipy.integrate import solve_ivp
-from scipy.sparse import coo_matrix
+from scipy.integrate import RK45, OdeSolution
+from scipy.sparse import csr_matrix
+import multiprocessing
 from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from timeit import default_timer as timer
 
-import ray
-from numba import jit 
+from numba import njit, prange
 
 from .contact_simulator import diurnal_inception_rate
-
-@jit(nopython=True)
-def create_CM_data(nonzeros, rows, cols, data, M, yS, yI, yH, Smean, Imean, Hmean, ensemble_correction=True):
-    CM_SI_data = np.zeros(nonzeros)
-    CM_SH_data = np.zeros(nonzeros)
-    CM_SI_coeff = np.zeros(nonzeros)
-    CM_SH_coeff = np.zeros(nonzeros)
-    for k,i,j,v in zip(range(nonzeros), rows, cols, data):
-        #for SI interactions
-        if ensemble_correction==True:
-            CM_SI_coeff[k] = yS[:,i].dot(yI[:,j])/M  #create bar{<S_i,I_j>}
-            CM_SI_coeff[k] /= Smean[i]*Imean[j]+1e-8 #divide by <S_i><I_j>+eps
+from .time_series import SnapshotHistory
+
+@njit(parallel=True)
+def create_CM_data(
+        rows,
+        cols,
+        data,
+        yS_T,
+        yI_T,
+        yH_T,
+        Smean,
+        Imean,
+        Hmean,
+        nodal_ptr_means,
+        ensemble_correction,
+        CM_SI_data,
+        CM_SH_data,
+        CM_SI_coeff,
+        CM_SH_coeff):
+    """
+    Compute closure coefficients and weighted closure data for each edge
+
+    Edges are processed in parallel; ensemble sums are accumulated in the
+    precision of yS_T, yI_T, yH_T (float64 or float32).
+
+    Input:
+        rows (np.array): (nonzeros,) array of source nodes i of the edges
+        cols (np.array): (nonzeros,) array of target nodes j of the edges
+        data (np.array): (nonzeros,) array of weights w_ij
+        yS_T (np.array): (N, M) C-contiguous array of S-states
+        yI_T (np.array): (N, M) C-contiguous array of I-states
+        yH_T (np.array): (N, M) C-contiguous array of H-states
+        Smean (np.array): (N,) array of ensemble means <S_i>
+        Imean (np.array): (N,) array of ensemble means <I_j>
+        Hmean (np.array): (N,) array of ensemble means <H_j>
+        nodal_ptr_means (np.array): (N,) array of ensemble means of partial
+                                    transmission rates (ones if not used)
+        ensemble_correction (bool): whether to compute ensemble correlations
+        CM_SI_data (np.array): (nonzeros,) output array of SI data
+        CM_SH_data (np.array): (nonzeros,) output array of SH data
+        CM_SI_coeff (np.array): (nonzeros,) output array of SI coefficients
+        CM_SH_coeff (np.array): (nonzeros,) output array of SH coefficients
+    Output:
+        None
+    """
+    M = yS_T.shape[1]
+
+    for k in prange(rows.size):
+        i = rows[k]
+        j = cols[k]
+
+        if ensemble_correction:
+            # initializing with the first term keeps the precision of inputs
+            SI = yS_T[i,0] * yI_T[j,0]
+            SH = yS_T[i,0] * yH_T[j,0]
+            for m in range(1, M):
+                SI += yS_T[i,m] * yI_T[j,m]
+                SH += yS_T[i,m] * yH_T[j,m]
+
+            CM_SI_coeff[k] = SI / M / (Smean[i]*Imean[j]+1e-8) #bar{<S_i,I_j>}/(<S_i><I_j>+eps)
+            CM_SH_coeff[k] = SH / M / (Smean[i]*Hmean[j]+1e-8)
         else:
             CM_SI_coeff[k] = 1.
-        CM_SI_data[k] = CM_SI_coeff[k] * v       #multiply by the weight matrix wij
-
-        #for SH interactions
-        if ensemble_correction==True:
-            CM_SH_coeff[k] = yS[:,i].dot(yH[:,j])/M
-            CM_SH_coeff[k] /= Smean[i]*Hmean[j]+1e-8
-        else:
             CM_SH_coeff[k] = 1.
-        CM_SH_data[k] = CM_SH_coeff[k] * v
-
-    return CM_SI_data, CM_SH_data, CM_SI_coeff, CM_SH_coeff
-
-@jit(nopython=True)
-def create_CM_data_ptr(nonzeros, rows, cols, data, M, yS, yI, yH, Smean, Imean, Hmean, ptr, ensemble_correction=True):
-    CM_SI_data = np.zeros(nonzeros)
-    CM_SH_data = np.zeros(nonzeros)
-    CM_SI_coeff = np.zeros(nonzeros)
-    CM_SH_coeff = np.zeros(nonzeros)
-    for k,i,j,v in zip(range(nonzeros), rows, cols, data):
-        #for SI interactions
-        if ensemble_correction==True:
-            CM_SI_coeff[k] = yS[:,i].dot(yI[:,j])/M  #create bar{<S_i,I_j>}
-            CM_SI_coeff[k] /= Smean[i]*Imean[j]+1e-8 #divide by <S_i><I_j>+eps
-        else:
-            CM_SI_coeff[k] = 1.
-        CM_SI_data[k] = CM_SI_coeff[k] * v       #multiply by the weight matrix wij
-        CM_SI_data[k] *= 0.5*(ptr[:,i] + ptr[:,j]).mean()
 
-        #for SH interactions
-        if ensemble_correction==True:
-            CM_SH_coeff[k] = yS[:,i].dot(yH[:,j])/M
-            CM_SH_coeff[k] /= Smean[i]*Hmean[j]+1e-8
+        weight = data[k] * 0.5*(nodal_ptr_means[i] + nodal_ptr_means[j])
+        CM_SI_data[k] = CM_SI_coeff[k] * weight
+        CM_SH_data[k] = CM_SH_coeff[k] * weight
+
+@njit
+def master_equations_rhs(
+        rhs,
+        member_state,
+        member_coefficients,
+        member_closure,
+        prevalence_indep_exogenous_rates,
+        exogenous_flag):
+    """
+    Compute right-hand side of master equations of one member into `rhs`
+
+    All six compartments are computed in a single pass over the nodes, without
+    temporary arrays.
+
+    Input:
+        rhs (np.array): (6*N,) output array
+        member_state (np.array): (6*N,) array of states
+        member_coefficients (np.array): (8*N,) array of coefficients of the
+                                        linear part of the RHS
+        member_closure (np.array): (N,) array of coefficients for S_i's
+        prevalence_indep_exogenous_rates (np.array): (N,) array; when
+                                        multiplied by prevalence, gives the
+                                        exogenous rates
+        exogenous_flag (bool): whether to use exogenous rates
+    Output:
+        rhs (np.array): (6*N,) right-hand side of master equations
+    """
+    N = member_closure.size
+
+    prevalence = 0.0
+    if exogenous_flag:
+        prevalence = member_state[2*N:3*N].mean()
+
+    for i in range(N):
+        S = member_state[      i]
+        E = member_state[  N + i]
+        I = member_state[2*N + i]
+        H = member_state[3*N + i]
+
+        sigma  = member_coefficients[      i]
+        gamma  = member_coefficients[  N + i]
+        delta  = member_coefficients[2*N + i]
+        xi     = member_coefficients[3*N + i]
+        mu     = member_coefficients[4*N + i]
+        gammap = member_coefficients[5*N + i]
+        xip    = member_coefficients[6*N + i]
+        mup    = member_coefficients[7*N + i]
+
+        infection = member_closure[i]
+        if exogenous_flag:
+            infection += prevalence * prevalence_indep_exogenous_rates[i]
+        infection *= S
+
+        rhs[      i] = -infection
+        rhs[  N + i] =  infection - sigma * E
+        rhs[2*N + i] = sigma * E - gamma  * I
+        rhs[3*N + i] = delta * I - gammap * H
+        rhs[4*N + i] = xi    * I + xip    * H
+        rhs[5*N + i] = mu    * I + mup    * H
+
+    return rhs
+
+@njit
+def ensemble_master_equations_rhs(
+        rhs,
+        ensemble_state,
+        members,
+        coefficients,
+        closure,
+        prevalence_indep_exogenous_rates,
+        exogenous_flag):
+    """
+    Compute right-hand side of master equations of several members into `rhs`
+
+    Input:
+        rhs (np.array): (K, 6*N) output array
+        ensemble_state (np.array): (K, 6*N) array of states of `members`
+        members (np.array): (K,) array of indices of the members
+        coefficients (np.array): (M, 8*N) array of coefficients of all members
+        closure (np.array): (M, N) array of closures of all members
+        prevalence_indep_exogenous_rates (np.array): (N,) array; see above
+        exogenous_flag (bool): whether to use exogenous rates
+    Output:
+        rhs (np.array): (K, 6*N) right-hand side of master equations
+    """
+    for k in range(members.size):
+        master_equations_rhs(rhs[k],
+                             ensemble_state[k],
+                             coefficients[members[k]],
+                             closure[members[k]],
+                             prevalence_indep_exogenous_rates,
+                             exogenous_flag)
+
+    return rhs
+
+@njit
+def lower_triangular_matmul(
+        A,
+        B,
+        out):
+    """
+    Multiply two lower-triangular square matrices into `out`
+
+    Only the lower triangle of `out` is written; the upper one must be zero.
+    """
+    n = A.shape[0]
+    for i in range(n):
+        for j in range(i + 1):
+            acc = 0.0
+            for k in range(j, i + 1):
+                acc += A[i,k] * B[k,j]
+            out[i,j] = acc
+
+@njit
+def lower_triangular_expm(
+        X,
+        F,
+        work,
+        taylor_order=6):
+    """
+    Compute matrix exponential of a small lower-triangular matrix into `F`
+
+    Scaling and squaring with a Taylor polynomial: X is scaled by 2^-s so that
+    its 1-norm is at most 0.25, which makes the relative truncation error of
+    the Taylor polynomial of order 6 about 1e-8.
+
+    Input:
+        X (np.array): (n, n) lower-triangular matrix; overwritten (scaled)
+        F (np.array): (n, n) output; upper triangle must be zero
+        work (np.array): (n, n) scratch; upper triangle must be zero
+        taylor_order (int): order of the Taylor polynomial
+    Output:
+        None
+    """
+    n = X.shape[0]
+
+    norm = 0.0
+    for j in range(n):
+        column_sum = 0.0
+        for i in range(j, n):
+            column_sum += abs(X[i,j])
+        norm = max(norm, column_sum)
+
+    n_squarings = 0
+    while norm > 0.25:
+        norm *= 0.5
+        n_squarings += 1
+
+    scaling = 0.5**n_squarings
+    for i in range(n):
+        for j in range(i + 1):
+            X[i,j] *= scaling
+
+    # Horner scheme: F = I + X (I + X/2 (I + X/3 (...)))
+    for i in range(n):
+        for j in range(i + 1):
+            F[i,j] = 1.0 if i == j else 0.0
+
+    for k in range(taylor_order, 0, -1):
+        lower_triangular_matmul(X, F, work)
+        for i in range(n):
+            for j in range(i + 1):
+                F[i,j] = work[i,j] / k
+            F[i,i] += 1.0
+
+    for _ in range(n_squarings):
+        lower_triangular_matmul(F, F, work)
+        for i in range(n):
+            for j in range(i + 1):
+                F[i,j] = work[i,j]
+
+@njit(parallel=True)
+def exponential_master_equations_step(
+        ensemble_state,
+        coefficients,
+        closure,
+        prevalence_indep_exogenous_rates,
+        exogenous_flag,
+        time_step):
+    """
+    Advance master equations of all members in-place by the exact solution
+
+    With the closure (and prevalence) frozen, the master equations of each node
+    form a linear system with the lower-triangular 6x6 matrix (the order is
+    S, E, I, H, R, D)
+
+        | -c                          |
+        |  c  -sigma                  |
+        |      sigma  -gamma          |
+        |              delta  -gammap |
+        |              xi      xip    |
+        |              mu      mup    |
+
+    where c = closure (+ prevalence * exogenous rate); its matrix exponential
+    is applied to each node's 6-state block. The prevalence of each member is
+    estimated at the midpoint of the step by linear extrapolation.
+
+    Input:
+        ensemble_state (np.array): (M, 6*N) array of states; updated in-place
+        coefficients (np.array): (M, 8*N) array of coefficients of all members
+        closure (np.array): (M, N) array of closures of all members
+        prevalence_indep_exogenous_rates (np.array): (N,) array; when
+                                        multiplied by prevalence, gives the
+                                        exogenous rates
+        exogenous_flag (bool): whether to use exogenous rates
+        time_step (float): time step (negative for backward integration)
+    Output:
+        None
+    """
+    M = ensemble_state.shape[0]
+    N = closure.shape[1]
+    h = time_step
+
+    for m in prange(M):
+        X = np.zeros((6, 6))
+        F = np.zeros((6, 6))
+        work = np.zeros((6, 6))
+        x = np.empty(6)
+
+        member_state = ensemble_state[m]
+        member_coefficients = coefficients[m]
+
+        # prevalence at the midpoint of the step, extrapolated linearly
+        prevalence = 0.0
+        if exogenous_flag:
+            for i in range(N):
+                sigma = member_coefficients[    i]
+                gamma = member_coefficients[N + i]
+                E = member_state[  N + i]
+                I = member_state[2*N + i]
+                prevalence += I + 0.5 * h * (sigma * E - gamma * I)
+            prevalence /= N
+
+        for i in range(N):
+            c = closure[m,i]
+            if exogenous_flag:
+                c += prevalence * prevalence_indep_exogenous_rates[i]
+
+            sigma  = member_coefficients[      i]
+            gamma  = member_coefficients[  N + i]
+            delta  = member_coefficients[2*N + i]
+            xi     = member_coefficients[3*N + i]
+            mu     = member_coefficients[4*N + i]
+            gammap = member_coefficients[5*N + i]
+            xip    = member_coefficients[6*N + i]
+            mup    = member_coefficients[7*N + i]
+
+            X[0,0] = -c * h
+            X[1,0] =  c * h
+            X[1,1] = -sigma * h
+            X[2,1] =  sigma * h
+            X[2,2] = -gamma * h
+            X[3,2] =  delta * h
+            X[3,3] = -gammap * h
+            X[4,2] =  xi * h
+            X[4,3] =  xip * h
+            X[5,2] =  mu * h
+            X[5,3] =  mup * h
+
+            lower_triangular_expm(X, F, work)
+
+            for k in range(6):
+                x[k] = member_state[k*N + i]
+            for k in range(6):
+                acc = 0.0
+                for j in range(k + 1):
+                    acc += F[k,j] * x[j]
+                member_state[k*N + i] = acc
+
+def solve_member_ivp(
+        fun,
+        t_span,
+        y0,
+        max_step=np.inf,
+        first_step=None,
+        dense_output=False):
+    """
+    Integrate a single ODE system with scipy's RK45 and report its last step
+
+    This does what scipy.integrate.solve_ivp(method='RK45') does for the
+    endpoint of `t_span`, but also returns the step size the controller would
+    have taken next, so that the next integration can be warm-started with it
+    instead of re-selecting an initial step from scratch.
+
+    Input:
+        fun (callable): right-hand side; fun(t, y) returns derivatives
+        t_span (list): [start_time, stop_time]
+        y0 (np.array): (K,) array of initial states
+        max_step (float): maximum allowed step size
+        first_step (float): initial step size; if None, selected by RK45
+        dense_output (bool): whether to return the continuous solution
+    Output:
+        y (np.array): (K,) array of states at stop_time
+        step (float): absolute value of the step size to warm-start with
+        solution (OdeSolution): continuous solution on t_span, or None
+    """
+    # a copy, since dense output keeps references to the initial states
+    y0 = np.array(y0, dtype=float)
+
+    t0, t1 = t_span
+    if t1 == t0:
+        return y0, np.nan if first_step is None else first_step, None
+
+    if first_step is not None:
+        first_step = min(first_step, abs(t1 - t0))
+
+    solver = RK45(fun, t0, y0, t1, max_step=max_step, first_step=first_step)
+
+    ts = [t0]
+    interpolants = []
+    while solver.status == 'running':
+        # the step proposed before the last one, which is cut to land on t1
+        proposed_step = min(solver.h_abs, max_step)
+        message = solver.step()
+        if solver.status == 'failed':
+            raise RuntimeError("solve_member_ivp: " + message)
+
+        if dense_output:
+            ts.append(solver.t)
+            interpolants.append(solver.dense_output())
+
+    # as in integrate_ensemble_rk45: the larger of the steps proposed before
+    # and after the last (cut) step
+    step = max(proposed_step, solver.h_abs)
+    solution = OdeSolution(ts, interpolants) if dense_output else None
+
+    return solver.y, step, solution
+
+# Dormand-Prince 5(4) coefficients; the same tableau as in scipy's RK45 (the
+# nodes 'c' are not needed since the master equations are autonomous)
+DOPRI_A = np.array([
+    [0,          0,           0,          0,        0,           0],
+    [1/5,        0,           0,          0,        0,           0],
+    [3/40,       9/40,        0,          0,        0,           0],
+    [44/45,      -56/15,      32/9,       0,        0,           0],
+    [19372/6561, -25360/2187, 64448/6561, -212/729, 0,           0],
+    [9017/3168,  -355/33,     46732/5247, 49/176,   -5103/18656, 0]
+])
+DOPRI_B = np.array([35/384, 0, 500/1113, 125/192, -2187/6784, 11/84])
+DOPRI_E = np.array([-71/57600, 0, 71/16695, -71/1920, 17253/339200, -22/525,
+                    1/40])
+
+def rms_norm_rows(x):
+    """
+    Compute root-mean-square norm of each row of a 2-D array
+
+    Input:
+        x (np.array): (M, K) array
+    Output:
+        norms (np.array): (M,) array of norms
+    """
+    return np.sqrt(np.mean(x**2, axis=1))
+
+def select_initial_steps(
+        fun,
+        rows,
+        y,
+        f,
+        direction,
+        rtol,
+        atol):
+    """
+    Select initial step for each row of an ensemble of ODE systems
+
+    This is a row-wise version of scipy.integrate._ivp.common.select_initial_step
+    (E. Hairer, S. P. Norsett, G. Wanner, "Solving Ordinary Differential
+    Equations I", Sec. II.4) for a method of order 5.
+
+    Input:
+        fun (callable): right-hand side; fun(y, rows, out) writes derivatives
+                        of the states y of members `rows` into `out`
+        rows (np.array): (M,) array of indices of the members
+        y (np.array): (M, K) array of initial states of `rows`
+        f (np.array): (M, K) array of right-hand sides at y
+        direction (float): +1 or -1, direction of integration
+        rtol (float): relative tolerance
+        atol (float): absolute tolerance
+    Output:
+        h (np.array): (M,) array of absolute values of initial steps
+    """
+    scale = atol + np.abs(y) * rtol
+    d0 = rms_norm_rows(y / scale)
+    d1 = rms_norm_rows(f / scale)
+
+    small = (d0 < 1e-5) | (d1 < 1e-5)
+    h0 = np.where(small, 1e-6, 0.01 * d0 / np.where(small, 1.0, d1))
+
+    y1 = y + direction * h0[:,np.newaxis] * f
+    f1 = np.empty_like(y)
+    fun(y1, rows, f1)
+    d2 = rms_norm_rows((f1 - f) / scale) / h0
+
+    d12 = np.maximum(d1, d2)
+    h1 = np.where(d12 <= 1e-15,
+                  np.maximum(1e-6, h0 * 1e-3),
+                  (0.01 / np.where(d12 <= 1e-15, 1.0, d12))**(1/5))
+
+    return np.minimum(100 * h0, h1)
+
+def integrate_ensemble_rk45(
+        fun,
+        t_span,
+        y0,
+        max_step=np.inf,
+        rtol=1e-3,
+        atol=1e-6,
+        first_step=None):
+    """
+    Integrate an ensemble of independent autonomous ODE systems with RK45
+
+    The whole (M, K) ensemble is advanced at once by an explicit Dormand-Prince
+    5(4) stepper written over 2-D arrays, so that each stage costs a single
+    call to `fun` for all members. Every row (member) has its own step size
+    and error control, identical to those of scipy's RK45 (including its
+    minimum step, and the factor capped at 1 after a rejected step); members
+    that have reached the end of `t_span` are dropped from subsequent stages.
+
+    Input:
+        fun (callable): right-hand side; fun(y, rows, out) writes derivatives
+                        of the states y of members `rows` (array of indices)
+                        into the preallocated (len(rows), K) array `out`
+        t_span (list): [start_time, stop_time]
+        y0 (np.array): (M, K) array of initial states
+        max_step (float): maximum allowed step size
+        rtol (float): relative tolerance
+        atol (float): absolute tolerance
+        first_step (np.array): (M,) array of initial step sizes; rows with NaN
+                               (or all rows, if None) are selected as in RK45
+    Output:
+        y (np.array): (M, K) array of states at stop_time
+        h_abs (np.array): (M,) array of step sizes to warm-start with
+
+    Raises RuntimeError if the step size of a member drops below scipy's
+    minimum step (or becomes NaN), where scipy's RK45 fails, too.
+    """
+    safety, min_factor, max_factor = 0.9, 0.2, 10.0
+    error_exponent = -1 / 5
+
+    t0, t1 = t_span
+    direction = np.sign(t1 - t0) if t1 != t0 else 1.0
+
+    y = np.array(y0, dtype=float)
+    M = y.shape[0]
+    if first_step is None:
+        first_step = np.full(M, np.nan)
+    if t1 == t0:
+        return y, np.array(first_step, dtype=float)
+
+    all_rows = np.arange(M)
+    t = np.full(M, float(t0))
+    f = np.empty_like(y)
+    fun(y, all_rows, f)
+    h_abs = np.array(first_step, dtype=float)
+    cold = np.isnan(h_abs)
+    if cold.any():
+        h_abs[cold] = select_initial_steps(
+                fun, all_rows[cold], y[cold], f[cold], direction, rtol, atol)
+    h_abs = np.minimum(h_abs, max_step)
+
+    active = np.ones(M, dtype=bool)
+    # whether the current step of a row has been rejected (and is retried)
+    rejected = np.zeros(M, dtype=bool)
+    K = np.empty((DOPRI_E.size,) + y.shape)
+
+    while active.any():
+        if active.all():
+            rows = all_rows
+            y_rows = y
         else:
-            CM_SH_coeff[k] = 1.
-        CM_SH_data[k] = CM_SH_coeff[k] * v
-        CM_SH_data[k] *= 0.5*(ptr[:,i] + ptr[:,j]).mean()
-
-    return CM_SI_data, CM_SH_data, CM_SI_coeff, CM_SH_coeff
+            rows = np.flatnonzero(active)
+            y_rows = y[rows]
+        n_rows = rows.size
+
+        # as in scipy: a new step is at least min_step, a retried one fails
+        # below it
+        min_step = 10 * np.abs(np.nextafter(t[rows], direction * np.inf)
+                               - t[rows])
+        h_proposed = np.minimum(h_abs[rows], max_step)
+        h_proposed = np.where(rejected[rows],
+                              h_proposed,
+                              np.maximum(h_proposed, min_step))
+        if not np.all(h_proposed >= min_step): # also NaN
+            raise RuntimeError(
+                    "integrate_ensemble_rk45: "
+                    + "Required step size is less than spacing between "
+                    + "numbers (members "
+                    + str(rows[~(h_proposed >= min_step)])
+                    + ")")
+
+        last_step = h_proposed >= np.abs(t1 - t[rows])
+        h_rows = np.where(last_step, np.abs(t1 - t[rows]), h_proposed)
+        h = (direction * h_rows)[:,np.newaxis]
+
+        K_rows = K[:, :n_rows]
+        K_rows[0] = f[rows]
+        for s in range(1, DOPRI_B.size):
+            dy = np.tensordot(DOPRI_A[s,:s], K_rows[:s], axes=1) * h
+            fun(y_rows + dy, rows, K_rows[s])
+
+        y_new = y_rows + np.tensordot(DOPRI_B, K_rows[:-1], axes=1) * h
+        fun(y_new, rows, K_rows[-1])
+
+        scale = atol + np.maximum(np.abs(y_rows), np.abs(y_new)) * rtol
+        error = np.tensordot(DOPRI_E, K_rows, axes=1) * h
+        error_norm = rms_norm_rows(error / scale)
+
+        # NaN norms are rejected, and the step shrinks as much as possible
+        # (np.fmax ignores NaN), until it is too small
+        accepted = error_norm < 1
+        with np.errstate(divide='ignore', invalid='ignore'):
+            factor = safety * error_norm**error_exponent
+        factor = np.where(accepted,
+                          np.minimum(max_factor, factor),
+                          np.fmax(min_factor, factor))
+        factor = np.where(accepted & rejected[rows],
+                          np.minimum(1.0, factor),
+                          factor)
+        rejected[rows] = ~accepted
+
+        accepted_rows = rows[accepted]
+        y[accepted_rows] = y_new[accepted]
+        f[accepted_rows] = K_rows[-1][accepted]
+        t[accepted_rows] += direction * h_rows[accepted]
+        h_abs[rows] = h_rows * factor
+
+        # rows whose accepted step was the last one are done; that step was
+        # cut to land on t1, so the one proposed before is kept for warm starts
+        done = accepted & last_step
+        h_abs[rows[done]] = np.maximum(h_abs[rows[done]], h_proposed[done])
+        active[rows[done]] = False
+
+    return y, h_abs
 
 class MasterEquationModelEnsemble:
+    # maximum relative error of float32 closure coefficients w.r.t. float64
+    CLOSURE_FLOAT32_RTOL = 1e-4
+
     def __init__(
             self,
             population,
@@ -120,7 +675,15 @@ class MasterEquationModelEnsemble:
             start_time=0.0,
             parallel_cpu=False,
             num_cpus=1,
-            ensemble_correction=True):
+            ensemble_correction=True,
+            integration_method='RK45',
+            closure_float32=False,
+            closure_history='all',
+            closure_history_length=None,
+            closure_history_path=None,
+            members_per_task=1,
+            warm_start=True,
+            parallel_backend=None):
         """
         Constructor
 
@@ -143,6 +706,49 @@ class MasterEquationModelEnsemble:
             start_time (float): start time of the simulation
             parallel_cpu (bool): whether to run computation in parallel on CPU
             num_cpus (int): number of CPUs available; only used in parallel mode
+            ensemble_correction (bool): whether to correct the closure by
+                                        ensemble correlations
+            integration_method (str): how to integrate the ensemble in serial
+                                      mode; one of:
+                - 'RK45': scipy's RK45 for each member, one at a time
+                - 'ensemble_RK45': whole (M, 6*N) ensemble at once by a
+                                   batched RK45 stepper
+                - 'exponential': exact solution of the (linear, with the
+                                 closure frozen) equations by per-node 6x6
+                                 matrix exponentials; with exogenous rates,
+                                 the prevalence is frozen (at its midpoint
+                                 estimate) over each of `min_steps` substeps
+                                 of `simulate`
+                                      in parallel mode, members are always
+                                      integrated by 'RK45', and other values
+                                      are ignored with a warning
+            closure_float32 (bool): whether to accumulate ensemble correlations
+                                    of the closure in float32; the result is
+                                    checked against float64 once per sparsity
+                                    pattern of the contact matrix
+            closure_history (str): retention policy of closure coefficients
+                                   history; see SnapshotHistory for options
+            closure_history_length (int): number of latest evaluations to keep
+                                          for closure_history='last'
+            closure_history_path (str): directory to stream coefficients to
+                                        for closure_history='file'; files are
+                                        CM_SI_coeff.bin and CM_SH_coeff.bin
+            members_per_task (int): number of members integrated by a worker
+                                    per task in parallel mode; idle workers
+                                    take the next task from a common queue
+            warm_start (bool): whether to start each member's RK45 integration
+                               with its last step size (of the previous
+                               `simulate` call) instead of selecting it anew
+            parallel_backend (str): how members are integrated; one of
+                                    'serial' (loop in this process),
+                                    'processes' (pool of processes, forked
+                                    from a forkserver process, which imports
+                                    the calling script; the script then needs
+                                    an `if __name__ == '__main__':` guard),
+                                    'ray' (ray actors; ray is only imported
+                                    then, and has to be initialized);
+                                    if None, 'ray' if parallel_cpu is True,
+                                    'serial' otherwise
         """
 
         self.M = ensemble_size
@@ -166,13 +772,67 @@ class MasterEquationModelEnsemble:
 
         self.hospital_transmission_reduction = hospital_transmission_reduction
 
-        self.CM_SI_coeff_history = []
-        self.CM_SH_coeff_history = []
+        if closure_history == 'file':
+            CM_SI_path = os.path.join(closure_history_path, 'CM_SI_coeff.bin')
+            CM_SH_path = os.path.join(closure_history_path, 'CM_SH_coeff.bin')
+        else:
+            CM_SI_path = CM_SH_path = None
+
+        self.CM_SI_coeff_history = SnapshotHistory(closure_history,
+                                                   closure_history_length,
+                                                   CM_SI_path)
+        self.CM_SH_coeff_history = SnapshotHistory(closure_history,
+                                                   closure_history_length,
+                                                   CM_SH_path)
+
+        # cached sparsity pattern of self.L; see __update_closure_pattern
+        self.CM_SI = None
+        self.CM_SH = None
+        self.CM_rows = None
+
+        self.closure_float32 = closure_float32
+        self.closure_float32_checked = False
 
         self.ensemble_correction = ensemble_correction
 
-        self.parallel_cpu = parallel_cpu
-        if parallel_cpu:
+        if integration_method not in ('RK45', 'ensemble_RK45', 'exponential'):
+            raise ValueError(
+                    self.__class__.__name__
+                    + ": this value of 'integration_method' is not supported: "
+                    + integration_method)
+        self.integration_method = integration_method
+
+        # step sizes to warm-start the RK45 integrations with; NaN means none
+        self.warm_start = warm_start
+        self.member_steps = np.full(self.M, np.nan)
+
+        # continuous solutions of the last `simulate` call; see get_dense_output
+        self.dense_output_span = None
+        self.dense_output_solutions = None
+
+        if parallel_backend is None:
+            parallel_backend = 'ray' if parallel_cpu else 'serial'
+
+        if parallel_backend not in ('serial', 'processes', 'ray'):
+            raise ValueError(
+                    self.__class__.__name__
+                    + ": this value of 'parallel_backend' is not supported: "
+                    + parallel_backend)
+        self.parallel_backend = parallel_backend
+
+        self.parallel_cpu = parallel_backend != 'serial'
+
+        # workers always integrate their members by RK45; keep the method that
+        # actually runs, so that checks against it (e.g. for dense output) hold
+        if self.parallel_cpu and integration_method != 'RK45':
+            warnings.warn(
+                    self.__class__.__name__
+                    + ": 'integration_method' is ignored in parallel mode, "
+                    + "where members are integrated by RK45: "
+                    + integration_method)
+            self.integration_method = 'RK45'
+
+        if self.parallel_cpu:
             # need to save SharedMemory objects b/c otherwise they're
             # garbage-collected at the end of constructor
 
@@ -208,18 +868,37 @@ class MasterEquationModelEnsemble:
                                                                dtype=np.float_,
                                                                buffer=self.exog_shm.buf)
 
-            members_chunks = np.array_split(np.arange(self.M), num_cpus)
-
-            self.integrators = [
-                    RemoteIntegrator.remote(members_chunks[j],
-                                            self.M,
-                                            self.N,
-                                            self.y0_shm.name,
-                                            self.coefficients_shm.name,
-                                            self.closure_shm.name,
-                                            self.exog_shm.name)
-                    for j in range(num_cpus)
-            ]
+            self.member_tasks = np.array_split(
+                    np.arange(self.M),
+                    int(np.ceil(self.M / members_per_task)))
+
+            integrator_args = (self.M,
+                               self.N,
+                               self.y0_shm.name,
+                               self.coefficients_shm.name,
+                               self.closure_shm.name,
+                               self.exog_shm.name)
+
+            # workers attach to shared memory once, and keep their views
+            if parallel_backend == 'ray':
+                import ray
+
+                RemoteIntegrator = ray.remote(EnsembleIntegrator)
+                self.integrators = [
+                        RemoteIntegrator.remote(*integrator_args)
+                        for j in range(num_cpus)
+                ]
+            else:
+                # workers are forked from a fresh server process, not from
+                # this one: forking a process whose parallel numba kernels
+                # have started threads is not safe with some threading layers
+                # (e.g. tbb); the server imports the calling script, hence
+                # the script needs an `if __name__ == '__main__':` guard
+                self.executor = ProcessPoolExecutor(
+                        max_workers=num_cpus,
+                        mp_context=multiprocessing.get_context('forkserver'),
+                        initializer=initialize_process_integrator,
+                        initargs=integrator_args)
         else:
             self.y0           = np.empty( (self.M, 6*self.N) )
             self.closure      = np.empty( (self.M,   self.N) )
@@ -421,39 +1100,39 @@ class MasterEquationModelEnsemble:
         Output:
             rhs (np.array): (6*N,) right-hand side of master equations
         """
-        S_substate = member_state[self.S_slice]
-        E_substate = member_state[self.E_slice]
-        I_substate = member_state[self.I_slice]
-        H_substate = member_state[self.H_slice]
-        
-        (sigma,
-         gamma,
-         delta,
-         xi,
-         mu,
-         gammap,
-         xip,
-         mup
-        ) = self.coefficients[j].reshape( (8, -1) )
-
+        # RK45 keeps references to returned arrays; hence, a new one
         rhs = np.empty(6 * self.N)
 
-        
-        if not self.exogenous_flag:
-            rhs[self.S_slice] = -self.closure[j] * S_substate 
-            rhs[self.E_slice] =  self.closure[j] * S_substate - sigma * E_substate
-        else:
-            prevalence = I_substate.mean(axis = 1)
+        return master_equations_rhs(rhs,
+                                    member_state,
+                                    self.coefficients[j],
+                                    self.closure[j],
+                                    self.prevalence_indep_exogenous_rates,
+                                    self.exogenous_flag)
 
-            rhs[self.S_slice] = -(self.closure[j] + prevalence * self.prevalence_indep_exogenous_rates) * S_substate
-            rhs[self.E_slice] =  (self.closure[j] + prevalence * self.prevalence_indep_exogenous_rates) * S_substate - sigma * E_substate
-        
-        rhs[self.I_slice] = sigma * E_substate - gamma  * I_substate
-        rhs[self.H_slice] = delta * I_substate - gammap * H_substate
-        rhs[self.R_slice] = xi    * I_substate + xip    * H_substate
-        rhs[self.D_slice] = mu    * I_substate + mup    * H_substate
+    def compute_ensemble_rhs(
+            self,
+            ensemble_state,
+            members,
+            rhs):
+        """
+        Compute right-hand side of master equations for several members at once
 
-        return rhs
+        Input:
+            ensemble_state (np.array): (K, 6*N) array of states of `members`
+            members (np.array): (K,) array of indices of the members
+            rhs (np.array): (K, 6*N) output array
+        Output:
+            rhs (np.array): (K, 6*N) right-hand side of master equations
+        """
+        return ensemble_master_equations_rhs(
+                rhs,
+                ensemble_state,
+                members,
+                self.coefficients,
+                self.closure,
+                self.prevalence_indep_exogenous_rates,
+                self.exogenous_flag)
 
     def compute_prevalence_indep_exogenous_rates(self):
         """
@@ -489,62 +1168,63 @@ class MasterEquationModelEnsemble:
             iS, iI, iH = self.S_slice, self.I_slice, self.H_slice
             y = self.y0
 
+            L_data = self.__update_closure_pattern()
+            rows = self.CM_rows
+            cols = self.CM_SI.indices
+            nonzeros = rows.size
+
             S_ensemble_mean = y[:,iS].mean(axis=0)
             I_ensemble_mean = y[:,iI].mean(axis=0)
             H_ensemble_mean = y[:,iH].mean(axis=0)
-            yS = y[:,iS]
-            yI = y[:,iI]
-            yH = y[:,iH]
-
-            cooL = self.L.tocoo()
-            nonzeros = len(cooL.row)
-            cooL_rows = cooL.row
-            cooL_cols = cooL.col
-            cooL_data = cooL.data
-            
+
+            # (N, M) contiguous states make per-edge ensemble averages cheap
+            yI_T = np.ascontiguousarray(y[:,iI].T)
+            yH_T = np.ascontiguousarray(y[:,iH].T)
+            if self.closure_float32:
+                states_T = (np.ascontiguousarray(y[:,iS].T, dtype=np.float32),
+                            yI_T.astype(np.float32),
+                            yH_T.astype(np.float32))
+            else:
+                states_T = (np.ascontiguousarray(y[:,iS].T), yI_T, yH_T)
+
             # if we have a global transmission parameter, this is accounted for in self.ensemble_beta_* 
             # if we have a nodally defined transmission parameter, the partial transmissions are 
             # accounted for in the closure calculation
             if self.full_transmission_rate_flag:
-                CM_SI_data,CM_SH_data, CM_SI_coeff, CM_SH_coeff = create_CM_data(
-                    nonzeros,
-                    cooL_rows,
-                    cooL_cols,
-                    cooL_data,
-                    self.M,
-                    yS,
-                    yI,
-                    yH,
-                    S_ensemble_mean,
-                    I_ensemble_mean,
-                    H_ensemble_mean,
-                    ensemble_correction=self.ensemble_correction)
+                nodal_ptr_means = np.ones(self.N)
             else:
-                CM_SI_data,CM_SH_data, CM_SI_coeff, CM_SH_coeff = create_CM_data_ptr(
-                    nonzeros,
-                    cooL_rows,
-                    cooL_cols,
-                    cooL_data,
-                    self.M,
-                    yS,
-                    yI,
-                    yH,
-                    S_ensemble_mean,
-                    I_ensemble_mean,
-                    H_ensemble_mean,
-                    self.partial_transmission_rates,
-                    ensemble_correction=self.ensemble_correction)
+                nodal_ptr_means = self.partial_transmission_rates.mean(axis=0)
+
+            closure_args = (rows,
+                            cols,
+                            L_data,
+                            S_ensemble_mean,
+                            I_ensemble_mean,
+                            H_ensemble_mean,
+                            nodal_ptr_means,
+                            self.ensemble_correction)
+
+            CM_SI_coeff = np.empty(nonzeros)
+            CM_SH_coeff = np.empty(nonzeros)
+            create_CM_data(*closure_args[:3],
+                           *states_T,
+                           *closure_args[3:],
+                           self.CM_SI.data,
+                           self.CM_SH.data,
+                           CM_SI_coeff,
+                           CM_SH_coeff)
+
+            if self.closure_float32 and not self.closure_float32_checked:
+                CM_SI_coeff, CM_SH_coeff = self.__check_closure_float32(
+                        closure_args,
+                        CM_SI_coeff,
+                        CM_SH_coeff)
 
             self.CM_SI_coeff_history.append(CM_SI_coeff)
             self.CM_SH_coeff_history.append(CM_SH_coeff)
 
-            CM_S = coo_matrix((np.array(CM_SI_data),(cooL.row,cooL.col)),shape=(self.N,self.N)).tocsr()
-            CM_S @= y[:,iI].T
-            self.closure[:] =  CM_S.T * self.ensemble_beta_infected
-
-            CM_S = coo_matrix((np.array(CM_SH_data),(cooL.row,cooL.col)),shape=(self.N,self.N)).tocsr()
-            CM_S @= y[:,iH].T
-            self.closure[:] +=  CM_S.T * self.ensemble_beta_hospital
+            self.closure[:] =  (self.CM_SI @ yI_T).T * self.ensemble_beta_infected
+            self.closure[:] += (self.CM_SH @ yH_T).T * self.ensemble_beta_hospital
 
         elif closure_name == 'full':
             # XXX this only works for betas of shape (M, 1); untested for others
@@ -562,12 +1242,108 @@ class MasterEquationModelEnsemble:
                     + ": this value of 'closure_name' is not supported: "
                     + closure_name)
 
+    def __check_closure_float32(
+            self,
+            closure_args,
+            CM_SI_coeff,
+            CM_SH_coeff):
+        """
+        Check float32 closure coefficients against the float64 reference
+
+        If the maximum relative error exceeds CLOSURE_FLOAT32_RTOL, a warning is
+        issued, the float64 results replace the float32 ones, and float32 mode
+        is switched off for the rest of the object's lifetime.
+
+        Input:
+            closure_args (tuple): arguments of create_CM_data other than states
+                                  and outputs
+            CM_SI_coeff (np.array): (nonzeros,) float32-accumulated coefficients
+            CM_SH_coeff (np.array): (nonzeros,) float32-accumulated coefficients
+        Output:
+            CM_SI_coeff (np.array): (nonzeros,) coefficients to use
+            CM_SH_coeff (np.array): (nonzeros,) coefficients to use
+        """
+        y = self.y0
+        states_T = (np.ascontiguousarray(y[:,self.S_slice].T),
+                    np.ascontiguousarray(y[:,self.I_slice].T),
+                    np.ascontiguousarray(y[:,self.H_slice].T))
+
+        nonzeros = CM_SI_coeff.size
+        CM_SI_data_ref  = np.empty(nonzeros)
+        CM_SH_data_ref  = np.empty(nonzeros)
+        CM_SI_coeff_ref = np.empty(nonzeros)
+        CM_SH_coeff_ref = np.empty(nonzeros)
+        create_CM_data(*closure_args[:3],
+                       *states_T,
+                       *closure_args[3:],
+                       CM_SI_data_ref,
+                       CM_SH_data_ref,
+                       CM_SI_coeff_ref,
+                       CM_SH_coeff_ref)
+
+        self.closure_float32_checked = True
+        relative_error = max(
+                np.max(np.abs(CM_SI_coeff - CM_SI_coeff_ref)
+                       / np.maximum(np.abs(CM_SI_coeff_ref), 1e-8), initial=0.0),
+                np.max(np.abs(CM_SH_coeff - CM_SH_coeff_ref)
+                       / np.maximum(np.abs(CM_SH_coeff_ref), 1e-8), initial=0.0))
+
+        if relative_error <= self.CLOSURE_FLOAT32_RTOL:
+            return CM_SI_coeff, CM_SH_coeff
+
+        warnings.warn(
+                self.__class__.__name__
+                + ": float32 closure coefficients have relative error "
+                + "{:.2e} > {:.2e}; ".format(relative_error,
+                                            self.CLOSURE_FLOAT32_RTOL)
+                + "switching to float64")
+        self.closure_float32 = False
+        self.CM_SI.data[:] = CM_SI_data_ref
+        self.CM_SH.data[:] = CM_SH_data_ref
+
+        return CM_SI_coeff_ref, CM_SH_coeff_ref
+
+    def __update_closure_pattern(self):
+        """
+        Update cached sparsity pattern of the closure matrices from 'self.L'
+
+        The CSR matrices self.CM_SI and self.CM_SH share the pattern of L and
+        are only rebuilt when that pattern changes; otherwise, their data
+        buffers are overwritten in place by eval_closure.
+
+        Output:
+            L_data (np.array): (nonzeros,) array of weights of L in CSR order
+        """
+        L = self.L.tocsr()
+        if not L.has_sorted_indices:
+            L = L.sorted_indices()
+
+        pattern_changed = (
+                self.CM_SI is None
+                or not np.array_equal(L.indptr,  self.CM_SI.indptr)
+                or not np.array_equal(L.indices, self.CM_SI.indices))
+
+        if pattern_changed:
+            indptr  = L.indptr.copy()
+            indices = L.indices.copy()
+            nonzeros = indices.size
+
+            self.CM_SI = csr_matrix((np.empty(nonzeros), indices, indptr),
+                                    shape=(self.N, self.N))
+            self.CM_SH = csr_matrix((np.empty(nonzeros), indices, indptr),
+                                    shape=(self.N, self.N))
+            self.CM_rows = np.repeat(np.arange(self.N), np.diff(indptr))
+            self.closure_float32_checked = False
+
+        return L.data
+
     def simulate(
             self,
             time_window,
             min_steps=1,
             closure_name='independent',
-            closure_flag=True):
+            closure_flag=True,
+            dense_output=False):
         """
         Simulate master equations for the whole ensemble forward in time
 
@@ -578,9 +1354,19 @@ class MasterEquationModelEnsemble:
                                 'full' are supported at this time
             closure_flag (bool): whether to evaluate closure during this
                                  simulation call
+            dense_output (bool): whether to keep continuous solutions of this
+                                 call, for get_dense_output; only supported
+                                 for integration_method='RK45'
         Output:
             y0 (np.array): (M, 6*N) array of states at the end of time_window
         """
+        if dense_output and self.integration_method != 'RK45':
+            raise ValueError(
+                    self.__class__.__name__
+                    + ": dense output is not supported for this value of "
+                    + "'integration_method': "
+                    + self.integration_method)
+
         stop_time = self.start_time + time_window
         maxdt = abs(time_window) / min_steps
 
@@ -592,38 +1378,138 @@ class MasterEquationModelEnsemble:
         
         self.compute_prevalence_indep_exogenous_rates()
 
-        if self.parallel_cpu:
-            futures = []
-            args = (self.start_time, stop_time, maxdt, self.exogenous_flag)
-
-            for integrator in self.integrators:
-                futures.append(integrator.integrate.remote(*args))
+        first_steps = self.member_steps if self.warm_start else np.full(self.M,
+                                                                         np.nan)
+        if dense_output:
+            self.dense_output_span = (self.start_time, stop_time)
+            self.dense_output_solutions = [None] * self.M
+        else:
+            self.dense_output_span = None
+            self.dense_output_solutions = None
 
-            for future in futures:
-                ray.get(future)
+        if self.parallel_cpu:
+            args = (self.start_time,
+                    stop_time,
+                    maxdt,
+                    self.exogenous_flag,
+                    dense_output)
+            self.__integrate_in_parallel(first_steps, args)
+        elif self.integration_method == 'ensemble_RK45':
+            y, self.member_steps[:] = integrate_ensemble_rk45(
+                    fun = self.compute_ensemble_rhs,
+                    t_span = [self.start_time, stop_time],
+                    y0 = self.y0,
+                    max_step = maxdt,
+                    first_step = first_steps)
+            self.y0[:] = np.clip(y, 0, 1)
+        elif self.integration_method == 'exponential':
+            # the equations are linear unless prevalence enters exogenous rates
+            n_substeps = min_steps if self.exogenous_flag else 1
+            for _ in range(n_substeps):
+                exponential_master_equations_step(
+                        self.y0,
+                        self.coefficients,
+                        self.closure,
+                        self.prevalence_indep_exogenous_rates,
+                        self.exogenous_flag,
+                        time_window / n_substeps)
+            np.clip(self.y0, 0, 1, out=self.y0)
         else:
             for j in range(self.M):
-                ode_result = solve_ivp(
+                first_step = first_steps[j]
+                y, self.member_steps[j], solution = solve_member_ivp(
                         fun = lambda t, y: (
                             self.compute_rhs(j, y)
                             ),
                         t_span = [self.start_time, stop_time],
                         y0 = self.y0[j],
-                        t_eval = [stop_time],
-                        method = 'RK45',
-                        max_step = maxdt)
+                        max_step = maxdt,
+                        first_step = None if np.isnan(first_step) else first_step,
+                        dense_output = dense_output)
 
-                self.y0[j] = np.clip(np.squeeze(ode_result.y), 0, 1)
+                self.y0[j] = np.clip(y, 0, 1)
+                if dense_output:
+                    self.dense_output_solutions[j] = solution
 
         self.start_time += time_window
         return self.y0
 
+    def __integrate_in_parallel(
+            self,
+            first_steps,
+            args):
+        """
+        Integrate all members by parallel workers, balancing the load
+
+        Member tasks are handed out one at a time to whichever worker becomes
+        idle first, so that members with stiff dynamics (many RK steps) do not
+        hold up the workers that are done with their share.
+
+        Input:
+            first_steps (np.array): (M,) array of initial step sizes (or NaN)
+            args (tuple): (start_time, stop_time, maxdt, exogenous_flag,
+                           dense_output)
+        Output:
+            None
+        """
+        tasks = iter(self.member_tasks)
+
+        if self.parallel_backend == 'ray':
+            import ray
+
+            pending = {}
+            for integrator in self.integrators:
+                members = next(tasks, None)
+                if members is None:
+                    break
+                pending[integrator.integrate.remote(
+                    members, first_steps[members], *args)] = integrator
+
+            while pending:
+                (done,), _ = ray.wait(list(pending), num_returns=1)
+                integrator = pending.pop(done)
+                self.__store_integration_results(*ray.get(done))
+
+                members = next(tasks, None)
+                if members is not None:
+                    pending[integrator.integrate.remote(
+                        members, first_steps[members], *args)] = integrator
+        else:
+            futures = [self.executor.submit(integrate_in_process,
+                                            members,
+                                            first_steps[members],
+                                            *args)
+                       for members in tasks]
+            for future in as_completed(futures):
+                self.__store_integration_results(*future.result())
+
+    def __store_integration_results(
+            self,
+            members,
+            steps,
+            solutions):
+        """
+        Store step sizes (and continuous solutions) returned by a worker
+
+        Input:
+            members (np.array): indices of integrated members
+            steps (np.array): step sizes to warm-start `members` with
+            solutions (list): continuous solutions of `members`, or None
+        Output:
+            None
+        """
+        self.member_steps[members] = steps
+        if solutions is not None:
+            for j, solution in zip(members, solutions):
+                self.dense_output_solutions[j] = solution
+
     def simulate_backwards(
             self,
             time_window,
             min_steps=1,
             closure_name='independent',
-            closure_flag=True):
+            closure_flag=True,
+            dense_output=False):
 
         """
         Simulate master equations for the whole ensemble backward in time
@@ -635,6 +1521,8 @@ class MasterEquationModelEnsemble:
                                 'full' are supported at this time
             closure_flag (bool): whether to evaluate closure during this
                                  simulation call
+            dense_output (bool): whether to keep continuous solutions of this
+                                 call, for get_dense_output
         Output:
             y0 (np.array): (M, 6*N) array of states at the end of time_window
         """
@@ -643,7 +1531,42 @@ class MasterEquationModelEnsemble:
         return self.simulate(-positive_time_window,
                              min_steps,
                              closure_name,
-                             closure_flag)
+                             closure_flag,
+                             dense_output)
+
+    def get_dense_output(
+            self,
+            time):
+        """
+        Get states of the ensemble at a time inside the last simulated window
+
+        This evaluates continuous solutions kept by the last `simulate` (or
+        `simulate_backwards`) call with dense_output=True, hence no integration
+        is repeated.
+
+        Input:
+            time (float): time between the start and stop of the last window
+        Output:
+            states (np.array): (M, 6*N) array of states at `time`
+        """
+        if self.dense_output_solutions is None:
+            raise ValueError(
+                    self.__class__.__name__
+                    + ": no dense output; call 'simulate' with "
+                    + "dense_output=True first")
+
+        if not min(self.dense_output_span) <= time <= max(self.dense_output_span):
+            raise ValueError(
+                    self.__class__.__name__
+                    + ": time is outside of the last simulated window: "
+                    + str(time))
+
+        states = np.empty( (self.M, 6*self.N) )
+        for j, solution in enumerate(self.dense_output_solutions):
+            # solutions are None for an empty window
+            states[j] = solution(time) if solution is not None else self.y0[j]
+
+        return np.clip(states, 0, 1)
 
     def reset_walltimes(self):
         """
@@ -659,7 +1582,7 @@ class MasterEquationModelEnsemble:
 
     def wrap_up(self):
         """
-        Take care of the shared memory objects
+        Take care of the shared memory objects and closure history files
 
         This should be called only once at the end of object's lifetime;
         unfortunately, destructor doesn't work for this (some memory is already
@@ -669,6 +1592,9 @@ class MasterEquationModelEnsemble:
             None
         """
         if self.parallel_cpu:
+            if self.parallel_backend == 'processes':
+                self.executor.shutdown()
+
             self.y0_shm.close()
             self.closure_shm.close()
             self.coefficients_shm.close()
@@ -679,11 +1605,20 @@ class MasterEquationModelEnsemble:
             self.coefficients_shm.unlink()
             self.exog_shm.unlink()
 
-@ray.remote
-class RemoteIntegrator:
+        self.CM_SI_coeff_history.close()
+        self.CM_SH_coeff_history.close()
+
+class EnsembleIntegrator:
+    """
+    Integrator of a subset of ensemble members stored in shared memory
+
+    Shared memory segments are attached to once, in the constructor, and the
+    views are kept for the lifetime of the object; hence, the object is meant
+    to live in a (long-lived) worker: a ray actor, or a process of a pool (see
+    initialize_process_integrator).
+    """
     def __init__(
             self,
-            members_to_compute,
             M,
             N,
             ensemble_state_shared_memory_name,
@@ -694,99 +1629,98 @@ class RemoteIntegrator:
         Constructor
 
         Input:
-            members_to_compute (np.array): indices of members that are assigned
-                                           to this integrator
             M (int): total number of ensemble members
             N (int): total number of nodes (population)
             ensemble_state_shared_memory_name (str): shared memory name (state)
             coefficients_shared_memory_name (str): shared memory name (coeffs)
             closure_shared_memory_name (str): shared memory name (closure)
+            exog_shared_memory_name (str): shared memory name (exogenous rates)
         """
         self.M = M
         self.N = N
-        
-        self.shared_memory_names = {
-            'ensemble_state'                   : ensemble_state_shared_memory_name,
-            'coefficients'                     : coefficients_shared_memory_name,
-            'closure'                          : closure_shared_memory_name,
-            'prevalence_indep_exogenous_rates' : exog_shared_memory_name
-        }
-
-        self.S_slice = slice(  0,   N)
-        self.E_slice = slice(  N, 2*N)
-        self.I_slice = slice(2*N, 3*N)
-        self.H_slice = slice(3*N, 4*N)
-        self.R_slice = slice(4*N, 5*N)
-        self.D_slice = slice(5*N, 6*N)
-
-        self.members_to_compute = members_to_compute
+
+        self.y0_shm = shared_memory.SharedMemory(
+                name=ensemble_state_shared_memory_name)
+        self.coefficients_shm = shared_memory.SharedMemory(
+                name=coefficients_shared_memory_name)
+        self.closure_shm = shared_memory.SharedMemory(
+                name=closure_shared_memory_name)
+        self.exog_shm = shared_memory.SharedMemory(
+                name=exog_shared_memory_name)
+
+        self.ensemble_state = np.ndarray((self.M, 6*self.N),
+                                         dtype=np.float_,
+                                         buffer=self.y0_shm.buf)
+        self.coefficients   = np.ndarray((self.M, 8*self.N),
+                                         dtype=np.float_,
+                                         buffer=self.coefficients_shm.buf)
+        self.closure        = np.ndarray((self.M, self.N),
+                                         dtype=np.float_,
+                                         buffer=self.closure_shm.buf)
+        self.prevalence_indep_exogenous_rates = np.ndarray(
+                self.N,
+                dtype=np.float_,
+                buffer=self.exog_shm.buf)
 
     def integrate(
             self,
+            members_to_compute,
+            first_steps,
             start_time,
             stop_time,
             maxdt,
-            exogenous_flag):
+            exogenous_flag,
+            dense_output=False):
         """
-        Integrate members assigned to the current integrator
+        Integrate specified members
 
-        All three arguments are arguments to scipy.integrate.solve_ivp
+        start_time, stop_time, maxdt are arguments to solve_member_ivp
 
         Input:
+            members_to_compute (np.array): indices of members to integrate
+            first_steps (np.array): initial step sizes of the members (or NaN)
             start_time (float): start time of the integration interval
             stop_time (float): stop time of the integration interval
             maxdt (float): maximum timestep
+            exogenous_flag (bool): whether to use exogenous rates
+            dense_output (bool): whether to return continuous solutions
         Output:
-            None
+            members_to_compute (np.array): indices of integrated members
+            steps (np.array): step sizes to warm-start the members with
+            solutions (list): continuous solutions of the members, or None
         """
-        y0_shm = shared_memory.SharedMemory(
-                name=self.shared_memory_names['ensemble_state'])
-        coefficients_shm = shared_memory.SharedMemory(
-                name=self.shared_memory_names['coefficients'])
-        closure_shm = shared_memory.SharedMemory(
-                name=self.shared_memory_names['closure'])
-        exog_shm = shared_memory.SharedMemory(
-            name=self.shared_memory_names['prevalence_indep_exogenous_rates'])
-        
-        ensemble_state = np.ndarray((self.M, 6*self.N),
-                                    dtype=np.float_,
-                                    buffer=y0_shm.buf)
-        coefficients   = np.ndarray((self.M, 8*self.N),
-                                    dtype=np.float_,
-                                    buffer=coefficients_shm.buf)
-        closure        = np.ndarray((self.M, self.N),
-                                    dtype=np.float_,
-                                    buffer=closure_shm.buf)
-        prevalence_indep_exogenous_rates = np.ndarray(self.N,
-                                                      dtype=np.float_,
-                                                      buffer=exog_shm.buf)
-
         t_span = np.array([start_time, stop_time])
-        t_eval = np.array([stop_time])
 
-        for j in self.members_to_compute:
-            member_state        = ensemble_state[j]
-            member_coefficients = coefficients[j]
-            member_closure      = closure[j]
+        steps = np.empty(len(members_to_compute))
+        solutions = [] if dense_output else None
+
+        for k, j in enumerate(members_to_compute):
+            member_state        = self.ensemble_state[j]
+            member_coefficients = self.coefficients[j]
+            member_closure      = self.closure[j]
 
             compute_rhs_member = lambda t, y: (
-                    self.compute_rhs(y, member_coefficients, member_closure, prevalence_indep_exogenous_rates,exogenous_flag)
+                    self.compute_rhs(y,
+                                     member_coefficients,
+                                     member_closure,
+                                     self.prevalence_indep_exogenous_rates,
+                                     exogenous_flag)
             )
 
-            ode_result = solve_ivp(fun=compute_rhs_member,
-                                   t_span=t_span,
-                                   y0=member_state,
-                                   t_eval=t_eval,
-                                   method='RK45',
-                                   max_step=maxdt)
-            ensemble_state[j] = np.clip(np.squeeze(ode_result.y), 0.0, 1.0)
+            first_step = first_steps[k]
+            y, steps[k], solution = solve_member_ivp(
+                    fun=compute_rhs_member,
+                    t_span=t_span,
+                    y0=member_state,
+                    max_step=maxdt,
+                    first_step=None if np.isnan(first_step) else first_step,
+                    dense_output=dense_output)
+            self.ensemble_state[j] = np.clip(y, 0.0, 1.0)
 
-        y0_shm.close()
-        coefficients_shm.close()
-        closure_shm.close()
-        exog_shm.close()
+            if dense_output:
+                solutions.append(solution)
 
-        return
+        return members_to_compute, steps, solutions
 
     def compute_rhs(
             self,
@@ -808,38 +1742,44 @@ class RemoteIntegrator:
         Output:
             rhs (np.array): (6*N,) right-hand side of master equations
         """
-        S_substate = member_state[self.S_slice]
-        E_substate = member_state[self.E_slice]
-        I_substate = member_state[self.I_slice]
-        H_substate = member_state[self.H_slice]
-       
-        (sigma,
-         gamma,
-         delta,
-         xi,
-         mu,
-         gammap,
-         xip,
-         mup
-        ) = member_coefficients.reshape( (8, -1) )
-
         rhs = np.empty(6*self.N)
 
-        if not exogenous_flag:
-            rhs[self.S_slice] = -member_closure * S_substate 
-            rhs[self.E_slice] =  member_closure * S_substate - sigma * E_substate
-        else:
-            
-            prevalence = I_substate.mean()
-            
-            rhs[self.S_slice] = -(member_closure + prevalence * prevalence_indep_exogenous_rates) * S_substate
-            rhs[self.E_slice] =  (member_closure + prevalence * prevalence_indep_exogenous_rates) * S_substate - sigma * E_substate
-        
-        rhs[self.I_slice] = sigma * E_substate - gamma  * I_substate
-        rhs[self.H_slice] = delta * I_substate - gammap * H_substate
-        rhs[self.R_slice] = xi    * I_substate + xip    * H_substate
-        rhs[self.D_slice] = mu    * I_substate + mup    * H_substate
-
-        return rhs
+        return master_equations_rhs(rhs,
+                                    member_state,
+                                    member_coefficients,
+                                    member_closure,
+                                    prevalence_indep_exogenous_rates,
+                                    exogenous_flag)
 
+    def close(self):
+        """
+        Detach from shared memory
 
+        Output:
+            None
+        """
+        del self.ensemble_state
+        del self.coefficients
+        del self.closure
+        del self.prevalence_indep_exogenous_rates
+
+        self.y0_shm.close()
+        self.coefficients_shm.close()
+        self.closure_shm.close()
+        self.exog_shm.close()
+
+# integrator of the current process of a pool; see initialize_process_integrator
+process_integrator = None
+
+def initialize_process_integrator(*args):
+    """
+    Create the integrator of a pool's process; arguments as in EnsembleIntegrator
+    """
+    global process_integrator
+    process_integrator = EnsembleIntegrator(*args)
+
+def integrate_in_process(*args):
+    """
+    Integrate members by the current process' integrator; see integrate above
+    """
+    return process_integrator.integrate(*args)
@@ -3702,7 +3702,8 @@ def Gillespie_Arbitrary(G, spontaneous_transition_graph,
   
 def Gillespie_simple_contagion(G, spontaneous_transition_graph, 
   nbr_induced_transition_graph, IC, return_statuses, tmin = 0,  tmax=100, 
-  spont_kwargs = None, nbr_kwargs=None, return_full_data = False, sim_kwargs = None):
+  spont_kwargs = None, nbr_kwargs=None, return_full_data = False, sim_kwargs = None,
+  event_callback = None):
     r'''
     Performs simulations for epidemics, allowing more flexibility than SIR/SIS.
     
@@ -3936,6 +3937,10 @@ def Gillespie_simple_contagion(G, spontaneous_transition_graph,
     **sim_kwargs** keyword arguments
         Any keyword arguments to be sent to the Simulation_Investigation object
         Only relevant if ``return_full_data=True``
+
+    **event_callback** function or None (default None)
+        If given, it is called as ``event_callback(t, node, old_status, new_status)``
+        each time a node changes status.
         
     :Returns: 
 
@@ -4142,6 +4147,8 @@ def Gillespie_simple_contagion(G, spontaneous_transition_graph,
             #modified_node changes status
 
         status[modified_node] = new_status
+        if event_callback is not None:
+            event_callback(t, modified_node, old_status, new_status)
         if return_full_data:
             node_history[modified_node][0].append(t)
             node_history[modified_node][1].append(new_status)
@@ -0,0 +1,257 @@
+import operator
+from collections.abc import Mapping
+
+import numpy as np
+
+class Statuses(Mapping):
+    """
+    Statuses of nodes, stored as an array of int8 codes (indices into
+    Statuses.NAMES) aligned with an array of nodes.
+
+    Statuses is a read-only mapping node -> status name, so it can be used
+    wherever a dict {node: status} is read; vectorized consumers use the arrays
+    (nodes, codes) and the methods below instead.
+
+    The arrays are never modified: operations return new objects, and copies
+    (including copy.deepcopy) share them.
+    """
+
+    NAMES = ('S', 'E', 'I', 'H', 'R', 'D')
+    CODES = {name: code for code, name in enumerate(NAMES)}
+    DTYPE = np.int8
+
+    def __init__(
+            self,
+            nodes,
+            codes):
+        """
+        Constructor
+
+        Input:
+            nodes (np.array): (n_nodes,) array of (unique) node indices
+            codes (np.array): (n_nodes,) array of codes of statuses
+        """
+        nodes = np.array(nodes, dtype=np.int64)
+        codes = np.array(codes, dtype=self.DTYPE)
+        if nodes.shape != codes.shape or nodes.ndim != 1:
+            raise ValueError(
+                    self.__class__.__name__
+                    + ": nodes and codes must be 1d arrays of the same size")
+
+        nodes.flags.writeable = False
+        codes.flags.writeable = False
+        self.nodes = nodes
+        self.codes = codes
+
+        # node -> position lookup, built when needed
+        self.__nodes_are_positions = None
+        self.__sorted_nodes = None
+        self.__order = None
+
+    @classmethod
+    def from_dict(
+            cls,
+            statuses):
+        """
+        Create Statuses from a mapping node -> status name
+
+        Input:
+            statuses (dict),
+                     (Statuses): a mapping node -> status name; Statuses are
+                                 returned as they are
+        Output:
+            statuses (Statuses): statuses, in the order of the mapping
+        """
+        if isinstance(statuses, cls):
+            return statuses
+
+        nodes = np.fromiter(statuses.keys(), dtype=np.int64, count=len(statuses))
+        codes = np.fromiter( (cls.CODES[name] for name in statuses.values()),
+                             dtype=cls.DTYPE,
+                             count=len(statuses))
+
+        return cls(nodes, codes)
+
+    def __getitem__(
+            self,
+            node):
+        try:
+            node = operator.index(node)
+        except TypeError:
+            raise KeyError(node) from None
+
+        if self.__nodes_are_positions is None:
+            self.__build_positions()
+
+        if self.__nodes_are_positions:
+            if not 0 <= node < self.nodes.size:
+                raise KeyError(node)
+            return self.NAMES[self.codes[node]]
+
+        return self.NAMES[self.codes[self.get_positions([node])[0]]]
+
+    def __iter__(self):
+        return iter(self.nodes.tolist())
+
+    def __len__(self):
+        return self.nodes.size
+
+    def __deepcopy__(
+            self,
+            memo):
+        return self # immutable
+
+    def __array__(
+            self,
+            dtype=None,
+            copy=None):
+        """
+        Convert to a 0d object array holding a dict of the statuses, as numpy
+        does with a dict (and not to the array of nodes, as with a sequence),
+        so that np.save and the like store the statuses
+        """
+        if copy is False:
+            raise ValueError(
+                    self.__class__.__name__
+                    + ": cannot be converted to an array without a copy")
+
+        array = np.empty((), dtype=object)
+        array[()] = self.to_dict()
+
+        return array if dtype is None else array.astype(dtype)
+
+    def __repr__(self):
+        return (self.__class__.__name__
+                + "(" + repr(self.to_dict()) + ")")
+
+    def keys(self):
+        return self.nodes.tolist()
+
+    def values(self):
+        return self.get_names().tolist()
+
+    def items(self):
+        return list(zip(self.keys(), self.values()))
+
+    def to_dict(self):
+        """
+        Get statuses as a dict
+
+        Output:
+            statuses (dict): a mapping node -> status name
+        """
+        return dict(zip(self.keys(), self.values()))
+
+    def get_names(self):
+        """
+        Get names of statuses
+
+        Output:
+            names (np.array): (n_nodes,) array of status names
+        """
+        return np.array(self.NAMES)[self.codes]
+
+    def get_positions(
+            self,
+            nodes):
+        """
+        Get positions of nodes in self.nodes
+
+        Input:
+            nodes (np.array): (n,) array of node indices
+        Output:
+            positions (np.array): (n,) array of positions
+        """
+        try:
+            nodes = np.asarray(nodes, dtype=np.int64)
+        except (TypeError, ValueError):
+            raise KeyError(nodes) from None
+
+        if self.__nodes_are_positions is None:
+            self.__build_positions()
+
+        if self.__nodes_are_positions:
+            positions = nodes
+            found = (0 <= nodes) & (nodes < self.nodes.size)
+        else:
+            positions = np.searchsorted(self.__sorted_nodes, nodes)
+            positions[positions == self.nodes.size] = 0
+            found = (self.__sorted_nodes[positions] == nodes)
+            positions = self.__order[positions]
+
+        if not found.all():
+            raise KeyError(nodes[~found][0])
+
+        return positions
+
+    def get_codes(
+            self,
+            nodes=None):
+        """
+        Get codes of statuses of nodes
+
+        Input:
+            nodes (np.array): (n,) array of node indices; all nodes if None
+        Output:
+            codes (np.array): (n,) array of codes
+        """
+        if nodes is None:
+            return self.codes
+
+        return self.codes[self.get_positions(nodes)]
+
+    def slice(
+            self,
+            nodes):
+        """
+        Get statuses of a subset of nodes
+
+        Input:
+            nodes (np.array): (n,) array of node indices
+        Output:
+            statuses (Statuses): statuses of nodes, in the order of nodes
+        """
+        return Statuses(nodes, self.get_codes(nodes))
+
+    def mask(
+            self,
+            name):
+        """
+        Get mask of nodes in a given status
+
+        Input:
+            name (str): status name
+        Output:
+            mask (np.array): (n_nodes,) boolean array
+        """
+        return self.codes == self.CODES[name]
+
+    def count(self):
+        """
+        Get number of nodes in each status
+
+        Output:
+            counts (np.array): (len(Statuses.NAMES),) array of integers
+        """
+        return np.bincount(self.codes, minlength=len(self.NAMES))
+
+    def shuffle(self):
+        """
+        Shuffle statuses among nodes (with np.random)
+
+        Output:
+            statuses (Statuses): shuffled statuses
+        """
+        codes = self.codes.copy()
+        np.random.shuffle(codes) # in-place
+        return Statuses(self.nodes, codes)
+
+    def __build_positions(self):
+        """
+        Build the lookup from nodes to their positions in self.nodes
+        """
+        self.__nodes_are_positions = np.array_equal(self.nodes,
+                                                    np.arange(self.nodes.size))
+        if not self.__nodes_are_positions:
+            self.__order = np.argsort(self.nodes, kind='stable')
+            self.__sorted_nodes = self.nodes[self.__order]
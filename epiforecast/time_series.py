@@ -172,3 +172,217 @@ class EnsembleTimeSeries:
         self.end += 1
 
 
+
+
+class SnapshotHistory:
+    """
+    Store a history of 1-D snapshots (possibly of varying length) with a
+    configurable retention policy
+
+    Retention policies:
+        - 'all': keep every snapshot in memory (a plain list)
+        - 'off': keep nothing
+        - 'last': keep the last `max_snapshots` snapshots in a preallocated
+                  ring buffer; the buffer grows only if a snapshot is longer
+                  than any previous one
+        - 'file': stream snapshots to a raw float64 file at `path`; they are
+                  read back through np.memmap
+
+    Indexing (integer or slice) and len() refer to the retained snapshots, in
+    the order they were pushed, so that e.g. np.array(history[::4]) works the
+    same way as for a list.
+    """
+
+    def __init__(
+            self,
+            retention='all',
+            max_snapshots=None,
+            path=None):
+        """
+        Constructor
+
+        Input:
+            retention (str): retention policy; 'all', 'off', 'last' or 'file'
+            max_snapshots (int): number of snapshots to keep; 'last' only
+            path (str): path to the file to stream snapshots to; 'file' only
+        """
+        if retention not in ('all', 'off', 'last', 'file'):
+            raise ValueError(
+                    self.__class__.__name__
+                    + ": this value of 'retention' is not supported: "
+                    + str(retention))
+        if retention == 'last' and not max_snapshots:
+            raise ValueError(
+                    self.__class__.__name__
+                    + ": 'max_snapshots' must be positive for 'last' retention")
+        if retention == 'file' and path is None:
+            raise ValueError(
+                    self.__class__.__name__
+                    + ": 'path' must be provided for 'file' retention")
+
+        self.retention = retention
+        self.max_snapshots = max_snapshots
+        self.path = path
+
+        self.snapshots = [] # 'all'
+
+        self.container = None # 'last'
+        self.lengths = None
+        self.start = 0
+        self.count = 0
+
+        self.file = None # 'file'
+        self.offsets = [0]
+        self.memmap = None
+
+    def __len__(self):
+        if self.retention == 'all':
+            return len(self.snapshots)
+        elif self.retention == 'off':
+            return 0
+        elif self.retention == 'last':
+            return self.count
+        else:
+            return len(self.offsets) - 1
+
+    def __getitem__(
+            self,
+            index):
+        """
+        Get a snapshot (int index) or a list of snapshots (slice)
+
+        Input:
+            index (int),
+                  (slice): index of a retained snapshot, or a slice of them
+        Output:
+            snapshot (np.array): (K,) array of values
+                     (list): list of such arrays for a slice
+        """
+        if isinstance(index, slice):
+            return [self.get_snapshot(k) for k in range(*index.indices(len(self)))]
+
+        return self.get_snapshot(index)
+
+    def get_snapshot(
+            self,
+            index):
+        """
+        Get a copy of a retained snapshot
+
+        Input:
+            index (int): index of a retained snapshot (negative from the end)
+        Output:
+            snapshot (np.array): (K,) array of values
+        """
+        n_snapshots = len(self)
+        if index < 0:
+            index += n_snapshots
+        if not 0 <= index < n_snapshots:
+            raise IndexError(
+                    self.__class__.__name__
+                    + ": index is out of bounds: "
+                    + str(index))
+
+        if self.retention == 'all':
+            return self.snapshots[index]
+        elif self.retention == 'last':
+            slot = (self.start + index) % self.max_snapshots
+            return self.container[slot, :self.lengths[slot]].copy()
+        else:
+            return np.array(self.__get_memmap()[self.offsets[index]
+                                                :self.offsets[index + 1]])
+
+    def append(
+            self,
+            snapshot):
+        """
+        Append a snapshot according to the retention policy
+
+        Input:
+            snapshot (np.array): (K,) array of values
+        Output:
+            None
+        """
+        if self.retention == 'all':
+            self.snapshots.append(snapshot)
+        elif self.retention == 'last':
+            self.__push_to_ring_buffer(snapshot)
+        elif self.retention == 'file':
+            self.__push_to_file(snapshot)
+
+    def __push_to_ring_buffer(
+            self,
+            snapshot):
+        """
+        Push a snapshot into the ring buffer, overwriting the oldest one if full
+        """
+        length = snapshot.size
+        if self.container is None or length > self.container.shape[1]:
+            self.__grow_ring_buffer(length)
+
+        slot = (self.start + self.count) % self.max_snapshots
+        self.container[slot, :length] = snapshot
+        self.lengths[slot] = length
+
+        if self.count < self.max_snapshots:
+            self.count += 1
+        else:
+            self.start = (self.start + 1) % self.max_snapshots
+
+    def __grow_ring_buffer(
+            self,
+            length):
+        """
+        (Re)allocate the ring buffer so that it fits snapshots of `length`
+        """
+        capacity = int(np.ceil(1.2 * length)) # margin for edges being added
+        container = np.empty( (self.max_snapshots, capacity) )
+        lengths = np.zeros(self.max_snapshots, dtype=int)
+
+        if self.container is not None:
+            old_capacity = self.container.shape[1]
+            container[:, :old_capacity] = self.container
+            lengths[:] = self.lengths
+
+        self.container = container
+        self.lengths = lengths
+
+    def __push_to_file(
+            self,
+            snapshot):
+        """
+        Append a snapshot to the end of the file
+        """
+        if self.file is None:
+            self.file = open(self.path, 'wb')
+
+        self.file.write(np.ascontiguousarray(snapshot, dtype=np.float64).tobytes())
+        self.offsets.append(self.offsets[-1] + snapshot.size)
+        self.memmap = None
+
+    def __get_memmap(self):
+        """
+        Get a read-only np.memmap of everything written to the file so far
+        """
+        if self.memmap is None:
+            if self.file is not None:
+                self.file.flush()
+            if self.offsets[-1] == 0: # np.memmap cannot map an empty file
+                return np.empty(0)
+            self.memmap = np.memmap(self.path,
+                                    dtype=np.float64,
+                                    mode='r',
+                                    shape=(self.offsets[-1],))
+        return self.memmap
+
+    def close(self):
+        """
+        Close the file in 'file' retention (no-op otherwise)
+
+        Snapshot offsets are saved next to the file as `path` + '.offsets.npy'
+        so that the file can be read back with np.memmap later on.
+        """
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            np.save(self.path + '.offsets.npy', np.array(self.offsets))
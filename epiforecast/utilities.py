@@ -2,6 +2,8 @@ import numpy as np
 import random
 from numba import njit
 
+from .statuses import Statuses
+
 # Utilities for seeding random number generators
 
 @njit
@@ -57,11 +59,15 @@ def mask_by_compartment(
     Get mask of indices for which state is equal to `compartment`
 
     Input:
-        states (dict): a mapping node -> state
+        states (dict),
+               (Statuses): a mapping node -> state
         compartment (char): which compartment to return mask for
     Output:
         mask (np.array): boolean array of indices
     """
+    if isinstance(states, Statuses):
+        return states.mask(compartment)
+
     states_array = np.fromiter(states.values(), dtype='<U1')
     mask = (states_array == compartment)
     return mask
@@ -71,10 +77,14 @@ def compartments_count(states):
     Get number of nodes in each compartment
 
     Input:
-        states (dict): a mapping node -> state
+        states (dict),
+               (Statuses): a mapping node -> state
     Output:
         counts (np.array): (6,) array of integers
     """
+    if isinstance(states, Statuses):
+        return states.count()
+
     n_S = np.count_nonzero(mask_by_compartment(states, 'S'))
     n_E = np.count_nonzero(mask_by_compartment(states, 'E'))
     n_I = np.count_nonzero(mask_by_compartment(states, 'I'))
@@ -89,10 +99,15 @@ def shuffle(states):
     Shuffle states preserving the number of nodes in each compartment
 
     Input:
-        states (dict): a mapping node -> state
+        states (dict),
+               (Statuses): a mapping node -> state
     Output:
-        shuffled_states (dict): a mapping node -> state, shuffled
+        shuffled_states (dict),
+                        (Statuses): a mapping node -> state, shuffled
     """
+    if isinstance(states, Statuses):
+        return states.shuffle()
+
     states_array = np.fromiter(states.values(), dtype='<U1')
     np.random.shuffle(states_array) # in-place
     return { node: state for node, state in zip(states.keys(), states_array) }
@@ -104,11 +119,16 @@ def dict_slice(
     Get number of nodes in each compartment
 
     Input:
-        states (dict): a mapping node -> state
+        states (dict),
+               (Statuses): a mapping node -> state
         nodes (np.array): (n_nodes,) array of node indices to take a slice of
     Output:
-        states_slice (dict): a mapping node -> state (with node in nodes)
+        states_slice (dict),
+                     (Statuses): a mapping node -> state (with node in nodes)
     """
+    if isinstance(states, Statuses):
+        return states.slice(nodes)
+
     return { node: states[node] for node in nodes }
 
 
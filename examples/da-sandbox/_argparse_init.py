@@ -13,8 +13,12 @@ print_info_module(__name__, "parsing args of PID:", os.getpid())
 # parallel #####################################################################
 parser.add_argument('--parallel-flag', default=False, action='store_true')
 parser.add_argument('--parallel-num-cpus', type=int, default=1)
+parser.add_argument('--parallel-backend', type=str, default='ray') # or 'processes'
 parser.add_argument('--parallel-memory', type=int, default=4_000_000_000) # 4GB
 parser.add_argument('--parallel-temp-dir', type=str, default='')
+parser.add_argument('--parallel-numba-threads', type=int, default=1)
+parser.add_argument('--integration-method', type=str, default='RK45')
+parser.add_argument('--closure-float32', default=False, action='store_true')
 
 # constants ####################################################################
 parser.add_argument('--constants-seed-shift', type=int, default=0)
@@ -80,6 +84,8 @@ parser.add_argument('--prior-run', default=False, action='store_true')
 #closure study
 parser.add_argument('--ensemble-closure', default=False, action='store_true') 
 parser.add_argument('--save-closure-coeffs', default=False, action='store_true') 
+parser.add_argument('--closure-history', type=str, default='all')
+parser.add_argument('--closure-history-length', type=int, default=0)
 
 # parameters learning ##########################################################
 parser.add_argument('--params-learn-transition-rates', default=False, action='store_true')
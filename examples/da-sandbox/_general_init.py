@@ -1,6 +1,5 @@
 import os
 from numba import set_num_threads
-import ray
 
 from epiforecast.utilities import seed_three_random_states
 
@@ -12,7 +11,9 @@ from _utilities import print_start_of, print_end_of
 print_start_of(__name__)
 ################################################################################
 # parallel #####################################################################
-if arguments.parallel_flag:
+if arguments.parallel_flag and arguments.parallel_backend == 'ray':
+    import ray
+
     object_store_memory = min(arguments.parallel_memory // 2, 2_000_000_000)
     memory = arguments.parallel_memory - object_store_memory
 
@@ -28,7 +29,7 @@ if arguments.parallel_flag:
     )
 
 # numba ########################################################################
-set_num_threads(1)
+set_num_threads(arguments.parallel_numba_threads)
 
 # seeding ######################################################################
 seed_three_random_states(SEED_GENERAL_INIT)
@@ -3,7 +3,8 @@ import numpy as np
 from epiforecast.risk_simulator import MasterEquationModelEnsemble
 
 from _argparse_init import arguments
-from _constants import (start_time,
+from _constants import (OUTPUT_PATH,
+                        start_time,
                         community_transmission_rate,
                         hospital_transmission_reduction)
 from _stochastic_init import transition_rates
@@ -117,6 +118,12 @@ else:
     raise ValueError("unknown method, choose from: exact, average")
 
 # Set up master equation solver ################################################
+# the history of closure coefficients is only needed to save them at the end
+if arguments.save_closure_coeffs:
+    closure_history = arguments.closure_history
+else:
+    closure_history = 'off'
+
 master_eqn_ensemble = MasterEquationModelEnsemble(
         population=user_population,
         transition_rates=transition_rates_ensemble,
@@ -127,7 +134,14 @@ master_eqn_ensemble = MasterEquationModelEnsemble(
         start_time=start_time,
         parallel_cpu=arguments.parallel_flag,
         num_cpus=arguments.parallel_num_cpus,
-        ensemble_correction=arguments.ensemble_closure
+        parallel_backend=(arguments.parallel_backend if arguments.parallel_flag
+                          else 'serial'),
+        ensemble_correction=arguments.ensemble_closure,
+        integration_method=arguments.integration_method,
+        closure_float32=arguments.closure_float32,
+        closure_history=closure_history,
+        closure_history_length=arguments.closure_history_length,
+        closure_history_path=OUTPUT_PATH
 )
 
 
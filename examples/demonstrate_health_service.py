@@ -47,7 +47,7 @@ health_service = HealthService(network, health_worker_population)
 print("Statuses after discharge and admittance")
 print_statuses(statuses)
 
-recovered_patients = [patient.address for patient in list(health_service.patients)[:10]]
+recovered_patients = health_service.patients[:10].tolist()
 print("Assume of those hospitalized, 10 patients have recovered",recovered_patients)
 statuses.update({node: 'R' for node in recovered_patients})
 